@@ -1,10 +1,12 @@
 from fastapi import FastAPI, HTTPException, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, FileResponse, PlainTextResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import List, Optional
 import numpy as np
 import pandas as pd
-import os, sys
+import os, sys, time
 from sklearn.preprocessing import StandardScaler
 
 # The code snippet you provided is performing the following actions:
@@ -13,16 +15,30 @@ sys.path.append(PROJECT_ROOT)
 
 try:
     from src.exception import customExceptionHandler
-    from src.logger import logging
+    from src.logger import logging, get_hot_path_logger
     from src.Pipeline.predict_pipeline import CustomData, PredictionPipeline
+    from src.Pipeline.input_validator import records_to_columns
+    from src.Pipeline.stream_scoring import NDJSONStreamingResponse, score_ndjson_stream
+    from src.Pipeline.columnar_format import MEDIA_TYPES as COLUMNAR_MEDIA_TYPES, decode_body, encode_body
     from src.Pipeline.train_pipeline import TrainPipeline 
+    from src.metrics import REGISTRY, CONTENT_TYPE_LATEST, MetricsMiddleware, stage_timer, observe_stage
+    from src.profiler import PROFILER, ProfilingMiddleware, profile_run, profiled
+    from src.admission import AdmissionMiddleware, expired
+    from src.request_capture import CAPTURE
 except ImportError as e:
     print(f"Error importing local modules: {e}")
     print(f"Current sys.path: {sys.path}")
     print(f"Project root being used: {PROJECT_ROOT}")
 
+# Per-request messages go through a sampled, rate-limited logger
+hot_path_logger = get_hot_path_logger(__name__)
+
 # Initialize FastAPI
 app = FastAPI()
+app.add_middleware(ProfilingMiddleware)
+# Inside MetricsMiddleware so shed requests are counted with their 503/504 status
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 # Set up Jinja2 templates for HTML rendering
 templates = Jinja2Templates(directory="templates")
@@ -39,6 +55,12 @@ class PredictionInput(BaseModel):
     reading_score: float
     writing_score: float
 
+
+def drop_if_expired(request: Request):
+    # Requests whose client deadline passed while queued or uploading are not scored
+    if expired(request):
+        raise HTTPException(status_code=504, detail="Deadline exceeded before scoring")
+
 """
     This Python function serves an HTML template named "index.html" when the root URL is accessed.
     
@@ -128,6 +150,10 @@ async def predict(
     reading_score: float = Form(...),
     writing_score: float = Form(...)
 ):
+    # Everything between the middleware seeing the request and this line is routing + form parsing
+    if REGISTRY.enabled and hasattr(request.state, "metrics_start"):
+        observe_stage("predict", "parse_form", time.perf_counter() - request.state.metrics_start)
+
     data = CustomData(
         gender=gender,
         race_ethnicity=ethnicity,
@@ -138,16 +164,103 @@ async def predict(
         writing_score=writing_score
     )
 
-    # Convert data to DataFrame
-    prediction_df = data.get_data_as_df()
-    print(prediction_df)
+    hot_path_logger.debug("Prediction input: %s", vars(data))
+    # Sampled into the replay log when CAPTURE_SAMPLE_RATE > 0
+    CAPTURE.record(data)
+    drop_if_expired(request)
 
-    # Predict
+    # Predict straight from the form fields; CustomData.get_data_as_df remains the DataFrame path
     predict_pipeline = PredictionPipeline()
-    results = predict_pipeline.predict(prediction_df)
+    results = predict_pipeline.predict_records([data])
 
     # Render template with results
-    return templates.TemplateResponse("home.html", {"request": request, "results": results[0]})
+    with stage_timer("predict", "render_template"):
+        return templates.TemplateResponse("home.html", {"request": request, "results": results[0]})
+
+
+"""
+    The `/predict/batch` endpoint scores a batch in one call and returns the predictions in the
+    same order. The body is either a JSON list of records with the `PredictionInput` fields or an
+    object mapping each field to a list of values. The batch is validated column by column against
+    the training schema; invalid rows get a null prediction and are listed in `errors` instead of
+    failing the whole request.
+
+    A binary column batch is accepted as well, selected by the Content-Type: the numpy column
+    format `application/x-numpy-columns` or, with pyarrow installed, an Arrow IPC stream
+    (`application/vnd.apache.arrow.stream`). Its answer is in the same format, with a `prediction`
+    column (NaN for invalid rows) and the `errors` list in the metadata; see `columnar_format`.
+    
+    :param request: The raw request; the body is parsed here rather than by pydantic.
+    :return: A JSON object with a `predictions` list and an `errors` list of
+    `{"row": index, "errors": {field: reason}}` entries.
+"""
+
+MAX_REPORTED_ROW_ERRORS = 100
+
+
+@app.post("/predict/batch", response_class=JSONResponse)
+async def predict_batch(request: Request):
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if media_type in COLUMNAR_MEDIA_TYPES:
+        return await predict_batch_columnar(request, media_type)
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be JSON")
+    predict_pipeline = PredictionPipeline()
+    validator = predict_pipeline.validator()
+    if isinstance(payload, list):
+        if not all(isinstance(record, dict) for record in payload):
+            raise HTTPException(status_code=422, detail="Records must be JSON objects")
+        columns = records_to_columns(payload, validator.input_features)
+    elif isinstance(payload, dict):
+        columns = payload
+        if not all(isinstance(values, list) for values in columns.values()):
+            raise HTTPException(status_code=422, detail="Column values must be lists")
+        if len({len(values) for values in columns.values()}) > 1:
+            raise HTTPException(status_code=422, detail="Columns must have the same length")
+    else:
+        raise HTTPException(status_code=422, detail="Body must be a list of records or an object of columns")
+
+    drop_if_expired(request)
+    # Scoring a large batch takes long enough to stall every other request on the event loop
+    predictions, result = await run_in_threadpool(profiled(predict_pipeline.score_columns), columns)
+    if result.n_invalid:
+        hot_path_logger.info("Batch of %d rows had %d invalid rows", result.n_rows, result.n_invalid)
+    return {"predictions": [None if np.isnan(p) else float(p) for p in predictions],
+            "errors": result.row_errors(limit=MAX_REPORTED_ROW_ERRORS)}
+
+
+async def predict_batch_columnar(request, media_type):
+    try:
+        columns, _ = decode_body(await request.body(), media_type)
+    except ImportError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid {media_type} body: {e}")
+    drop_if_expired(request)
+    predictions, result = await run_in_threadpool(profiled(PredictionPipeline().score_columns), columns)
+    if result.n_invalid:
+        hot_path_logger.info("Batch of %d rows had %d invalid rows", result.n_rows, result.n_invalid)
+    metadata = {"errors": result.row_errors(limit=MAX_REPORTED_ROW_ERRORS)}
+    return Response(content=encode_body({"prediction": predictions}, media_type, metadata), media_type=media_type)
+
+
+"""
+    The `/predict/stream` endpoint scores a newline-delimited JSON body (one `PredictionInput`
+    record per line) without buffering it. Records are scored in micro-batches as they arrive and
+    the predictions are streamed back as NDJSON lines `{"row": i, "prediction": p}`; invalid
+    records get `"prediction": null` and an `errors` object. Only a few batches are buffered, so a
+    client that reads slowly also slows down how fast its body is consumed.
+    
+    :param request: The raw request, whose body is read as a stream.
+    :return: An `application/x-ndjson` streaming response.
+"""
+
+@app.post("/predict/stream")
+async def predict_stream(request: Request):
+    drop_if_expired(request)
+    return NDJSONStreamingResponse(score_ndjson_stream(request.stream()))
 
 
 """
@@ -163,7 +276,8 @@ async def predict(
     :return: The endpoint `/train` is returning a JSON response with a message indicating whether the
     training was completed successfully or not. If successful, it includes the best model name and the
     best score achieved during training. If an exception occurs during training, an error message is
-    logged and a 500 status code response is returned with details of the error.
+    logged and a 500 status code response is returned with details of the error. Training runs in the
+    threadpool, and admission control allows one run at a time (a second one gets 503).
 """
 
 @app.post("/train", response_class=JSONResponse)
@@ -172,12 +286,88 @@ async def train(data_file_path: str = Form(...)):
     if not data_file_path:
         raise HTTPException(status_code=400, detail="Data file path is required")
 
+    def run_training():
+        with profile_run("training"):
+            return TrainPipeline().run_training_pipeline(data_file_path)
+
     try:
-        train_pipeline = TrainPipeline()
-        best_model_name, best_score = train_pipeline.run_training_pipeline(data_file_path)
+        # Training runs in the threadpool so the event loop keeps serving predictions meanwhile
+        best_model_name, best_score = await run_in_threadpool(run_training)
         return {"message": "Training completed successfully", "best_model": best_model_name, "best_score": best_score}
     except Exception as e:
         logging.error(f"Training failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+
+
+
+"""
+    The `/metrics` endpoint exposes request counters, in-flight gauges, latency histograms and the
+    per-stage timings of the prediction and training pipelines in the Prometheus text format.
+    Metrics are disabled (and the endpoint returns 404) when METRICS_ENABLED=0.
+"""
+
+@app.get("/metrics")
+async def metrics():
+    if not REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
+
+
+"""
+    The `/admin/profile` endpoints control the on-demand profiler of this worker process. They are
+    only available when PROFILE_TOKEN is set, and every call must send it in `X-Profile-Token`.
+    
+    GET lists the profiler state and the stored reports, POST profiles a fraction of requests for a
+    limited time, DELETE stops that early and `GET /admin/profile/{name}` downloads one report
+    (`?format=text` for a readable summary).
+"""
+
+class ProfileWindow(BaseModel):
+    sample_rate: float = 1.0
+    duration_seconds: float = 60.0
+    max_requests: Optional[int] = None
+    mode: Optional[str] = None
+
+
+def _check_profile_token(request: Request):
+    if PROFILER.token is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not PROFILER.header_matches(request.headers.get("x-profile-token")):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+
+@app.get("/admin/profile", response_class=JSONResponse)
+async def profile_status(request: Request):
+    _check_profile_token(request)
+    return {**PROFILER.status(), "files": PROFILER.reports.list()}
+
+
+@app.post("/admin/profile", response_class=JSONResponse)
+async def profile_start(request: Request, window: ProfileWindow):
+    _check_profile_token(request)
+    try:
+        return PROFILER.arm(window.sample_rate, window.duration_seconds, window.max_requests, window.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.delete("/admin/profile", response_class=JSONResponse)
+async def profile_stop(request: Request):
+    _check_profile_token(request)
+    return PROFILER.disarm()
+
+
+@app.get("/admin/profile/{name}")
+async def profile_report(request: Request, name: str, format: str = "raw"):
+    _check_profile_token(request)
+    if format == "text":
+        text = PROFILER.render_text(name)
+        if text is None:
+            raise HTTPException(status_code=404, detail="Unknown report")
+        return PlainTextResponse(text)
+    path = PROFILER.reports.resolve(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Unknown report")
+    return FileResponse(path, filename=name)
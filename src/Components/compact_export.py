@@ -0,0 +1,312 @@
+import sys, os
+import json
+import shutil
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+    from src.utils import load_obj, save_obj
+    from src.Components.tree_compiler import CompiledTreeEnsemble, compile_model, save_compiled, load_compiled
+    from src.Pipeline.feature_encoder import FeatureEncoder
+    from src.Components.feature_views import ONEHOT, current_feature_view
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# "Compact" export of the fitted artifacts for memory-constrained serving. Tree ensembles keep the
+# array layout of `tree_compiler` but with int16 feature indices, float32 thresholds (rounded in
+# the direction that keeps every float32 input on the same side of the split) and float32 leaf
+# values stored in the leaf slots of the threshold array. Linear models keep float32 coefficients
+# (after re-centring one-hot groups) and the preprocessor becomes a `FeatureEncoder` with float32
+# output (scaled in float64 and then cast, as sklearn's trees cast their input). All
+# containers use __slots__ and carry no estimator objects. `export_compact` reports the size,
+# memory and accuracy change on the test split, and only writes the compact artifacts when they
+# are smaller than the full ones. Linear models gain nothing: a pickled LinearRegression is a few
+# hundred bytes, less than the .npz container and loaded arrays of its compact form, so for them
+# the report is produced but nothing is written.
+
+
+@dataclass
+class CompactExportConfig:
+    model_path: str = os.path.join("artifacts_output", "model.pkl")
+    preprocessor_path: str = os.path.join("artifacts_output", "preprocessor.pkl")
+    test_data_path: str = os.path.join("artifacts_output", "test.csv")
+    compact_model_path: str = os.path.join("artifacts_output", "model_compact.npz")
+    compact_preprocessor_path: str = os.path.join("artifacts_output", "preprocessor_compact.pkl")
+    report_path: str = os.path.join("artifacts_output", "compact_report.json")
+    model_meta_path: str = os.path.join("artifacts_output", "model_meta.json")
+    target_column: str = "math_score"
+
+
+class CompactLinearModel:
+    """
+    float32 coefficients and intercept of a fitted linear regression.
+    """
+    __slots__ = ("coef", "intercept")
+
+    def __init__(self, coef, intercept):
+        self.coef = coef
+        self.intercept = intercept
+
+    def predict(self, X):
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        X = np.asarray(X, dtype=np.float32)
+        return (X @ self.coef + self.intercept).astype(np.float64)
+
+
+def _round_thresholds(threshold, strict):
+    """
+    Rounds float64 thresholds to float32 without changing any float32 input's branch: for `x <= t`
+    use the largest float32 not above t, for `x < t` the smallest float32 not below t.
+    """
+    rounded = threshold.astype(np.float32)
+    if strict:
+        below = rounded.astype(np.float64) < threshold
+        rounded[below] = np.nextafter(rounded[below], np.float32(np.inf))
+    else:
+        above = rounded.astype(np.float64) > threshold
+        rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def _smallest_int(max_value):
+    return np.int16 if max_value < np.iinfo(np.int16).max else np.int32
+
+
+def compact_tree_ensemble(compiled):
+    """
+    Converts a `CompiledTreeEnsemble` to its compact form.
+    """
+    n_nodes = len(compiled.feature)
+    index = np.arange(n_nodes)
+    leaf = compiled.left == index
+    threshold = _round_thresholds(compiled.threshold, compiled.strict)
+    threshold[leaf] = compiled.value[leaf].astype(np.float32)
+    child_dtype = _smallest_int(n_nodes)
+    return CompiledTreeEnsemble(
+        feature=compiled.feature.astype(_smallest_int(compiled.feature.max(initial=0))),
+        threshold=threshold,
+        left=compiled.left.astype(child_dtype),
+        right=compiled.right.astype(child_dtype),
+        value=None,
+        roots=compiled.roots.astype(child_dtype),
+        max_depth=compiled.max_depth,
+        aggregation=compiled.aggregation,
+        base=compiled.base,
+        scale=compiled.scale,
+        tree_weights=compiled.tree_weights.astype(np.float32),
+        strict=compiled.strict,
+        accumulate_dtype=compiled.accumulate_dtype,
+        source=compiled.source,
+    )
+
+
+def compact_linear_model(model, encoder=None):
+    """
+    Casts a linear regression to float32.
+
+    On one-hot features the least-squares coefficients of a group are only determined up to a
+    shared offset (each row has exactly one active category), and unregularised fits often end up
+    with huge coefficients that cancel against the intercept; float32 cannot represent that
+    cancellation. With the fitted `encoder` the offset is moved into the intercept first, which
+    leaves predictions for known categories unchanged and the coefficients small. A row whose
+    category is unknown then scores as the group's average category instead of all-zeros.
+    """
+    coef = np.ravel(model.coef_).astype(np.float64)
+    intercept = float(np.ravel(model.intercept_)[0])
+    for block in (encoder.categorical_blocks if encoder is not None else ()):
+        columns = slice(block.offset, block.offset + block.width)
+        values = np.asarray(block.values, dtype=np.float64)
+        contributions = coef[columns] * values
+        shift = contributions.mean()
+        coef[columns] = (contributions - shift) / values
+        intercept += shift
+    return CompactLinearModel(coef.astype(np.float32), np.float32(intercept))
+
+
+def compact_model(model, encoder=None):
+    """
+    Builds the compact inference container for a fitted model.
+
+    :param encoder: The `FeatureEncoder` of the model's preprocessor, used to re-centre one-hot
+        coefficients of linear models.
+    :return: A `CompiledTreeEnsemble` with narrow dtypes, a `CompactLinearModel`, or None for
+        model types without a compact form (K-Nearest Neighbors).
+    """
+    if isinstance(model, CompiledTreeEnsemble):
+        return compact_tree_ensemble(model)
+    if isinstance(model, LinearRegression):
+        return compact_linear_model(model, encoder)
+    compiled = compile_model(model)
+    return compact_tree_ensemble(compiled) if compiled is not None else None
+
+
+def save_compact_model(file_path, compact):
+    try:
+        if isinstance(compact, CompactLinearModel):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "wb") as file_obj:
+                np.savez(file_obj, meta=np.array(json.dumps({"kind": "linear"})),
+                         coef=compact.coef, intercept=np.array(compact.intercept))
+        else:
+            save_compiled(file_path, compact)
+
+    except Exception as e:
+        logging.error("Error in saving compact model", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def load_compact_model(file_path):
+    try:
+        with np.load(file_path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("kind") == "linear":
+                return CompactLinearModel(data["coef"], data["intercept"][()])
+        return load_compiled(file_path)
+
+    except Exception as e:
+        logging.error("Error in loading compact model", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def _rss_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _resident_bytes(loader, file_path):
+    """
+    Memory an artifact occupies once loaded: the RSS growth of a forked child that loads it, or the
+    Python-tracked allocations (which miss sklearn's C-level tree buffers) where /proc is missing.
+    The artifact is loaded once before measuring and kept, so one-time costs of the loader
+    (imports, code pages, allocator arenas; about 2.5 MB, the same for every artifact) are not
+    counted and only the second copy is.
+    """
+    if hasattr(os, "fork") and os.path.exists("/proc/self/statm"):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # The child must never return into the caller, whatever the loader raises
+            try:
+                os.close(read_fd)
+                warm = loader(file_path)
+                before = _rss_bytes()
+                obj = loader(file_path)
+                os.write(write_fd, str(_rss_bytes() - before).encode())
+                os._exit(0)
+            finally:
+                os._exit(1)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as pipe:
+            delta = pipe.read()
+        _, status = os.waitpid(pid, 0)
+        if not delta or os.waitstatus_to_exitcode(status) != 0:
+            raise RuntimeError(f"Measuring the resident size of {file_path} failed in the child process")
+        return int(delta)
+
+    warm = loader(file_path)
+    tracemalloc.start()
+    try:
+        obj = loader(file_path)
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del obj, warm
+    return current
+
+
+def export_compact(config=None):
+    """
+    Writes the compact model and preprocessor and reports what they cost in accuracy. Nothing is
+    written (and stale compact artifacts are removed) when the compact model is larger on disk or
+    in memory than the full one.
+
+    :return: A dict with artifact sizes, resident memory, test-split R2/prediction deltas and
+        whether the artifacts were `written`; it is also saved as JSON at `config.report_path`.
+    """
+    config = config or CompactExportConfig()
+    try:
+        feature_view = current_feature_view(config.model_meta_path, config.model_path)
+        if feature_view != ONEHOT:
+            raise ValueError(f"Compact export needs a model trained on the one-hot view, not {feature_view}")
+        model = load_obj(config.model_path)
+        preprocessor = load_obj(config.preprocessor_path)
+
+        encoder = FeatureEncoder.from_preprocessor(preprocessor)
+        compact = compact_model(model, encoder)
+        if compact is None:
+            raise ValueError(f"{type(model).__name__} has no compact representation")
+        encoder = encoder.astype(np.float32)
+
+        # Written to a staging directory first: the compact pair only replaces what is served when
+        # it is actually smaller than the full model
+        compact_dir = os.path.dirname(os.path.abspath(config.compact_model_path))
+        os.makedirs(compact_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=compact_dir)
+        try:
+            staged_model = os.path.join(staging, os.path.basename(config.compact_model_path))
+            staged_preprocessor = os.path.join(staging, os.path.basename(config.compact_preprocessor_path))
+            save_compact_model(staged_model, compact)
+            save_obj(staged_preprocessor, encoder)
+
+            test = pd.read_csv(config.test_data_path)
+            y_test = test[config.target_column].to_numpy()
+            features = test.drop(columns=[config.target_column])
+            full = model.predict(preprocessor.transform(features))
+            reduced = compact.predict(encoder.encode_records(features.to_dict("records")))
+
+            report = {
+                "model": type(model).__name__,
+                "model_bytes": os.path.getsize(config.model_path),
+                "compact_model_bytes": os.path.getsize(staged_model),
+                "preprocessor_bytes": os.path.getsize(config.preprocessor_path),
+                "compact_preprocessor_bytes": os.path.getsize(staged_preprocessor),
+                "model_resident_bytes": _resident_bytes(load_obj, config.model_path),
+                "compact_model_resident_bytes": _resident_bytes(load_compact_model, staged_model),
+                "r2": float(r2_score(y_test, full)),
+                "compact_r2": float(r2_score(y_test, reduced)),
+                "max_abs_prediction_delta": float(np.max(np.abs(full - reduced))),
+            }
+            # Decided on the model alone: the float32 encoder is always a little smaller than the
+            # pickled preprocessor, which would otherwise outweigh a larger compact model
+            report["written"] = (report["compact_model_bytes"] < report["model_bytes"]
+                                 and report["compact_model_resident_bytes"] <= report["model_resident_bytes"])
+            if report["written"]:
+                shutil.move(staged_model, config.compact_model_path)
+                shutil.move(staged_preprocessor, config.compact_preprocessor_path)
+            else:
+                # Drop artifacts of an earlier export so COMPACT_ARTIFACTS=1 falls back to the full model
+                for path in (config.compact_model_path, config.compact_preprocessor_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                logging.info(f"Compact {type(model).__name__} is not smaller than the full model, not written")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        report["r2_delta"] = report["compact_r2"] - report["r2"]
+        with open(config.report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Compact export: {report}")
+        return report
+
+    except Exception as e:
+        logging.error("Error in compact export", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+# Write the compact artifacts next to the full ones and print the report:
+#     python src/Components/compact_export.py
+if __name__ == "__main__":
+    print(json.dumps(export_compact(), indent=2))
@@ -17,6 +17,9 @@ try:
     from src.exception import customExceptionHandler
     from src.logger import logging
     from src.utils import save_obj
+    from src.metrics import stage_timer
+    from src.profiler import profile_run
+    from src.Components.dtype_schema import infer_schema, apply_schema, save_schema, memory_report
     from src.Components.data_transformation import DataTransformation_Config
     from src.Components.data_transformation import DataTransformation
     from src.Components.model_trainer import ModelTrainer_Config
@@ -35,6 +38,8 @@ class DataIngestionConfig:
     train_data_path: str = os.path.join('artifacts_output', "train.csv")
     test_data_path: str = os.path.join('artifacts_output', "test.csv")
     raw_data_path: str = os.path.join('artifacts_output', "data.csv")
+    # Compact column dtypes inferred from the dataset, used to read the splits back
+    dtype_schema_path: str = os.path.join('artifacts_output', "dtype_schema.json")
 
 # The `DataIngestion` class handles the process of ingesting data, including reading a dataset, saving
 # raw data, performing train-test split, and saving train and test sets.
@@ -53,20 +58,33 @@ class DataIngestion:
             os.makedirs(os.path.dirname(self.ingestion_config.train_data_path), exist_ok=True)
             
             # Read the dataset
-            df = pd.read_csv('notebook/data/stud.csv')
+            with stage_timer("training", "ingestion.read_dataset"):
+                df = pd.read_csv('notebook/data/stud.csv')
             logging.info("Reading the dataset as a dataframe")
 
+            # Downcast numbers and store the string columns as categoricals
+            with stage_timer("training", "ingestion.optimize_dtypes"):
+                schema = infer_schema(df)
+                compact = apply_schema(df, schema)
+                report = memory_report(df, compact)
+                save_schema(self.ingestion_config.dtype_schema_path, schema)
+                df = compact
+            logging.info(f"Dataset memory {report['before_bytes']} -> {report['after_bytes']} bytes with compact dtypes")
+
             # Save raw data
-            df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
+            with stage_timer("training", "ingestion.save_raw"):
+                df.to_csv(self.ingestion_config.raw_data_path, index=False, header=True)
             logging.info("Saved raw data to CSV")
 
             # Perform train-test split
             logging.info("Starting Train Test split")
-            train_set, test_set = train_test_split(df, test_size=0.2, random_state=38)
+            with stage_timer("training", "ingestion.train_test_split"):
+                train_set, test_set = train_test_split(df, test_size=0.2, random_state=38)
 
             # Save train and test sets
-            train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
-            test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
+            with stage_timer("training", "ingestion.save_splits"):
+                train_set.to_csv(self.ingestion_config.train_data_path, index=False, header=True)
+                test_set.to_csv(self.ingestion_config.test_data_path, index=False, header=True)
 
             logging.info("Data ingestion completed successfully")
 
@@ -84,14 +102,16 @@ class DataIngestion:
 # directly by the Python interpreter or if it is being imported as a module into another script.
 if __name__ == "__main__":
     try:
-        obj = DataIngestion()
-        train_data, test_data, raw_data = obj.initiating_data_ingestion()
+        # PROFILE_TRAINING=1 writes a profile of the whole run to PROFILE_DIR
+        with profile_run("training"):
+            obj = DataIngestion()
+            train_data, test_data, raw_data = obj.initiating_data_ingestion()
 
-        data_transformation = DataTransformation()
-        train_arr, test_arr,_=data_transformation.initiate_data_transformer(train_data, test_data)
+            data_transformation = DataTransformation()
+            train_arr, test_arr,_=data_transformation.initiate_data_transformer(train_data, test_data)
 
-        modeltrainer=ModelTrainer()
-        print(modeltrainer.initiate_model_trainer(train_arr, test_arr))
+            modeltrainer=ModelTrainer()
+            print(modeltrainer.initiate_model_trainer(train_arr, test_arr))
         
     except Exception as e:
         print(f"An error occurred: {e}")
\ No newline at end of file
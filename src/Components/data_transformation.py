@@ -19,6 +19,9 @@ try:
     from src.exception import customExceptionHandler
     from src.logger import logging
     from src.utils import save_obj
+    from src.metrics import stage_timer
+    from src.Pipeline.input_validator import build_input_schema, save_input_schema
+    from src.Components.dtype_schema import infer_schema, load_schema, read_csv_with_schema
 except ImportError as e:
     print(f"Error importing local modules: {e}")
     print(f"Current sys.path: {sys.path}")
@@ -28,6 +31,10 @@ except ImportError as e:
 # The class `DataTransformation_Config` contains a file path for a preprocessor object.
 class DataTransformation_Config:
     preprocessor_object_file_path=os.path.join('artifacts_output', 'preprocessor.pkl')
+    # Training ranges and categories checked by the batch input validator
+    input_schema_file_path=os.path.join('artifacts_output', 'input_schema.json')
+    # Column dtypes written by DataIngestion; inferred from the training split when missing
+    dtype_schema_file_path=os.path.join('artifacts_output', 'dtype_schema.json')
 
 class DataTransformation:
 
@@ -96,8 +103,14 @@ class DataTransformation:
     def initiate_data_transformer(self,train_path,test_path):
         
         try:
-            train_dataf = pd.read_csv(train_path)
-            test_dataf = pd.read_csv(test_path)
+            with stage_timer("training", "transformation.read_splits"):
+                schema_path = self.data_transformation_config.dtype_schema_file_path
+                if os.path.exists(schema_path):
+                    schema = load_schema(schema_path)
+                else:
+                    schema = infer_schema(pd.read_csv(train_path))
+                train_dataf = read_csv_with_schema(train_path, schema)
+                test_dataf = read_csv_with_schema(test_path, schema)
 
             logging.info("Data loading(reading test and train data) is completed")
 
@@ -119,8 +132,10 @@ class DataTransformation:
 
             logging.info("Test data preparation is completed")
 
-            input_feature_train_arr=preprocessor_object.fit_transform(input_feature_train_dataf)
-            input_feature_test_arr=preprocessor_object.transform(input_feature_test_dataf)
+            with stage_timer("training", "transformation.fit_transform"):
+                input_feature_train_arr=preprocessor_object.fit_transform(input_feature_train_dataf)
+            with stage_timer("training", "transformation.transform"):
+                input_feature_test_arr=preprocessor_object.transform(input_feature_test_dataf)
 
             logging.info("Data transformer object created")
 
@@ -129,7 +144,10 @@ class DataTransformation:
 
             logging.info("Training and test data is prepared")
 
-            save_obj(file_path=self.data_transformation_config.preprocessor_object_file_path, obj=preprocessor_object)
+            with stage_timer("training", "transformation.save_preprocessor"):
+                save_obj(file_path=self.data_transformation_config.preprocessor_object_file_path, obj=preprocessor_object)
+                save_input_schema(self.data_transformation_config.input_schema_file_path,
+                                  build_input_schema(input_feature_train_dataf, preprocessor_object))
 
             return (train_arr, test_arr, self.data_transformation_config.preprocessor_object_file_path)
         
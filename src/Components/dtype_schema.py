@@ -0,0 +1,200 @@
+import sys, os
+import json
+import time
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, is_float_dtype, is_integer_dtype
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Column dtypes for reading the student data compactly. Integer columns get the smallest signed
+# integer type that holds their range, float columns float32 when that loses nothing, and string
+# columns with few distinct values become `category` with their levels in sorted order - the order
+# in which the fitted OneHotEncoder lists its categories. The schema is inferred at ingestion and
+# saved as `dtype_schema.json`; DataTransformation reads the splits with it. The preprocessor's
+# output is the same bit for bit as with pandas' default dtypes (`python
+# src/Components/dtype_schema.py` checks this and reports memory on scaled-up data).
+
+_INTEGER_TYPES = ("int8", "int16", "int32", "int64")
+
+
+def _smallest_integer(values):
+    low, high = values.min(), values.max()
+    for dtype in _INTEGER_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return "int64"
+
+
+def infer_schema(frame, max_category_ratio=0.5):
+    """
+    :param max_category_ratio: String columns with more distinct values than this fraction of
+        the rows stay `object`.
+    :return: Column -> {"dtype": ...} plus "categories" for categorical columns.
+    """
+    schema = {}
+    for column in frame.columns:
+        values = frame[column]
+        if is_integer_dtype(values):
+            schema[column] = {"dtype": _smallest_integer(values) if len(values) else "int64"}
+        elif is_float_dtype(values):
+            narrowed = values.astype(np.float32).astype(np.float64)
+            exact = bool(((narrowed == values) | (narrowed.isna() & values.isna())).all())
+            schema[column] = {"dtype": "float32" if exact else "float64"}
+        elif isinstance(values.dtype, CategoricalDtype) or values.dtype == object:
+            observed = values.dropna().unique()
+            if len(observed) <= max_category_ratio * max(len(values), 1):
+                schema[column] = {"dtype": "category", "categories": sorted(str(v) for v in observed)}
+            else:
+                schema[column] = {"dtype": "object"}
+        else:
+            schema[column] = {"dtype": str(values.dtype)}
+    return schema
+
+
+def _fits(values, dtype):
+    if values.isna().any():
+        return False
+    info = np.iinfo(dtype)
+    return values.empty or (info.min <= values.min() and values.max() <= info.max)
+
+
+def apply_schema(frame, schema):
+    """
+    Casts the columns of `frame` to the schema. Values the schema did not foresee never change
+    silently: integer columns whose range (or missing values) do not fit keep a wider type, and
+    categories missing from the schema are added in sorted position.
+    """
+    frame = frame.copy()
+    for column, spec in schema.items():
+        if column not in frame:
+            continue
+        dtype = spec["dtype"]
+        values = frame[column]
+        if dtype == "category":
+            if not isinstance(values.dtype, CategoricalDtype):
+                values = values.astype(str).where(values.notna()).astype("category")
+            levels = sorted(set(spec["categories"]).union(values.cat.categories.astype(str)))
+            # Reorders the codes without touching the strings; every observed level is kept
+            frame[column] = values.cat.rename_categories(values.cat.categories.astype(str)).cat.set_categories(levels)
+        elif dtype in _INTEGER_TYPES:
+            numbers = pd.to_numeric(values, errors="coerce")
+            if _fits(numbers, dtype):
+                frame[column] = numbers.astype(dtype)
+            else:
+                logging.warning(f"Column {column} does not fit {dtype}, keeping {numbers.dtype}")
+                frame[column] = numbers
+        elif dtype != "object":
+            frame[column] = values.astype(dtype)
+    return frame
+
+
+def read_csv_with_schema(file_path, schema, **kwargs):
+    """
+    Reads a CSV straight into the schema's dtypes (no object intermediate), falling back to a
+    default read plus `apply_schema` when a value does not parse into its type. Integer columns
+    are read as int64 and narrowed by `apply_schema`: pandas wraps values that overflow a narrower
+    type (130 read as int8 becomes -126) instead of raising.
+    """
+    dtypes = {column: ("int64" if spec["dtype"] in _INTEGER_TYPES else spec["dtype"])
+              for column, spec in schema.items()}
+    try:
+        frame = pd.read_csv(file_path, dtype=dtypes, **kwargs)
+    except (ValueError, OverflowError, TypeError) as e:
+        logging.warning(f"Reading {file_path} with its dtype schema failed ({e}), casting after a plain read")
+        return apply_schema(pd.read_csv(file_path, **kwargs), schema)
+    # pandas infers the levels of each file; fix them to the schema's order and narrow the integers
+    narrowed = {c: s for c, s in schema.items() if s["dtype"] == "category" or s["dtype"] in _INTEGER_TYPES}
+    return apply_schema(frame, narrowed)
+
+
+def save_schema(file_path, schema):
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump(schema, f, indent=2)
+
+    except Exception as e:
+        logging.error("Error in saving dtype schema", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def load_schema(file_path):
+    try:
+        with open(file_path) as f:
+            return json.load(f)
+
+    except Exception as e:
+        logging.error("Error in loading dtype schema", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def memory_report(before, after):
+    """
+    Deep memory usage per column of the same data with two sets of dtypes.
+    """
+    before_bytes = before.memory_usage(deep=True, index=False)
+    after_bytes = after.memory_usage(deep=True, index=False)
+    return {
+        "before_bytes": int(before_bytes.sum()),
+        "after_bytes": int(after_bytes.sum()),
+        "columns": {column: {"before": int(before_bytes[column]), "after": int(after_bytes[column]),
+                             "dtype": str(after[column].dtype)} for column in after.columns},
+    }
+
+
+def _benchmark(scale=1000):
+    """
+    Memory and read time of the student data replicated `scale` times, with default and schema
+    dtypes, and a check that the fitted preprocessor transforms both identically.
+    """
+    import tempfile
+    from src.utils import load_obj
+
+    raw = pd.read_csv(os.path.join("notebook", "data", "stud.csv"))
+    schema = infer_schema(raw)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scaled.csv")
+        pd.concat([raw] * scale, ignore_index=True).to_csv(path, index=False)
+        start = time.perf_counter()
+        plain = pd.read_csv(path)
+        plain_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        compact = read_csv_with_schema(path, schema)
+        compact_seconds = time.perf_counter() - start
+
+    report = memory_report(plain, compact)
+    print(f"{len(plain):,} rows")
+    print(f"{'column':<30}{'default':>14}{'schema':>14}  dtype")
+    for column, entry in report["columns"].items():
+        print(f"{column:<30}{entry['before'] / 2**20:>12.1f}MB{entry['after'] / 2**20:>12.1f}MB  {entry['dtype']}")
+    print(f"{'total':<30}{report['before_bytes'] / 2**20:>12.1f}MB{report['after_bytes'] / 2**20:>12.1f}MB")
+    print(f"read_csv: {plain_seconds:.2f}s default, {compact_seconds:.2f}s with schema")
+
+    preprocessor = load_obj(os.path.join("artifacts_output", "preprocessor.pkl"))
+    features = [c for c in plain.columns if c != "math_score"]
+    outputs = []
+    timings = []
+    for frame in (plain, compact):
+        start = time.perf_counter()
+        outputs.append(preprocessor.transform(frame[features]))
+        timings.append(time.perf_counter() - start)
+    print(f"transform: {timings[0]:.2f}s default, {timings[1]:.2f}s with schema")
+    print(f"transformed output bit-identical: {np.array_equal(outputs[0], outputs[1])}")
+
+
+# Memory report on the data replicated 1000x:
+#     python src/Components/dtype_schema.py
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,289 @@
+import sys, os
+import json
+import time
+from collections.abc import Mapping
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRegressor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+    from src.utils import save_obj
+    from src.Pipeline.feature_encoder import FeatureEncoder, _is_nan
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Feature views are the matrix layouts a model can be trained and served on:
+#   "onehot"             the preprocessor's output, one scaled indicator column per category (19
+#                        columns for the student data)
+#   "categorical_codes"  the numeric columns scaled as by the preprocessor, then one column per
+#                        categorical input holding the index of its category in the fitted
+#                        OneHotEncoder's categories (7 columns)
+# Models that split on categories natively (CatBoost, XGBoost with enable_categorical) are trained
+# on the codes view next to their one-hot variant, and the leaderboard compares both.
+# `model_meta.json`, written with the shipped model, names the view so `PredictionPipeline`
+# encodes inputs the same way. It records the mtime of the model it describes (`model_mtime_ns`)
+# and is replaced before the model, so a reader can tell a meta file for the model on disk from
+# one for an earlier model and from one for a model that is still being put in place.
+
+ONEHOT = "onehot"
+CATEGORICAL_CODES = "categorical_codes"
+
+
+class CategoricalCodesEncoder:
+    """
+    Encodes inputs into the categorical codes view of a fitted preprocessor. Missing categorical
+    values are imputed like the preprocessor does; unknown categories become NaN (CatBoost sees
+    them as an unseen category, XGBoost as missing).
+
+    Exposes the same `encode_records`/`encode_columns` interface (and the `numeric_blocks` and
+    `categorical_blocks` the input validator reads) as `FeatureEncoder`.
+    """
+    __slots__ = ("numeric_blocks", "categorical_blocks", "input_features", "n_features", "feature_names",
+                 "categorical_indices", "dtype")
+
+    def __init__(self, encoder):
+        self.numeric_blocks = encoder.numeric_blocks
+        self.categorical_blocks = encoder.categorical_blocks
+        self.input_features = encoder.input_features
+        numeric = [column for block in encoder.numeric_blocks for column in block.columns]
+        self.feature_names = numeric + [block.column for block in encoder.categorical_blocks]
+        self.n_features = len(self.feature_names)
+        self.categorical_indices = list(range(len(numeric), self.n_features))
+        self.dtype = np.dtype(np.float64)
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        return cls(FeatureEncoder.from_preprocessor(preprocessor))
+
+    @property
+    def feature_types(self):
+        """
+        XGBoost `feature_types` of the view ("q" numeric, "c" categorical).
+        """
+        return ["c" if i in self.categorical_indices else "q" for i in range(self.n_features)]
+
+    def from_onehot(self, X):
+        """
+        Converts rows of the preprocessor's output into the codes view. All-zero indicator blocks
+        (categories ignored as unknown) become NaN.
+        """
+        X = np.asarray(X)
+        out = np.empty((X.shape[0], self.n_features), dtype=self.dtype)
+        j = 0
+        for block in self.numeric_blocks:
+            width = len(block.columns)
+            out[:, j:j + width] = X[:, block.offset:block.offset + width]
+            j += width
+        for block in self.categorical_blocks:
+            indicators = X[:, block.offset:block.offset + block.width] != 0
+            codes = indicators.argmax(axis=1).astype(self.dtype)
+            codes[~indicators.any(axis=1)] = np.nan
+            out[:, j] = codes
+            j += 1
+        return out
+
+    def _codes(self, block, values):
+        if isinstance(values, pd.Categorical):
+            # Code -1 (missing) indexes the last entry, the fill's code
+            level_codes = np.array([block.lookup.get(level, np.nan) for level in values.categories.tolist()]
+                                   + [block.lookup.get(block.fill, np.nan)], dtype=self.dtype)
+            return level_codes[values.codes]
+        codes = np.empty(len(values), dtype=self.dtype)
+        for row, value in enumerate(values):
+            if _is_nan(value):
+                value = block.fill
+            codes[row] = block.lookup.get(value, np.nan)
+        return codes
+
+    def encode_columns(self, columns):
+        """
+        :param columns: Mapping of input feature name to a sequence or array of equal length.
+        :return: An array of shape (n_rows, n_features).
+        """
+        missing = [column for column in self.input_features if column not in columns]
+        if missing:
+            raise ValueError(f"Missing input features: {missing}")
+
+        n_rows = len(columns[self.input_features[0]])
+        out = np.empty((n_rows, self.n_features), dtype=self.dtype)
+        j = 0
+        for block in self.numeric_blocks:
+            for k, column in enumerate(block.columns):
+                raw = np.array(columns[column], dtype=self.dtype)
+                missing_rows = np.isnan(raw)
+                raw[missing_rows] = block.fill[k]
+                out[:, j] = (raw - block.mean[k]) / block.scale[k]
+                j += 1
+        for block in self.categorical_blocks:
+            out[:, j] = self._codes(block, columns[block.column])
+            j += 1
+        return out
+
+    def encode_records(self, records):
+        records = list(records)
+        if records and isinstance(records[0], Mapping):
+            columns = {column: [record.get(column) for record in records] for column in self.input_features}
+        else:
+            columns = {column: [getattr(record, column, None) for record in records] for column in self.input_features}
+        return self.encode_columns(columns)
+
+
+class CatBoostCodesRegressor(CatBoostRegressor):
+    """
+    CatBoostRegressor that takes the float matrix of the codes view and hands the `cat_features`
+    columns to CatBoost as integer categories (CatBoost rejects float categorical values).
+    """
+
+    def _frame(self, X):
+        frame = pd.DataFrame(np.asarray(X))
+        for i in self.get_param("cat_features") or []:
+            frame[i] = frame[i].fillna(-1).astype(np.int64)
+        return frame
+
+    def fit(self, X, y=None, **kwargs):
+        return super().fit(self._frame(X), y, **kwargs)
+
+    def predict(self, data, **kwargs):
+        return super().predict(self._frame(data), **kwargs)
+
+    def score(self, X, y=None):
+        return super().score(self._frame(X), y)
+
+
+def native_categorical_model(model_name, model, view):
+    """
+    Returns a fresh estimator of the same configuration as `model` that consumes the codes view
+    natively, or None when the model type has no native categorical mode.
+    """
+    module = type(model).__module__
+    if module.startswith("catboost"):
+        params = model.get_params()
+        # A tuple, which CatBoost keeps as given; it copies lists, and sklearn's clone rejects that
+        params["cat_features"] = tuple(view.categorical_indices)
+        return CatBoostCodesRegressor(**params)
+    if module.startswith("xgboost"):
+        return type(model)(**{**model.get_params(), "enable_categorical": True, "tree_method": "hist",
+                              "feature_types": view.feature_types})
+    logging.warning(f"{model_name} has no native categorical mode, keeping only its one-hot view")
+    return None
+
+
+def save_model_meta(file_path, meta):
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, file_path)
+
+    except Exception as e:
+        logging.error("Error in saving model meta", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def load_model_meta(file_path):
+    try:
+        with open(file_path) as f:
+            return json.load(f)
+
+    except Exception as e:
+        logging.error("Error in loading model meta", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def _meta_feature_view(meta, meta_mtime_ns, model_mtime_ns):
+    """
+    :return: The view of the model with mtime `model_mtime_ns`, or None when `meta` describes a
+        newer model that has not replaced it yet.
+    """
+    recorded = meta.get("model_mtime_ns")
+    if recorded is None:
+        # Written before meta files recorded their model
+        return meta.get("feature_view", ONEHOT) if meta_mtime_ns >= model_mtime_ns else ONEHOT
+    if recorded == model_mtime_ns:
+        return meta.get("feature_view", ONEHOT)
+    return None if recorded > model_mtime_ns else ONEHOT
+
+
+def current_feature_view(meta_path, model_path, loader=load_model_meta, wait_seconds=2.0):
+    """
+    The view the model at `model_path` was trained on. A meta file for an earlier model (e.g.
+    before an incremental update) and no meta file both mean one-hot. While a retrained model is
+    being put in place (its meta file is already there, the model not yet) this waits for it, and
+    raises ValueError after `wait_seconds`.
+
+    :param loader: Reads the meta file, e.g. a cached variant of `load_model_meta`.
+    """
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        model_mtime_ns = os.stat(model_path).st_mtime_ns
+        if not os.path.exists(meta_path):
+            return ONEHOT
+        view = _meta_feature_view(loader(meta_path), os.stat(meta_path).st_mtime_ns, model_mtime_ns)
+        if view is not None:
+            return view
+        if time.monotonic() >= deadline:
+            raise ValueError(f"{meta_path} describes a newer model than {model_path}")
+        time.sleep(0.01)
+
+
+def save_model_with_meta(model_path, model, meta, meta_path):
+    """
+    Saves a model and its meta file so that readers never pair one with the other's predecessor:
+    the model is written to a temporary path, the meta file recording that file's mtime replaces
+    the old one, and then the model replaces the old model (`os.replace` keeps the mtime).
+    """
+    tmp_path = model_path + ".tmp"
+    save_obj(tmp_path, model)
+    save_model_meta(meta_path, {**meta, "model_mtime_ns": os.stat(tmp_path).st_mtime_ns})
+    os.replace(tmp_path, model_path)
+
+
+def _compare(repeats=3):
+    """
+    Fits the tuned CatBoost configuration on both views of the training split and reports fit
+    time, feature matrix size and test R2.
+    """
+    import time
+    from sklearn.metrics import r2_score
+    from src.utils import load_obj
+
+    preprocessor = load_obj(os.path.join("artifacts_output", "preprocessor.pkl"))
+    train = pd.read_csv(os.path.join("artifacts_output", "train.csv"))
+    test = pd.read_csv(os.path.join("artifacts_output", "test.csv"))
+    x_train = preprocessor.transform(train.drop(columns=["math_score"]))
+    x_test = preprocessor.transform(test.drop(columns=["math_score"]))
+    view = CategoricalCodesEncoder.from_preprocessor(preprocessor)
+    base = CatBoostRegressor(depth=6, learning_rate=0.1, iterations=100, verbose=False, thread_count=1,
+                             allow_writing_files=False)
+    candidates = {
+        ONEHOT: (base, x_train, x_test),
+        CATEGORICAL_CODES: (native_categorical_model("CatBoosting", base, view),
+                            view.from_onehot(x_train), view.from_onehot(x_test)),
+    }
+    print(f"{'view':<20}{'features':>9}{'matrix KiB':>12}{'fit s':>8}{'test R2':>9}")
+    for name, (model, x, x_eval) in candidates.items():
+        seconds = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.fit(x, train["math_score"])
+            seconds.append(time.perf_counter() - start)
+        r2 = r2_score(test["math_score"], model.predict(x_eval))
+        print(f"{name:<20}{x.shape[1]:>9}{x.nbytes / 1024:>12.1f}{min(seconds):>8.3f}{r2:>9.4f}")
+    print("codes view decodes the one-hot rows exactly:",
+          np.array_equal(view.from_onehot(x_test),
+                         view.encode_columns({c: test[c].to_numpy() for c in view.input_features})))
+
+
+# One-hot vs native categorical CatBoost on the project's data:
+#     python src/Components/feature_views.py
+if __name__ == "__main__":
+    _compare()
@@ -0,0 +1,531 @@
+import sys, os
+import argparse
+import multiprocessing
+import pickle
+import secrets
+import socket
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass, asdict
+from multiprocessing.managers import BaseManager
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+    from src.Components.trial_store import dataset_fingerprint
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Coordinator/worker hyperparameter search. The coordinator expands the models x params grid into
+# one trial per (model, parameter combination, CV fold) and serves them from a work queue running
+# in a `multiprocessing.managers` server. Workers, local processes or `worker` commands on other
+# hosts, lease a trial, fit it and post the fold score back. A lease that is not completed or
+# renewed in time (the worker died or lost the connection) puts the trial back on the queue, and a
+# trial that keeps failing is scored NaN, as GridSearchCV does with error_score=np.nan.
+#
+# Folds, scoring and the choice of the best parameters follow GridSearchCV(model, grid, cv=3), so
+# with seeded estimators the outcome equals the single-process search in `evaluate_models`.
+# `LocalSearch` runs the same trials in-process. Both take an optional `TrialStore`: trials found
+# there are not run again and every new result is written to it as soon as it arrives.
+#
+# Usage:
+#     HPARAM_SEARCH_WORKERS=4 python src/Components/data_ingestion.py          # local workers
+#     HPARAM_SEARCH_ADDRESS=0.0.0.0:50000 HPARAM_SEARCH_AUTHKEY=... python ...  # accept remote workers
+#     (the search fails after HPARAM_SEARCH_IDLE_TIMEOUT seconds, default 300, without any worker activity)
+#     HPARAM_SEARCH_AUTHKEY=... python -m src.Components.hyperparameter_search worker --address host:50000
+#     python -m src.Components.hyperparameter_search check --workers 4          # parity with GridSearchCV
+
+
+@dataclass
+class Trial:
+    trial_id: int
+    model_name: str
+    param_index: int
+    params: dict
+    fold: int
+
+
+@dataclass
+class TrialResult:
+    trial_id: int
+    score: float
+    fit_seconds: float
+    worker: str
+    error: str = None
+
+
+def expand_trials(models, params, n_splits=3):
+    """
+    One trial per model, parameter combination (in `ParameterGrid` order) and fold.
+
+    :param models: Model name -> estimator, as in `ModelTrainer`.
+    :param params: Model name -> parameter grid.
+    """
+    trials = []
+    for model_name in models:
+        for param_index, combination in enumerate(ParameterGrid(params.get(model_name, {}))):
+            for fold in range(n_splits):
+                trials.append(Trial(len(trials), model_name, param_index, combination, fold))
+    return trials
+
+
+def evaluate_trial(trial, estimator, x, y, n_splits=3):
+    """
+    Fits a clone of `estimator` with the trial's parameters on the training part of its fold and
+    scores it on the held-out part with `estimator.score`, like GridSearchCV's default scorer.
+
+    :return: (score, fit_seconds)
+    """
+    train_idx, test_idx = list(KFold(n_splits=n_splits).split(x, y))[trial.fold]
+    model = clone(estimator).set_params(**trial.params)
+    start = time.perf_counter()
+    model.fit(x[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+    return float(model.score(x[test_idx], y[test_idx])), fit_seconds
+
+
+def select_best(trials, results, n_splits=3):
+    """
+    Picks the best parameters per model the way GridSearchCV does: the highest mean fold score,
+    the first such combination on ties, NaN means ranked last.
+
+    :param trials: The expanded `Trial` list.
+    :param results: trial_id -> `TrialResult`.
+    :return: Model name -> {"best_params", "best_score", "mean_scores"}.
+    """
+    grouped = {}
+    for trial in trials:
+        model = grouped.setdefault(trial.model_name, {})
+        row = model.setdefault(trial.param_index, [trial.params, [np.nan] * n_splits])
+        row[1][trial.fold] = results[trial.trial_id].score
+
+    best = {}
+    for model_name, rows in grouped.items():
+        ordered = [rows[i] for i in sorted(rows)]
+        means = np.average(np.array([scores for _, scores in ordered], dtype=np.float64), axis=1)
+        index = 0 if np.isnan(means).all() else int(np.nanargmax(means))
+        best[model_name] = {"best_params": ordered[index][0], "best_score": float(means[index]),
+                            "mean_scores": means.tolist()}
+    return best
+
+
+class TrialQueue:
+    """
+    Work queue state held by the manager server. Every method is called through a proxy, from the
+    coordinator or a worker, and runs under one lock.
+    """
+
+    def __init__(self, payload, lease_seconds=60.0, max_attempts=2):
+        self._payload = payload
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._trials = {}
+        self._pending = deque()
+        self._leases = {}
+        self._attempts = Counter()
+        self._results = {}
+        self._drained = set()
+        self._requeued = 0
+
+    def payload(self):
+        return self._payload
+
+    def submit(self, trials):
+        with self._lock:
+            for trial in trials:
+                self._trials[trial["trial_id"]] = trial
+                self._pending.append(trial["trial_id"])
+
+    def _requeue_expired(self, now):
+        for trial_id, (worker, deadline) in list(self._leases.items()):
+            if deadline < now:
+                del self._leases[trial_id]
+                self._pending.appendleft(trial_id)
+                self._requeued += 1
+                logging.warning(f"Lease on trial {trial_id} held by {worker} expired, re-queued")
+
+    def lease(self, worker):
+        """
+        :return: A trial dict, "wait" when all remaining trials are leased, or None when finished.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._requeue_expired(now)
+            while self._pending:
+                trial_id = self._pending.popleft()
+                if trial_id in self._results:
+                    continue
+                self._leases[trial_id] = (worker, now + self._lease_seconds)
+                self._attempts[trial_id] += 1
+                return self._trials[trial_id]
+            return "wait" if self._leases else None
+
+    def renew(self, trial_id, worker):
+        with self._lock:
+            lease = self._leases.get(trial_id)
+            if lease is not None and lease[0] == worker:
+                self._leases[trial_id] = (worker, time.monotonic() + self._lease_seconds)
+
+    def complete(self, trial_id, worker, score, fit_seconds):
+        with self._lock:
+            self._leases.pop(trial_id, None)
+            # A trial re-queued after a slow lease may finish twice; keep the first result
+            if trial_id not in self._results:
+                self._results[trial_id] = TrialResult(trial_id, score, fit_seconds, worker)
+
+    def fail(self, trial_id, worker, error):
+        with self._lock:
+            self._leases.pop(trial_id, None)
+            if trial_id in self._results:
+                return
+            if self._attempts[trial_id] < self._max_attempts:
+                self._pending.append(trial_id)
+                self._requeued += 1
+            else:
+                self._results[trial_id] = TrialResult(trial_id, float("nan"), 0.0, worker, error)
+            logging.warning(f"Trial {trial_id} failed on {worker}: {error.splitlines()[-1] if error else ''}")
+
+    def status(self):
+        with self._lock:
+            self._requeue_expired(time.monotonic())
+            return {"total": len(self._trials), "done": len(self._results), "leased": len(self._leases),
+                    "pending": len(self._pending), "requeued": self._requeued}
+
+    def drain(self):
+        """
+        Returns the results that arrived since the previous call.
+        """
+        with self._lock:
+            new = [asdict(self._results[trial_id]) for trial_id in self._results if trial_id not in self._drained]
+            self._drained.update(result["trial_id"] for result in new)
+            return new
+
+
+_QUEUE = None
+
+
+def _init_queue(payload, lease_seconds, max_attempts):
+    global _QUEUE
+    _QUEUE = TrialQueue(payload, lease_seconds, max_attempts)
+
+
+def _get_queue():
+    return _QUEUE
+
+
+class _CoordinatorManager(BaseManager):
+    pass
+
+
+class _WorkerManager(BaseManager):
+    pass
+
+
+_CoordinatorManager.register("get_queue", callable=_get_queue)
+_WorkerManager.register("get_queue")
+
+
+def _parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _authkey():
+    key = os.getenv("HPARAM_SEARCH_AUTHKEY")
+    return key.encode() if key else None
+
+
+def _renew_periodically(queue, trial_id, worker, interval, stop):
+    while not stop.wait(interval):
+        try:
+            queue.renew(trial_id, worker)
+        except (OSError, EOFError):
+            return
+
+
+def run_worker(address, authkey, lease_seconds=60.0, poll_seconds=0.5):
+    """
+    Pulls trials from the coordinator at `address` until the search is finished.
+
+    :param address: (host, port) of the coordinator's queue.
+    :param authkey: Shared secret of the coordinator (bytes).
+    :return: Number of trials this worker completed.
+    """
+    manager = _WorkerManager(address=address, authkey=authkey)
+    manager.connect()
+    queue = manager.get_queue()
+    models, x, y, n_splits = pickle.loads(queue.payload())
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+    while True:
+        trial = queue.lease(worker)
+        if trial is None:
+            return completed
+        if trial == "wait":
+            time.sleep(poll_seconds)
+            continue
+
+        stop = threading.Event()
+        renewer = threading.Thread(target=_renew_periodically,
+                                   args=(queue, trial["trial_id"], worker, lease_seconds / 3, stop), daemon=True)
+        renewer.start()
+        try:
+            score, fit_seconds = evaluate_trial(Trial(**trial), models[trial["model_name"]], x, y, n_splits)
+        except Exception:
+            stop.set()
+            queue.fail(trial["trial_id"], worker, traceback.format_exc())
+            continue
+        finally:
+            stop.set()
+            renewer.join()
+        queue.complete(trial["trial_id"], worker, score, fit_seconds)
+        completed += 1
+
+
+def _worker_main(address, authkey, lease_seconds):
+    try:
+        run_worker(address, authkey, lease_seconds)
+    except (OSError, EOFError):
+        # The coordinator shut the queue down
+        pass
+
+
+def _reuse_stored(trials, models, x, y, n_splits, trial_store):
+    """
+    :return: (dataset fingerprint, results of trials found in `trial_store`, trials still to run)
+    """
+    if trial_store is None:
+        return None, {}, list(trials)
+    fingerprint = dataset_fingerprint(x, y)
+    stored = trial_store.lookup(fingerprint, trials, models, n_splits)
+    results = {trial_id: TrialResult(trial_id, score, fit_seconds, "store") for trial_id, (score, fit_seconds) in stored.items()}
+    remaining = [trial for trial in trials if trial.trial_id not in results]
+    if results:
+        logging.info(f"Reusing {len(results)} of {len(trials)} trials from {trial_store.path}")
+    return fingerprint, results, remaining
+
+
+@dataclass
+class LocalSearch:
+    """
+    Runs the trials one after another in this process. Callable like `DistributedSearch`; used
+    by `evaluate_models` when it is given a trial store but no other searcher.
+    """
+    n_splits: int = 3
+
+    def __call__(self, models, params, x, y, trial_store=None):
+        x, y = np.asarray(x), np.asarray(y)
+        trials = expand_trials(models, params, self.n_splits)
+        fingerprint, results, remaining = _reuse_stored(trials, models, x, y, self.n_splits, trial_store)
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        for trial in remaining:
+            estimator = models[trial.model_name]
+            try:
+                score, fit_seconds = evaluate_trial(trial, estimator, x, y, self.n_splits)
+                result = TrialResult(trial.trial_id, score, fit_seconds, worker)
+            except Exception:
+                result = TrialResult(trial.trial_id, float("nan"), 0.0, worker, traceback.format_exc())
+                logging.warning(f"Trial {trial.trial_id} ({trial.model_name} {trial.params}) failed, scored NaN")
+            results[trial.trial_id] = result
+            if trial_store is not None:
+                trial_store.record(fingerprint, [(trial, estimator, result)], self.n_splits)
+        return select_best(trials, results, self.n_splits)
+
+
+@dataclass
+class DistributedSearch:
+    """
+    Runs the search for `evaluate_models` on a work queue. Callable as
+    `search(models, params, x_train, y_train, trial_store=None)`, returning `select_best`'s result.
+
+    :param n_workers: Local worker processes to start (0 to rely on remote workers only).
+    :param address: "host:port" the queue listens on; port 0 picks a free one.
+    :param lease_seconds: Time after which a trial whose worker stopped renewing is re-queued.
+    :param max_attempts: Attempts per trial before it is scored NaN.
+    :param idle_timeout_seconds: The search fails when no worker holds a trial and no result
+        arrives for this long, e.g. no remote worker ever connected.
+    """
+    n_workers: int = 2
+    address: str = "127.0.0.1:0"
+    n_splits: int = 3
+    lease_seconds: float = 60.0
+    max_attempts: int = 2
+    poll_seconds: float = 0.5
+    idle_timeout_seconds: float = 300.0
+
+    @classmethod
+    def from_env(cls):
+        """
+        Returns a search configured by HPARAM_SEARCH_WORKERS / HPARAM_SEARCH_ADDRESS (and
+        HPARAM_SEARCH_IDLE_TIMEOUT), or None when neither is set (single-process GridSearchCV).
+        Raises ValueError when HPARAM_SEARCH_ADDRESS is set without HPARAM_SEARCH_AUTHKEY, since
+        remote workers could never connect.
+        """
+        workers = int(os.getenv("HPARAM_SEARCH_WORKERS", "0"))
+        address = os.getenv("HPARAM_SEARCH_ADDRESS")
+        if workers <= 0 and not address:
+            return None
+        if address and _authkey() is None:
+            raise ValueError("HPARAM_SEARCH_ADDRESS is set but HPARAM_SEARCH_AUTHKEY is not; "
+                             "remote workers need the shared key to connect")
+        return cls(n_workers=max(workers, 0), address=address or cls.address,
+                   idle_timeout_seconds=float(os.getenv("HPARAM_SEARCH_IDLE_TIMEOUT", cls.idle_timeout_seconds)))
+
+    def __call__(self, models, params, x, y, trial_store=None):
+        try:
+            x, y = np.asarray(x), np.asarray(y)
+            trials = expand_trials(models, params, self.n_splits)
+            fingerprint, results, remaining = _reuse_stored(trials, models, x, y, self.n_splits, trial_store)
+            if remaining:
+                results.update(self._run_queue(models, x, y, remaining, trial_store, fingerprint))
+            return select_best(trials, results, self.n_splits)
+
+        except Exception as e:
+            logging.error("Error in distributed hyperparameter search", exc_info=True)
+            raise customExceptionHandler(e) from None
+
+    def _run_queue(self, models, x, y, trials, trial_store, fingerprint):
+        authkey = _authkey() or secrets.token_bytes(16)
+        payload = pickle.dumps((models, x, y, self.n_splits))
+        manager = _CoordinatorManager(address=_parse_address(self.address), authkey=authkey)
+        manager.start(initializer=_init_queue, initargs=(payload, self.lease_seconds, self.max_attempts))
+        by_id = {trial.trial_id: trial for trial in trials}
+        results = {}
+        processes = []
+        try:
+            queue = manager.get_queue()
+            queue.submit([asdict(trial) for trial in trials])
+            logging.info(f"Search queue with {len(trials)} trials listening on {manager.address}")
+
+            context = multiprocessing.get_context()
+
+            def spawn():
+                process = context.Process(target=_worker_main,
+                                          args=(manager.address, authkey, self.lease_seconds), daemon=True)
+                process.start()
+                processes.append(process)
+
+            for _ in range(self.n_workers):
+                spawn()
+
+            last_activity = time.monotonic()
+            while True:
+                status = queue.status()
+                new = [TrialResult(**result) for result in queue.drain()]
+                results.update((result.trial_id, result) for result in new)
+                if new or status["leased"]:
+                    last_activity = time.monotonic()
+                elif time.monotonic() - last_activity > self.idle_timeout_seconds:
+                    raise TimeoutError(f"No search worker took a trial for {self.idle_timeout_seconds:.0f}s "
+                                       f"({status}); are workers connected to {manager.address}?")
+                if trial_store is not None and new:
+                    trial_store.record(fingerprint, [(by_id[r.trial_id], models[by_id[r.trial_id].model_name], r)
+                                                     for r in new], self.n_splits)
+                if len(results) == len(trials):
+                    break
+                for process in list(processes):
+                    # A worker also exits cleanly when it loses its connection; restart it as long
+                    # as trials are waiting. A crashed worker's trial comes back once its lease expires.
+                    if not process.is_alive() and (process.exitcode != 0 or status["pending"]):
+                        logging.warning(f"Search worker {process.pid} exited with {process.exitcode}, restarting")
+                        processes.remove(process)
+                        spawn()
+                time.sleep(self.poll_seconds)
+            logging.info(f"Search finished: {status}")
+        finally:
+            manager.shutdown()
+            for process in processes:
+                process.join(timeout=5)
+        return results
+
+
+def _check_parity(n_workers):
+    """
+    Runs the grids of `ModelTrainer` on the training split both with GridSearchCV and on the queue
+    with seeded estimators and reports whether best parameters and scores agree.
+    """
+    import pandas as pd
+    from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.neighbors import KNeighborsRegressor
+    from sklearn.tree import DecisionTreeRegressor
+    from src.utils import load_obj
+
+    train = pd.read_csv(os.path.join("artifacts_output", "train.csv"))
+    preprocessor = load_obj(os.path.join("artifacts_output", "preprocessor.pkl"))
+    x = preprocessor.transform(train.drop(columns=["math_score"]))
+    y = train["math_score"].to_numpy()
+    models = {
+        "Random Forest": RandomForestRegressor(random_state=0),
+        "Gradient Boosting": GradientBoostingRegressor(random_state=0),
+        "AdaBoost": AdaBoostRegressor(random_state=0),
+        "Linear Regression": LinearRegression(),
+        "K-Nearest Neighbors": KNeighborsRegressor(),
+        "Decision Tree": DecisionTreeRegressor(random_state=0),
+    }
+    params = {
+        "Random Forest": {"n_estimators": [8, 16, 32]},
+        "Gradient Boosting": {"learning_rate": [.1, .05], "subsample": [0.7, 0.9], "n_estimators": [16, 64]},
+        "AdaBoost": {"learning_rate": [.1, .5], "n_estimators": [8, 32]},
+        "Linear Regression": {},
+        "K-Nearest Neighbors": {"n_neighbors": [3, 5, 9]},
+        "Decision Tree": {"criterion": ["squared_error", "friedman_mse"]},
+    }
+
+    start = time.perf_counter()
+    reference = {}
+    for name, model in models.items():
+        gs = GridSearchCV(model, params[name], cv=3).fit(x, y)
+        reference[name] = (gs.best_params_, gs.best_score_)
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    distributed = DistributedSearch(n_workers=n_workers)(models, params, x, y)
+    distributed_seconds = time.perf_counter() - start
+
+    identical = True
+    for name, (best_params, best_score) in reference.items():
+        other = distributed[name]
+        same = other["best_params"] == best_params and other["best_score"] == best_score
+        identical &= same
+        print(f"{name:<22} {'same' if same else 'DIFFERENT':<10} {best_params} {best_score:.6f} / "
+              f"{other['best_params']} {other['best_score']:.6f}")
+    print(f"GridSearchCV {single_seconds:.1f}s, {n_workers} queue workers {distributed_seconds:.1f}s, "
+          f"identical={identical}")
+    return identical
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distributed hyperparameter search workers")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    worker = subparsers.add_parser("worker", help="pull trials from a coordinator until the search ends")
+    worker.add_argument("--address", required=True, help="host:port of the coordinator")
+    worker.add_argument("--lease-seconds", type=float, default=DistributedSearch.lease_seconds)
+    check = subparsers.add_parser("check", help="compare a queue search with GridSearchCV")
+    check.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        authkey = _authkey()
+        if authkey is None:
+            parser.error("set HPARAM_SEARCH_AUTHKEY to the coordinator's key")
+        print(f"Completed {run_worker(_parse_address(args.address), authkey, args.lease_seconds)} trials")
+    else:
+        sys.exit(0 if _check_parity(args.workers) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,764 @@
+import sys, os
+import argparse
+import copy
+import hashlib
+import json
+import time
+from collections import Counter
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Optional
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+    from src.utils import load_obj, save_obj
+    from src.metrics import stage_timer
+    from src.Components.data_ingestion import DataIngestionConfig
+    from src.Components.data_transformation import DataTransformation, DataTransformation_Config
+    from src.Components.model_trainer import ModelTrainer, ModelTrainer_Config
+    from src.Pipeline.input_validator import save_input_schema
+    from src.Components.feature_views import CATEGORICAL_CODES, CategoricalCodesEncoder, current_feature_view
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Incremental retraining for appending a batch of labeled rows to the training history.
+#
+# The preprocessor's statistics are kept in mergeable form in `incremental_state.json`: count, mean
+# and M2 of every scaled column (merged with Chan et al.'s parallel update), the exact value counts
+# behind each median imputer, and the category counts behind the most-frequent imputers and the
+# one-hot scalers. A batch is merged into these and the preprocessor is rebuilt from them without
+# revisiting the history. The state is bootstrapped from `train.csv` whenever `preprocessor.pkl` is
+# not the one it describes, i.e. after every full retrain.
+#
+# Rescaling changes the model's input space, so the shipped model is first re-expressed in the new
+# one and then updated with the batch:
+#   - LinearRegression is solved exactly from mergeable sufficient statistics (X'X, X'y),
+#   - RandomForest gets extra trees fitted on the batch (warm start),
+#   - GradientBoosting gets extra boosting stages fitted on the batch's residuals (warm start),
+#   - XGBoost models get extra boosting rounds on the batch,
+#   - any other model is refitted with its tuned parameters on the history plus the batch.
+# Tree thresholds are moved so that every raw value seen in training goes down the same branch
+# under the new scaling as under the old one, so the existing trees predict exactly as before.
+#
+# A full retrain (new transformer fit, hyperparameter search, model selection) runs instead when
+# the batch brings a category the encoder does not know (the feature width changes), when the
+# current model's R2 on the batch holdout is more than `drift_threshold` below its R2 on the test
+# split, when the updated model does worse than that on the test split, or when the shipped model
+# is trained on the categorical codes view (see `feature_views`).
+#
+# Usage:
+#     python -m src.Components.incremental_training update new_rows.csv
+#     python -m src.Components.incremental_training check
+
+TARGET_COLUMN = "math_score"
+
+
+def _env_float(name, default):
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass
+class IncrementalTrainingConfig:
+    train_data_path: str = DataIngestionConfig.train_data_path
+    test_data_path: str = DataIngestionConfig.test_data_path
+    state_file_path: str = os.path.join("artifacts_output", "incremental_state.json")
+    update_log_path: str = os.path.join("artifacts_output", "incremental_updates.jsonl")
+    # Largest tolerated R2 drop before the incremental update is abandoned for a full retrain
+    drift_threshold: float = field(default_factory=lambda: _env_float("INCREMENTAL_DRIFT_THRESHOLD", 0.02))
+    # Part of each batch held out to measure drift (appended to the test split afterwards)
+    holdout_fraction: float = 0.2
+    min_holdout_rows: int = 50
+    random_state: int = 42
+
+
+def _merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """
+    Chan et al.'s pairwise update of count, mean and sum of squared deviations.
+    """
+    n = n_a + n_b
+    if n == 0:
+        return 0, mean_a, m2_a
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (n_b / n)
+    m2 = m2_a + m2_b + delta ** 2 * (n_a * n_b / n)
+    return n, mean, m2
+
+
+def _moments(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return 0, np.zeros(values.shape[1:]), np.zeros(values.shape[1:])
+    mean = values.mean(axis=0)
+    return len(values), mean, ((values - mean) ** 2).sum(axis=0)
+
+
+def _median(counts):
+    """
+    Exact median of a value -> count histogram (the mean of the two middle values for an even
+    total, as `np.median`).
+    """
+    values = np.array(sorted(counts))
+    cumulative = np.cumsum([counts[v] for v in values])
+    total = cumulative[-1]
+    lower = values[np.searchsorted(cumulative, (total - 1) // 2 + 1)]
+    upper = values[np.searchsorted(cumulative, total // 2 + 1)]
+    return (lower + upper) / 2
+
+
+def _most_frequent(counts):
+    # SimpleImputer breaks ties towards the smallest value
+    top = max(counts.values())
+    return min(value for value, count in counts.items() if count == top)
+
+
+def _scale(var):
+    scale = np.sqrt(var)
+    scale[scale == 0.0] = 1.0
+    return scale
+
+
+def _layout(preprocessor):
+    """
+    Splits the fitted ColumnTransformer into its numeric (imputer, scaler) and categorical
+    (imputer, one-hot encoder, scaler) pipelines.
+    """
+    numeric, categorical = [], []
+    for name, pipeline, columns in preprocessor.transformers_:
+        if name == "remainder":
+            continue
+        steps = dict(pipeline.steps)
+        if set(steps) == {"imputer", "scaler"} and steps["imputer"].strategy == "median":
+            numeric.append((name, list(columns)))
+        elif set(steps) == {"imputer", "encoder", "scaler"} and steps["imputer"].strategy == "most_frequent":
+            categorical.append((name, list(columns)))
+        else:
+            raise ValueError(f"Incremental updates do not support the '{name}' pipeline {list(steps)}")
+    return numeric, categorical
+
+
+class PreprocessorState:
+    """
+    Mergeable statistics of the preprocessor's imputers and scalers.
+    """
+
+    def __init__(self, numeric, categorical, n_rows):
+        # column -> {"values": Counter of observed values, "n"/"mean"/"m2" of the imputed column}
+        self.numeric = numeric
+        # column -> {"counts": Counter of observed categories, "encoded": counts after imputation}
+        self.categorical = categorical
+        self.n_rows = n_rows
+
+    @classmethod
+    def from_frame(cls, preprocessor, frame):
+        numeric_layout, categorical_layout = _layout(preprocessor)
+        state = cls({}, {}, 0)
+        for _, columns in numeric_layout:
+            for column in columns:
+                state.numeric[column] = {"values": Counter(), "n": 0, "mean": 0.0, "m2": 0.0}
+        for _, columns in categorical_layout:
+            for column in columns:
+                state.categorical[column] = {"counts": Counter(), "encoded": Counter()}
+        state.merge_frame(frame)
+        return state
+
+    def _numeric_fill(self, column):
+        return _median(self.numeric[column]["values"])
+
+    def _categorical_fill(self, column):
+        return _most_frequent(self.categorical[column]["counts"])
+
+    def merge_frame(self, frame):
+        """
+        Adds a batch of rows. Missing values count with the imputer value after the merge, which is
+        what a refit would fill them with; rows merged earlier keep the value of their time.
+        """
+        for column, stats in self.numeric.items():
+            values = pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64)
+            observed = values[~np.isnan(values)]
+            stats["values"].update(observed.tolist())
+            filled = np.where(np.isnan(values), self._numeric_fill(column), values)
+            stats["n"], stats["mean"], stats["m2"] = _merge_moments(
+                stats["n"], stats["mean"], stats["m2"], *_moments(filled))
+        for column, stats in self.categorical.items():
+            values = frame[column]
+            observed = values[values.notna()]
+            stats["counts"].update(observed.tolist())
+            stats["encoded"].update(observed.tolist())
+            n_missing = int(values.isna().sum())
+            if n_missing:
+                stats["encoded"][self._categorical_fill(column)] += n_missing
+        self.n_rows += len(frame)
+
+    def new_categories(self, preprocessor):
+        """
+        Categories seen in the merged data that the fitted encoder does not know, per column.
+        """
+        known = {}
+        _, categorical_layout = _layout(preprocessor)
+        for name, columns in categorical_layout:
+            encoder = preprocessor.named_transformers_[name].named_steps["encoder"]
+            for column, categories in zip(columns, encoder.categories_):
+                known[column] = set(categories)
+        return {column: sorted(set(stats["encoded"]) - known[column])
+                for column, stats in self.categorical.items() if set(stats["encoded"]) - known[column]}
+
+    def apply(self, preprocessor):
+        """
+        Returns a copy of the fitted preprocessor carrying the merged statistics. The encoder's
+        categories must already cover the merged data (see `new_categories`).
+        """
+        preprocessor = copy.deepcopy(preprocessor)
+        numeric_layout, categorical_layout = _layout(preprocessor)
+        for name, columns in numeric_layout:
+            steps = preprocessor.named_transformers_[name].named_steps
+            steps["imputer"].statistics_ = np.array([self._numeric_fill(c) for c in columns], dtype=np.float64)
+            n = np.array([self.numeric[c]["n"] for c in columns], dtype=np.int64)
+            mean = np.array([self.numeric[c]["mean"] for c in columns], dtype=np.float64)
+            var = np.array([self.numeric[c]["m2"] for c in columns], dtype=np.float64) / n
+            self._set_scaler(steps["scaler"], n, mean, var)
+        for name, columns in categorical_layout:
+            steps = preprocessor.named_transformers_[name].named_steps
+            steps["imputer"].statistics_ = np.array([self._categorical_fill(c) for c in columns], dtype=object)
+            # One-hot column of a category with share p: mean p, variance p(1 - p)
+            share = np.concatenate([
+                np.array([self.categorical[c]["encoded"][category] for category in categories], dtype=np.float64)
+                / self.n_rows
+                for c, categories in zip(columns, steps["encoder"].categories_)])
+            n = np.full(len(share), self.n_rows, dtype=np.int64)
+            self._set_scaler(steps["scaler"], n, share, share * (1.0 - share))
+        return preprocessor
+
+    @staticmethod
+    def _set_scaler(scaler, n, mean, var):
+        scaler.n_samples_seen_ = n if len(np.unique(n)) > 1 else int(n[0])
+        scaler.mean_ = mean
+        scaler.var_ = var
+        scaler.scale_ = _scale(var.copy())
+
+    def raw_values(self, preprocessor):
+        """
+        For every preprocessor output column, the distinct values it takes before scaling: the
+        observed values (and imputer value) of a numeric column, {0, 1} for a one-hot column.
+        """
+        numeric_layout, categorical_layout = _layout(preprocessor)
+        values = []
+        for name, columns in numeric_layout:
+            imputer = preprocessor.named_transformers_[name].named_steps["imputer"]
+            for column, fill in zip(columns, imputer.statistics_):
+                values.append(np.unique(np.append(np.array(list(self.numeric[column]["values"])), fill)))
+        for name, columns in categorical_layout:
+            encoder = preprocessor.named_transformers_[name].named_steps["encoder"]
+            values.extend(np.array([0.0, 1.0]) for categories in encoder.categories_ for _ in categories)
+        return values
+
+    def input_schema(self, input_features):
+        return {
+            "input_features": list(input_features),
+            "numeric": {column: {"min": float(min(stats["values"])), "max": float(max(stats["values"]))}
+                        for column, stats in self.numeric.items()},
+            "categorical": {column: sorted(stats["counts"]) for column, stats in self.categorical.items()},
+        }
+
+    def to_dict(self):
+        return {
+            "n_rows": self.n_rows,
+            "numeric": {column: {"values": [[v, n] for v, n in sorted(stats["values"].items())],
+                                 "n": stats["n"], "mean": stats["mean"], "m2": stats["m2"]}
+                        for column, stats in self.numeric.items()},
+            "categorical": {column: {"counts": dict(stats["counts"]), "encoded": dict(stats["encoded"])}
+                            for column, stats in self.categorical.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        numeric = {column: {"values": Counter({v: n for v, n in stats["values"]}), "n": stats["n"],
+                            "mean": stats["mean"], "m2": stats["m2"]}
+                   for column, stats in data["numeric"].items()}
+        categorical = {column: {"counts": Counter(stats["counts"]), "encoded": Counter(stats["encoded"])}
+                       for column, stats in data["categorical"].items()}
+        return cls(numeric, categorical, data["n_rows"])
+
+
+def _affine(preprocessor):
+    """
+    Per output column (offset, scale) with `output = (unscaled - offset) / scale`.
+    """
+    offsets, scales = [], []
+    numeric_layout, categorical_layout = _layout(preprocessor)
+    for name, _ in numeric_layout + categorical_layout:
+        scaler = preprocessor.named_transformers_[name].named_steps["scaler"]
+        offsets.append(scaler.mean_ if scaler.with_mean else np.zeros(len(scaler.scale_)))
+        scales.append(scaler.scale_)
+    return np.concatenate(offsets), np.concatenate(scales)
+
+
+class LinearState:
+    """
+    Mergeable sufficient statistics of a least-squares fit on the unscaled design matrix.
+    """
+
+    def __init__(self, n, sum_x, sum_xx, sum_y, sum_xy):
+        self.n, self.sum_x, self.sum_xx, self.sum_y, self.sum_xy = n, sum_x, sum_xx, sum_y, sum_xy
+
+    @classmethod
+    def from_design(cls, design, y):
+        return cls(len(y), design.sum(axis=0), design.T @ design, float(y.sum()), design.T @ y)
+
+    def merge(self, other):
+        return LinearState(self.n + other.n, self.sum_x + other.sum_x, self.sum_xx + other.sum_xx,
+                           self.sum_y + other.sum_y, self.sum_xy + other.sum_xy)
+
+    def solve(self, offset, scale):
+        """
+        Minimum-norm least-squares coefficients and intercept for inputs scaled as
+        `(unscaled - offset) / scale`; the same predictions as `LinearRegression` on the history.
+        """
+        mean_x, mean_y = self.sum_x / self.n, self.sum_y / self.n
+        gram = (self.sum_xx - self.n * np.outer(mean_x, mean_x)) / np.outer(scale, scale)
+        cross = (self.sum_xy - self.n * mean_x * mean_y) / scale
+        # The one-hot groups make the design collinear; the cutoff drops those exact null directions
+        coef = np.linalg.pinv(gram, rcond=1e-10, hermitian=True) @ cross
+        intercept = mean_y - ((mean_x - offset) / scale) @ coef
+        return coef, float(intercept)
+
+    def to_dict(self):
+        return {"n": self.n, "sum_x": self.sum_x.tolist(), "sum_xx": self.sum_xx.tolist(),
+                "sum_y": self.sum_y, "sum_xy": self.sum_xy.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["n"], np.array(data["sum_x"]), np.array(data["sum_xx"]), data["sum_y"],
+                   np.array(data["sum_xy"]))
+
+
+def unscaled_design(preprocessor, frame):
+    offset, scale = _affine(preprocessor)
+    return preprocessor.transform(frame) * scale + offset
+
+
+class ThresholdMap:
+    """
+    Moves split thresholds from one scaling of the features to another. A threshold is placed
+    halfway between the new images of the last raw value that went left and the first that went
+    right, so every raw value seen in training takes the same branch as before; thresholds outside
+    the observed range are mapped affinely.
+    """
+
+    def __init__(self, old_preprocessor, new_preprocessor, raw_values):
+        old_offset, old_scale = _affine(old_preprocessor)
+        new_offset, new_scale = _affine(new_preprocessor)
+        self.slope = old_scale / new_scale
+        self.intercept = (old_offset - new_offset) / new_scale
+        # Trees compare float32 features, as both sklearn and XGBoost cast their input
+        self.old_values = [((v - o) / s).astype(np.float32).astype(np.float64)
+                           for v, o, s in zip(raw_values, old_offset, old_scale)]
+        self.new_values = [((v - o) / s).astype(np.float32).astype(np.float64)
+                           for v, o, s in zip(raw_values, new_offset, new_scale)]
+
+    def remap(self, thresholds, features, strict=False):
+        """
+        :param strict: Splits send `x < threshold` left (XGBoost) instead of `x <= threshold`
+            (sklearn).
+        :return: New thresholds (float32-representable when strict).
+        """
+        thresholds = np.asarray(thresholds, dtype=np.float32 if strict else np.float64).astype(np.float64)
+        features = np.asarray(features)
+        out = thresholds * self.slope[features] + self.intercept[features]
+        for feature in np.unique(features):
+            at = np.flatnonzero(features == feature)
+            old, new = self.old_values[feature], self.new_values[feature]
+            n_left = np.searchsorted(old, thresholds[at], side="left" if strict else "right")
+            inside = (n_left > 0) & (n_left < len(old))
+            lower, upper = new[n_left[inside] - 1], new[n_left[inside]]
+            middle = (lower + upper) / 2
+            if strict:
+                middle = middle.astype(np.float32)
+                middle = np.where(middle <= lower, np.nextafter(lower.astype(np.float32), np.float32(np.inf)), middle)
+            out[at[inside]] = middle
+        return out.astype(np.float32) if strict else out
+
+
+@dataclass
+class _UpdateContext:
+    threshold_map: ThresholdMap
+    x_batch: np.ndarray
+    y_batch: np.ndarray
+    n_history: int
+    linear_state: LinearState
+    offset: np.ndarray
+    scale: np.ndarray
+    refit_history: Callable
+
+
+def _extra_estimators(n_estimators, ctx):
+    # Extra members in proportion to the batch's share of the data
+    return max(1, int(round(n_estimators * len(ctx.y_batch) / ctx.n_history)))
+
+
+def _remap_trees(trees, threshold_map):
+    for tree in trees:
+        nodes = tree.tree_
+        internal = nodes.children_left != -1
+        nodes.threshold[internal] = threshold_map.remap(nodes.threshold[internal], nodes.feature[internal])
+
+
+def _update_linear(model, ctx):
+    model.coef_, model.intercept_ = ctx.linear_state.solve(ctx.offset, ctx.scale)
+    return "sufficient statistics"
+
+
+def _update_forest(model, ctx):
+    remap_model(model, ctx.threshold_map)
+    n_estimators = model.n_estimators
+    model.set_params(warm_start=True, n_estimators=n_estimators + _extra_estimators(n_estimators, ctx))
+    model.fit(ctx.x_batch, ctx.y_batch)
+    model.set_params(warm_start=False)
+    return "warm start"
+
+
+def _update_gradient_boosting(model, ctx):
+    remap_model(model, ctx.threshold_map)
+    n_estimators = model.n_estimators
+    model.set_params(warm_start=True, n_estimators=n_estimators + _extra_estimators(n_estimators, ctx))
+    model.fit(ctx.x_batch, ctx.y_batch)
+    model.set_params(warm_start=False)
+    return "warm start"
+
+
+def _remap_xgboost(booster, threshold_map):
+    dump = json.loads(booster.save_raw("json"))
+    for tree in dump["learner"]["gradient_booster"]["model"]["trees"]:
+        # Leaves keep their value in split_conditions too
+        internal = np.flatnonzero(np.array(tree["left_children"]) != -1)
+        conditions = np.array(tree["split_conditions"], dtype=np.float64)
+        features = np.array(tree["split_indices"])[internal]
+        conditions[internal] = threshold_map.remap(conditions[internal], features, strict=True)
+        tree["split_conditions"] = conditions.tolist()
+    booster.load_model(bytearray(json.dumps(dump).encode()))
+
+
+def remap_model(model, threshold_map):
+    """
+    Re-expresses a fitted tree model for new feature scaling, in place.
+    """
+    if isinstance(model, (RandomForestRegressor, GradientBoostingRegressor)):
+        _remap_trees(np.ravel(model.estimators_), threshold_map)
+    else:
+        _remap_xgboost(model.get_booster(), threshold_map)
+
+
+def _update_xgboost(model, ctx):
+    from xgboost import XGBRFRegressor
+
+    remap_model(model, ctx.threshold_map)
+    booster = model.get_booster()
+    if isinstance(model, XGBRFRegressor):
+        # n_estimators is the forest size here; every fit adds one forest
+        model.fit(ctx.x_batch, ctx.y_batch, xgb_model=booster)
+        return "extra boosting rounds"
+    rounds = booster.num_boosted_rounds()
+    model.set_params(n_estimators=_extra_estimators(rounds, ctx))
+    model.fit(ctx.x_batch, ctx.y_batch, xgb_model=booster)
+    model.set_params(n_estimators=model.get_booster().num_boosted_rounds())
+    return "extra boosting rounds"
+
+
+def _updater(model):
+    if type(model) is LinearRegression:
+        return _update_linear
+    if isinstance(model, RandomForestRegressor):
+        return _update_forest
+    if isinstance(model, GradientBoostingRegressor):
+        return _update_gradient_boosting
+    try:
+        from xgboost import XGBModel
+        if isinstance(model, XGBModel):
+            return _update_xgboost
+    except ImportError:
+        pass
+    return None
+
+
+def update_model(model, ctx):
+    """
+    Updates the shipped model in place for the new preprocessor and the batch.
+
+    :return: How it was updated.
+    """
+    updater = _updater(model)
+    if updater is None:
+        x_history, y_history = ctx.refit_history()
+        model.fit(x_history, y_history)
+        return "refit"
+    return updater(model, ctx)
+
+
+@dataclass
+class IncrementalUpdate:
+    mode: str
+    reason: Optional[str]
+    batch_rows: int
+    dropped_rows: int
+    model: str
+    method: Optional[str]
+    baseline_r2: float
+    holdout_r2: Optional[float]
+    updated_r2: Optional[float]
+    new_categories: dict
+    seconds: float
+
+
+def _file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IncrementalTrainer:
+    def __init__(self, config=None):
+        self.config = config or IncrementalTrainingConfig()
+        self.model_path = ModelTrainer_Config.train_model_file_path
+        self.preprocessor_path = DataTransformation_Config.preprocessor_object_file_path
+        self.schema_path = DataTransformation_Config.input_schema_file_path
+
+    def _clean_batch(self, batch, columns):
+        """
+        Drops rows without a numeric target or with non-numeric scores (missing scores are kept;
+        the imputer fills them).
+        """
+        keep = pd.to_numeric(batch[TARGET_COLUMN], errors="coerce").notna()
+        for column in columns:
+            values = pd.to_numeric(batch[column], errors="coerce")
+            keep &= values.notna() | batch[column].isna()
+            batch[column] = values
+        batch[TARGET_COLUMN] = pd.to_numeric(batch[TARGET_COLUMN], errors="coerce")
+        return batch[keep].reset_index(drop=True), int((~keep).sum())
+
+    def load_state(self, preprocessor, history):
+        """
+        Returns (PreprocessorState, LinearState) for the current preprocessor, bootstrapped from
+        the training history when the saved state belongs to another preprocessor.
+        """
+        digest = _file_sha256(self.preprocessor_path)
+        if os.path.exists(self.config.state_file_path):
+            with open(self.config.state_file_path) as f:
+                saved = json.load(f)
+            if saved.get("preprocessor_sha256") == digest:
+                return PreprocessorState.from_dict(saved["preprocessor"]), LinearState.from_dict(saved["linear"])
+        logging.info("Bootstrapping incremental state from the training history")
+        features = history.drop(columns=[TARGET_COLUMN])
+        state = PreprocessorState.from_frame(preprocessor, features)
+        linear = LinearState.from_design(unscaled_design(preprocessor, features), history[TARGET_COLUMN].to_numpy())
+        return state, linear
+
+    def save_state(self, state, linear):
+        tmp_path = self.config.state_file_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"preprocessor_sha256": _file_sha256(self.preprocessor_path),
+                       "preprocessor": state.to_dict(), "linear": linear.to_dict()}, f)
+        os.replace(tmp_path, self.config.state_file_path)
+
+    def _append_history(self, update_rows, holdout_rows, columns):
+        update_rows[columns].to_csv(self.config.train_data_path, mode="a", header=False, index=False)
+        if len(holdout_rows):
+            holdout_rows[columns].to_csv(self.config.test_data_path, mode="a", header=False, index=False)
+
+    def full_retrain(self):
+        transformation = DataTransformation()
+        train_arr, test_arr, _ = transformation.initiate_data_transformer(
+            self.config.train_data_path, self.config.test_data_path)
+        if os.path.exists(self.config.state_file_path):
+            os.remove(self.config.state_file_path)
+        return ModelTrainer().initiate_model_trainer(train_arr, test_arr)
+
+    def update(self, batch):
+        """
+        Appends a batch of labeled rows and updates the shipped preprocessor and model.
+
+        :param batch: DataFrame or CSV path with the input features and `math_score`.
+        :return: An `IncrementalUpdate` summary (also appended to `incremental_updates.jsonl`).
+        """
+        try:
+            start = time.perf_counter()
+            config = self.config
+            history = pd.read_csv(config.train_data_path)
+            test = pd.read_csv(config.test_data_path)
+            columns = list(history.columns)
+            batch = pd.read_csv(batch) if isinstance(batch, str) else batch.copy()
+            missing = set(columns) - set(batch.columns)
+            if missing:
+                raise ValueError(f"Batch is missing columns {sorted(missing)}")
+
+            preprocessor = load_obj(self.preprocessor_path)
+            model = load_obj(self.model_path)
+            numeric_columns = [c for _, cols in _layout(preprocessor)[0] for c in cols]
+            batch, dropped = self._clean_batch(batch[columns], numeric_columns)
+            if batch.empty:
+                raise ValueError("Batch has no usable rows")
+
+            n_holdout = int(len(batch) * config.holdout_fraction)
+            if n_holdout >= config.min_holdout_rows:
+                holdout_rows = batch.sample(n_holdout, random_state=config.random_state)
+                update_rows = batch.drop(index=holdout_rows.index)
+            else:
+                holdout_rows, update_rows = batch.iloc[:0], batch
+
+            def features(frame):
+                return frame.drop(columns=[TARGET_COLUMN])
+
+            codes_view = None
+            if current_feature_view(ModelTrainer_Config.model_meta_file_path, self.model_path) == CATEGORICAL_CODES:
+                codes_view = CategoricalCodesEncoder.from_preprocessor(preprocessor)
+
+            def score(estimator, transformer, frame):
+                x = transformer.transform(features(frame))
+                if codes_view is not None:
+                    x = codes_view.from_onehot(x)
+                return float(r2_score(frame[TARGET_COLUMN], estimator.predict(x)))
+
+            baseline_r2 = score(model, preprocessor, test)
+            holdout_r2 = score(model, preprocessor, holdout_rows) if len(holdout_rows) else None
+
+            with stage_timer("training", "incremental.merge_statistics"):
+                state, linear = self.load_state(preprocessor, history)
+                state.merge_frame(features(update_rows))
+                new_categories = state.new_categories(preprocessor)
+
+            summary = IncrementalUpdate(mode="incremental", reason=None, batch_rows=len(batch), dropped_rows=dropped,
+                                        model=type(model).__name__, method=None, baseline_r2=baseline_r2,
+                                        holdout_r2=holdout_r2, updated_r2=None, new_categories=new_categories,
+                                        seconds=0.0)
+            if new_categories:
+                summary.reason = f"new categories {new_categories}"
+            elif holdout_r2 is not None and baseline_r2 - holdout_r2 > config.drift_threshold:
+                summary.reason = f"holdout R2 {holdout_r2:.4f} is {baseline_r2 - holdout_r2:.4f} below test R2"
+            elif codes_view is not None:
+                summary.reason = "the model is trained on the categorical codes view"
+
+            if summary.reason is None:
+                with stage_timer("training", "incremental.update_model"):
+                    new_preprocessor = state.apply(preprocessor)
+                    linear = linear.merge(LinearState.from_design(
+                        unscaled_design(preprocessor, features(update_rows)), update_rows[TARGET_COLUMN].to_numpy()))
+                    offset, scale = _affine(new_preprocessor)
+
+                    def refit_history():
+                        combined = pd.concat([history, update_rows], ignore_index=True)
+                        return new_preprocessor.transform(features(combined)), combined[TARGET_COLUMN].to_numpy()
+
+                    ctx = _UpdateContext(
+                        threshold_map=ThresholdMap(preprocessor, new_preprocessor, state.raw_values(new_preprocessor)),
+                        x_batch=new_preprocessor.transform(features(update_rows)),
+                        y_batch=update_rows[TARGET_COLUMN].to_numpy(), n_history=len(history),
+                        linear_state=linear, offset=offset, scale=scale, refit_history=refit_history)
+                    summary.method = update_model(model, ctx)
+                summary.updated_r2 = score(model, new_preprocessor, test)
+                if summary.updated_r2 < baseline_r2 - config.drift_threshold:
+                    summary.reason = (f"updated model's test R2 {summary.updated_r2:.4f} is more than "
+                                      f"{config.drift_threshold} below {baseline_r2:.4f}")
+
+            self._append_history(update_rows, holdout_rows, columns)
+            if summary.reason is not None:
+                logging.info(f"Full retrain: {summary.reason}")
+                summary.mode = "full"
+                summary.updated_r2 = float(self.full_retrain())
+            else:
+                save_obj(self.preprocessor_path, new_preprocessor)
+                save_obj(self.model_path, model)
+                save_input_schema(self.schema_path, state.input_schema(new_preprocessor.feature_names_in_))
+                self.save_state(state, linear)
+                ModelTrainer().save_compiled_model(model, new_preprocessor.transform(features(test)))
+                logging.info(f"Incrementally updated {summary.model} ({summary.method}) with {len(update_rows)} rows")
+
+            summary.seconds = time.perf_counter() - start
+            with open(config.update_log_path, "a") as f:
+                f.write(json.dumps({"finished_at": time.time(), **asdict(summary)}) + "\n")
+            return summary
+
+        except Exception as e:
+            logging.error("Error in incremental training", exc_info=True)
+            raise customExceptionHandler(e) from None
+
+
+def check():
+    """
+    Checks on the shipped artifacts, without writing anything:
+      1. the preprocessor rebuilt from statistics of train.csv matches the fitted one,
+      2. tree models re-expressed for new statistics predict exactly as before,
+      3. the sufficient-statistics linear update matches LinearRegression refitted on all rows.
+    """
+    from xgboost import XGBRegressor, XGBRFRegressor
+
+    preprocessor = load_obj(DataTransformation_Config.preprocessor_object_file_path)
+    history = pd.read_csv(DataIngestionConfig.train_data_path)
+    batch = pd.read_csv(DataIngestionConfig.test_data_path)
+    x_history, x_batch = history.drop(columns=[TARGET_COLUMN]), batch.drop(columns=[TARGET_COLUMN])
+    y_history, y_batch = history[TARGET_COLUMN].to_numpy(), batch[TARGET_COLUMN].to_numpy()
+
+    state = PreprocessorState.from_frame(preprocessor, x_history)
+    rebuilt = state.apply(preprocessor)
+    print(f"rebuilt preprocessor max |diff|: "
+          f"{np.abs(rebuilt.transform(x_batch) - preprocessor.transform(x_batch)).max():.3g}")
+
+    state.merge_frame(x_batch)
+    updated = state.apply(preprocessor)
+    combined = pd.concat([x_history, x_batch], ignore_index=True)
+    threshold_map = ThresholdMap(preprocessor, updated, state.raw_values(updated))
+    x_old, x_new = preprocessor.transform(combined), updated.transform(combined)
+    fitted = {
+        "RandomForestRegressor": RandomForestRegressor(n_estimators=32, random_state=0),
+        "GradientBoostingRegressor": GradientBoostingRegressor(n_estimators=64, random_state=0),
+        "XGBRegressor": XGBRegressor(n_estimators=64),
+        "XGBRFRegressor": XGBRFRegressor(n_estimators=32),
+    }
+    for name, model in fitted.items():
+        model.fit(preprocessor.transform(x_history), y_history)
+        before = model.predict(x_old)
+        remap_model(model, threshold_map)
+        print(f"{name:<26} remapped max |diff|: {np.abs(model.predict(x_new) - before).max():.3g}")
+
+    linear = LinearState.from_design(unscaled_design(preprocessor, x_history), y_history)
+    linear = linear.merge(LinearState.from_design(unscaled_design(preprocessor, x_batch), y_batch))
+    coef, intercept = linear.solve(*_affine(updated))
+    # LinearRegression's own fit carries rounding noise from its huge collinear coefficients, so the
+    # reference is a least-squares solve that drops the null directions
+    y_all = np.concatenate([y_history, y_batch])
+    centered = x_new - x_new.mean(axis=0)
+    reference = np.linalg.lstsq(centered, y_all - y_all.mean(), rcond=1e-10)[0]
+    print(f"{'LinearRegression':<26} update vs refit max |diff|: "
+          f"{np.abs(x_new @ coef + intercept - (centered @ reference + y_all.mean())).max():.3g}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incremental retraining with new labeled rows")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    update = subparsers.add_parser("update", help="append a CSV of labeled rows and update the artifacts")
+    update.add_argument("batch", help="CSV with the input features and math_score")
+    update.add_argument("--drift-threshold", type=float, default=None)
+    subparsers.add_parser("check", help="verify the statistics rebuild and model re-expression")
+    args = parser.parse_args(argv)
+
+    if args.command == "check":
+        check()
+        return
+    config = IncrementalTrainingConfig()
+    if args.drift_threshold is not None:
+        config.drift_threshold = args.drift_threshold
+    print(json.dumps(asdict(IncrementalTrainer(config).update(args.batch)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import sys, os
+import json
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Optional
+import dill
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+    from src.Components.tree_compiler import compile_model
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Leaderboard of the tuned candidate models with what they cost to train and to serve, and the
+# policy that picks the model to ship from it. Latency is measured on the form the model is served
+# in: tree ensembles through their compiled arrays (see `ModelTrainer.save_compiled_model`), every
+# other model through its own `predict`. Models trained on the categorical codes view (see
+# `feature_views`) are measured on that view and listed next to their one-hot variant.
+
+
+def _env_optional_float(name):
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else None
+
+
+@dataclass
+class SelectionPolicy:
+    """
+    Chooses the model to ship from the leaderboard.
+
+    Models that break a limit are dropped, then every remaining model whose R2 is within
+    `r2_tolerance` of the best remaining one is a candidate, and the candidate with the lowest
+    single-row p99 latency wins. The defaults (no tolerance, no limits) pick the top R2.
+
+    :param min_r2: Minimum test R2 of the shipped model.
+    :param r2_tolerance: R2 a model may give up for being cheaper to serve.
+    :param max_p99_latency_ms: Limit on single-row predict p99 latency.
+    :param max_batch_p99_latency_ms: Limit on the p99 latency of predicting one batch.
+    :param max_artifact_mb: Limit on the pickled model size.
+    """
+    min_r2: float = 0.7
+    r2_tolerance: float = 0.0
+    max_p99_latency_ms: Optional[float] = None
+    max_batch_p99_latency_ms: Optional[float] = None
+    max_artifact_mb: Optional[float] = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Reads MODEL_SELECTION_MIN_R2, MODEL_SELECTION_R2_TOLERANCE, MODEL_SELECTION_MAX_P99_MS,
+        MODEL_SELECTION_MAX_BATCH_P99_MS and MODEL_SELECTION_MAX_ARTIFACT_MB.
+        """
+        policy = cls()
+        min_r2 = _env_optional_float("MODEL_SELECTION_MIN_R2")
+        tolerance = _env_optional_float("MODEL_SELECTION_R2_TOLERANCE")
+        if min_r2 is not None:
+            policy.min_r2 = min_r2
+        if tolerance is not None:
+            policy.r2_tolerance = tolerance
+        policy.max_p99_latency_ms = _env_optional_float("MODEL_SELECTION_MAX_P99_MS")
+        policy.max_batch_p99_latency_ms = _env_optional_float("MODEL_SELECTION_MAX_BATCH_P99_MS")
+        policy.max_artifact_mb = _env_optional_float("MODEL_SELECTION_MAX_ARTIFACT_MB")
+        return policy
+
+    def violations(self, entry):
+        reasons = []
+        if entry.test_r2 < self.min_r2:
+            reasons.append(f"R2 {entry.test_r2:.4f} < {self.min_r2}")
+        if self.max_p99_latency_ms is not None and entry.single_p99_ms > self.max_p99_latency_ms:
+            reasons.append(f"single-row p99 {entry.single_p99_ms:.3f} ms > {self.max_p99_latency_ms} ms")
+        if self.max_batch_p99_latency_ms is not None and entry.batch_p99_ms > self.max_batch_p99_latency_ms:
+            reasons.append(f"batch p99 {entry.batch_p99_ms:.3f} ms > {self.max_batch_p99_latency_ms} ms")
+        if self.max_artifact_mb is not None and entry.artifact_bytes > self.max_artifact_mb * 2**20:
+            reasons.append(f"artifact {entry.artifact_bytes / 2**20:.2f} MiB > {self.max_artifact_mb} MiB")
+        return reasons
+
+    def select(self, entries):
+        """
+        :param entries: `LeaderboardEntry` list.
+        :return: The chosen entry; raises ValueError when no model satisfies the policy.
+        """
+        feasible = []
+        for entry in entries:
+            reasons = self.violations(entry)
+            entry.rejected = "; ".join(reasons) or None
+            if not reasons:
+                feasible.append(entry)
+        if not feasible:
+            raise ValueError("No model satisfies the selection policy: "
+                             + ", ".join(f"{e.model_name} ({e.rejected})" for e in entries))
+        top_r2 = max(entry.test_r2 for entry in feasible)
+        candidates = [entry for entry in feasible if entry.test_r2 >= top_r2 - self.r2_tolerance]
+        # Highest R2 breaks ties between equally fast models
+        return min(candidates, key=lambda entry: (entry.single_p99_ms, -entry.test_r2))
+
+
+@dataclass
+class LeaderboardEntry:
+    model_name: str
+    test_r2: float
+    train_r2: float
+    cv_r2: Optional[float]
+    best_params: dict
+    fit_seconds: float
+    serving_form: str
+    single_p50_ms: float
+    single_p99_ms: float
+    batch_rows: int
+    batch_p50_ms: float
+    batch_p99_ms: float
+    artifact_bytes: int
+    predict_peak_memory_bytes: int
+    feature_view: str = "onehot"
+    # Size of the training feature matrix the model was fitted on
+    train_matrix_bytes: Optional[int] = None
+    selected: bool = False
+    rejected: Optional[str] = None
+
+
+def serving_form(model):
+    """
+    Returns what `PredictionPipeline` will run for this model: the compiled ensemble for tree
+    ensembles with more than one tree, otherwise the model itself.
+    """
+    compiled = compile_model(model)
+    if compiled is not None and compiled.n_trees > 1:
+        return compiled, "compiled"
+    return model, "native"
+
+
+def _latency_ms(predict, X, repeats):
+    predict(X)  # warm-up
+    timings = np.empty(repeats)
+    for i in range(repeats):
+        start = time.perf_counter()
+        predict(X)
+        timings[i] = time.perf_counter() - start
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+
+def _peak_predict_memory(predict, X):
+    """
+    Peak Python/numpy allocations while predicting `X` (C-level library buffers are not seen).
+    """
+    tracemalloc.start()
+    try:
+        predict(X)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure_model(model_name, model, x_test, y_test_r2, details, single_repeats=200, batch_repeats=20,
+                  feature_view="onehot"):
+    """
+    Measures the serving cost of one fitted model.
+
+    :param x_test: Feature matrix in the model's feature view; its first row is the single-row
+        input and the whole matrix the batch input.
+    :param y_test_r2: The model's test R2 from `evaluate_models`.
+    :param details: The model's entry from the `details` of `evaluate_models`.
+    """
+    served, form = serving_form(model)
+    single_p50, single_p99 = _latency_ms(served.predict, x_test[:1], single_repeats)
+    batch_p50, batch_p99 = _latency_ms(served.predict, x_test, batch_repeats)
+    return LeaderboardEntry(
+        model_name=model_name,
+        test_r2=float(y_test_r2),
+        train_r2=float(details.get("train_r2", float("nan"))),
+        cv_r2=details.get("cv_r2"),
+        best_params=details.get("best_params", {}),
+        fit_seconds=float(details.get("fit_seconds", float("nan"))),
+        serving_form=form,
+        single_p50_ms=float(single_p50),
+        single_p99_ms=float(single_p99),
+        batch_rows=int(x_test.shape[0]),
+        batch_p50_ms=float(batch_p50),
+        batch_p99_ms=float(batch_p99),
+        artifact_bytes=len(dill.dumps(model)),
+        predict_peak_memory_bytes=int(_peak_predict_memory(served.predict, x_test)),
+        feature_view=feature_view,
+        train_matrix_bytes=details.get("train_matrix_bytes"),
+    )
+
+
+def build_leaderboard(models, model_report, details, x_test, feature_views=None):
+    """
+    :param models: The fitted models passed to `evaluate_models`.
+    :param model_report: Test R2 per model name, as returned by `evaluate_models`.
+    :param details: The `details` filled in by `evaluate_models`.
+    :param x_test: The one-hot test matrix.
+    :param feature_views: Model name -> (view name, test matrix in that view) for models not
+        trained on the one-hot matrix.
+    :return: `LeaderboardEntry` list sorted by test R2, best first.
+    """
+    try:
+        feature_views = feature_views or {}
+        entries = []
+        for name, score in model_report.items():
+            view, x_view = feature_views.get(name, ("onehot", x_test))
+            entries.append(measure_model(name, models[name], x_view, score, details.get(name, {}), feature_view=view))
+        return sorted(entries, key=lambda entry: entry.test_r2, reverse=True)
+
+    except Exception as e:
+        logging.error("Error in building the model leaderboard", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def save_leaderboard(file_path, entries, policy):
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump({"policy": asdict(policy), "models": [asdict(entry) for entry in entries]},
+                      f, indent=2, default=str)
+
+    except Exception as e:
+        logging.error("Error in saving the model leaderboard", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def format_leaderboard(entries):
+    """
+    Fixed-width text table of the leaderboard for logs and the console.
+    """
+    header = (f"{'model':<36}{'view':<19}{'test R2':>9}{'fit s':>9}{'train KiB':>11}{'1-row p99 ms':>14}"
+              f"{'batch p99 ms':>14}{'size KiB':>11}{'peak KiB':>10}  status")
+    lines = [header]
+    for e in entries:
+        status = "selected" if e.selected else (f"rejected: {e.rejected}" if e.rejected else "")
+        train_kib = f"{e.train_matrix_bytes / 1024:.1f}" if e.train_matrix_bytes is not None else "-"
+        lines.append(f"{e.model_name:<36}{e.feature_view:<19}{e.test_r2:>9.4f}{e.fit_seconds:>9.2f}{train_kib:>11}"
+                     f"{e.single_p99_ms:>14.3f}"
+                     f"{e.batch_p99_ms:>14.3f}{e.artifact_bytes / 1024:>11.1f}"
+                     f"{e.predict_peak_memory_bytes / 1024:>10.1f}  {status}")
+    return "\n".join(lines)
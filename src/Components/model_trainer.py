@@ -1,11 +1,10 @@
 import sys, os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from catboost import CatBoostRegressor
 from sklearn.ensemble import (AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor)
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
-from sklearn.neighbors import KNeighborsRegressor
 from sklearn.tree import DecisionTreeRegressor
 from xgboost import XGBRFRegressor
 
@@ -15,7 +14,16 @@ sys.path.append(PROJECT_ROOT)
 try:
     from src.exception import customExceptionHandler
     from src.logger import logging
-    from src.utils import save_obj, evaluate_models
+    from src.utils import load_obj, evaluate_models
+    from src.metrics import stage_timer
+    from src.Components.tree_compiler import compile_model, save_compiled, verify_parity
+    from src.Components.hyperparameter_search import DistributedSearch
+    from src.Components.trial_store import TrialStore
+    from src.Components.leaderboard import SelectionPolicy, build_leaderboard, save_leaderboard, format_leaderboard
+    from src.Components.data_transformation import DataTransformation_Config
+    from src.Components.knn_index import IndexedKNeighborsRegressor
+    from src.Components.feature_views import (ONEHOT, CATEGORICAL_CODES, CategoricalCodesEncoder,
+                                              native_categorical_model, save_model_with_meta)
 except ImportError as e:
     print(f"Error importing local modules: {e}")
     print(f"Current sys.path: {sys.path}")
@@ -27,6 +35,23 @@ except ImportError as e:
 # model will be saved.
 class ModelTrainer_Config:
     train_model_file_path = os.path.join("artifacts_output", "model.pkl")
+    compiled_model_file_path = os.path.join("artifacts_output", "model_compiled.npz")
+    leaderboard_file_path = os.path.join("artifacts_output", "leaderboard.json")
+    # Feature view of the shipped model, read by PredictionPipeline to encode inputs the same way
+    model_meta_file_path = os.path.join("artifacts_output", "model_meta.json")
+    # Memory-mapped neighbor index of a shipped K-Nearest Neighbors model
+    knn_index_dir = os.path.join("artifacts_output", "knn_index")
+    # How the shipped model is chosen from the leaderboard; MODEL_SELECTION_* env vars override it
+    selection_policy: SelectionPolicy = field(default_factory=SelectionPolicy.from_env)
+    # Work-queue search across processes/hosts when HPARAM_SEARCH_WORKERS or _ADDRESS is set
+    search: DistributedSearch = field(default_factory=DistributedSearch.from_env)
+    # Finished CV trials are kept here so a rerun skips them; TRIAL_STORE_PATH="" turns it off
+    trial_store_path: str = field(default_factory=lambda: os.getenv(
+        "TRIAL_STORE_PATH", os.path.join("artifacts_output", "trials.sqlite")))
+    # Models also trained on the categorical codes view, as "<name> (native categorical)";
+    # comma-separated, "" turns it off. "XGBoost" adds XGBoost's experimental categorical mode.
+    native_categorical_models: list = field(default_factory=lambda: [
+        name.strip() for name in os.getenv("NATIVE_CATEGORICAL_MODELS", "CatBoosting").split(",") if name.strip()])
 
 class ModelTrainer:
     def __init__(self):
@@ -36,7 +61,38 @@ class ModelTrainer:
         """
         self.model_trainer_config = ModelTrainer_Config()
 
-    def initiate_model_trainer(self, train_array, test_array):
+    def native_views(self, models, params, preprocessor, x_train, x_test):
+        """
+        Native categorical variants of the models named in `native_categorical_models`, with their
+        codes-view training and test matrices.
+
+        :return: (models, params, x_train, x_test) for the codes view; empty when disabled or the
+            preprocessor layout is not supported.
+        """
+        names = [name for name in self.model_trainer_config.native_categorical_models if name in models]
+        if not names:
+            return {}, {}, None, None
+        if preprocessor is None:
+            preprocessor_path = DataTransformation_Config.preprocessor_object_file_path
+            if not os.path.exists(preprocessor_path):
+                logging.warning("No preprocessor to derive the categorical codes view from")
+                return {}, {}, None, None
+            preprocessor = load_obj(preprocessor_path)
+        try:
+            view = CategoricalCodesEncoder.from_preprocessor(preprocessor)
+        except ValueError as e:
+            logging.warning(f"No categorical codes view for this preprocessor: {e}")
+            return {}, {}, None, None
+
+        native_models, native_params = {}, {}
+        for name in names:
+            model = native_categorical_model(name, models[name], view)
+            if model is not None:
+                native_models[f"{name} (native categorical)"] = model
+                native_params[f"{name} (native categorical)"] = params[name]
+        return native_models, native_params, view.from_onehot(x_train), view.from_onehot(x_test)
+
+    def initiate_model_trainer(self, train_array, test_array, preprocessor=None):
         """
         The function `initiate_model_trainer` trains multiple regression models, evaluates their
         performance, selects the best model based on a threshold score, saves the best model, and
@@ -49,6 +105,9 @@ class ModelTrainer:
         to hold the test data for evaluating the trained models. It is expected to be a 2D numpy array
         where each row represents a sample and each column represents a feature or the target variable.
         The last column
+        :param preprocessor: The fitted preprocessor the arrays come from, used to build the
+        categorical codes view for native categorical models; loaded from `preprocessor.pkl` when
+        not given.
         :return: The function `initiate_model_trainer` returns the R2 score calculated based on the best
         model found during training.
         """
@@ -72,7 +131,7 @@ class ModelTrainer:
                 "Gradient Boosting": GradientBoostingRegressor(),
                 "AdaBoost": AdaBoostRegressor(),
                 "Linear Regression": LinearRegression(),
-                "K-Nearest Neighbors": KNeighborsRegressor(),
+                "K-Nearest Neighbors": IndexedKNeighborsRegressor(),
                 "Decision Tree": DecisionTreeRegressor(),
                 "XGBoost": XGBRFRegressor(),
                 "CatBoosting": CatBoostRegressor(verbose=False),
@@ -98,16 +157,21 @@ class ModelTrainer:
                     'n_estimators': [8,16,32,64,128,256]
                 },
                 "Linear Regression":{},
-                "XGBRegressor":{
+                "K-Nearest Neighbors":{
+                    # below 5k training rows (min_index_rows) each fit is a plain KNeighborsRegressor;
+                    # larger sets rebuild the neighbor index on every fit
+                    'n_neighbors': [5,10,20]
+                },
+                "XGBoost":{
                     'learning_rate':[.1,.01,.05,.001],
                     'n_estimators': [8,16,32,64,128,256]
                 },
-                "CatBoosting Regressor":{
+                "CatBoosting":{
                     'depth': [6,8,10],
                     'learning_rate': [0.01, 0.05, 0.1],
                     'iterations': [30, 50, 100]
                 },
-                "AdaBoost Regressor":{
+                "AdaBoost":{
                     'learning_rate':[.1,.01,0.5,.001],
                     # 'loss':['linear','square','exponential'],
                     'n_estimators': [8,16,32,64,128,256]
@@ -116,24 +180,61 @@ class ModelTrainer:
             }
 
             # Ensure evaluate_models returns a valid dictionary
-            model_report = evaluate_models(x_train=x_train, y_train=y_train, x_test=x_test, y_test=y_test, models=models, params=params)
-        
+            details = {}
+            config = self.model_trainer_config
+            trial_store = TrialStore(config.trial_store_path) if config.trial_store_path else None
+            native_models, native_params, x_train_codes, x_test_codes = self.native_views(
+                models, params, preprocessor, x_train, x_test)
+            with stage_timer("training", "trainer.evaluate_models"):
+                model_report = evaluate_models(x_train=x_train, y_train=y_train, x_test=x_test, y_test=y_test, models=models, params=params, details=details, searcher=config.search, trial_store=trial_store)
+            for name in models:
+                details[name]["train_matrix_bytes"] = x_train.nbytes
+            if native_models:
+                # Same search and refit on the compact codes view, reported as separate rows
+                with stage_timer("training", "trainer.evaluate_native_categorical"):
+                    model_report.update(evaluate_models(x_train=x_train_codes, y_train=y_train, x_test=x_test_codes, y_test=y_test, models=native_models, params=native_params, details=details, searcher=config.search, trial_store=trial_store))
+                for name in native_models:
+                    details[name]["train_matrix_bytes"] = x_train_codes.nbytes
+                models = {**models, **native_models}
+            feature_views = {name: (CATEGORICAL_CODES, x_test_codes) for name in native_models}
+
+            # Measure what every tuned model costs to serve and pick one under the selection policy
+            with stage_timer("training", "trainer.leaderboard"):
+                leaderboard = build_leaderboard(models, model_report, details, x_test, feature_views)
+            policy = self.model_trainer_config.selection_policy
+            best_entry, rejection = None, None
+            try:
+                best_entry = policy.select(leaderboard)
+                best_entry.selected = True
+            except ValueError as e:
+                rejection = str(e)
+            save_leaderboard(self.model_trainer_config.leaderboard_file_path, leaderboard, policy)
+            logging.info("Model leaderboard:\n" + format_leaderboard(leaderboard))
+            if best_entry is None:
+                raise customExceptionHandler(f"No best model found. {rejection}")
 
-            # Get the best model based on the score
-            best_model_score = max(model_report.values())
-            best_model_name = list(model_report.keys())[list(model_report.values()).index(best_model_score)]
+            best_model_name = best_entry.model_name
+            best_model_score = best_entry.test_r2
             best_model = models[best_model_name]
+            best_view, x_test_best = feature_views.get(best_model_name, (ONEHOT, x_test))
 
-            if best_model_score < 0.7:
-                raise customExceptionHandler("No best model found. Best model score is below 0.7 threshold.")
-            
             logging.info(f"Best model found: {best_model_name} with score {best_model_score}")
 
-            # Save the best model
-            save_obj(file_path=self.model_trainer_config.train_model_file_path, obj=best_model)
+            # Save the best model together with the meta file naming its feature view
+            with stage_timer("training", "trainer.save_model"):
+                if isinstance(best_model, IndexedKNeighborsRegressor):
+                    # Saved first so the pickle references the index files instead of holding it
+                    best_model.save_index(self.model_trainer_config.knn_index_dir)
+                save_model_with_meta(self.model_trainer_config.train_model_file_path, best_model,
+                                     {"model_name": best_model_name, "feature_view": best_view,
+                                      "test_r2": float(best_model_score)},
+                                     self.model_trainer_config.model_meta_file_path)
+
+            with stage_timer("training", "trainer.compile_model"):
+                self.save_compiled_model(best_model, x_test_best)
 
             # Predict and calculate R2 score
-            predicted = best_model.predict(x_test)
+            predicted = best_model.predict(x_test_best)
             r2_square = r2_score(y_test, predicted)
 
             return r2_square
@@ -142,3 +243,23 @@ class ModelTrainer:
             logging.error(f"Error occurred while training models: {e}")
             raise customExceptionHandler(e, sys)
 
+    def save_compiled_model(self, model, x_check):
+        """
+        Saves the array-compiled form of a tree ensemble next to `model.pkl` so `PredictionPipeline`
+        can skip the library's predict path. Non-tree models and single trees (where the library is
+        already faster) remove any stale compiled file instead.
+
+        :param model: The fitted best model.
+        :param x_check: Feature matrix used to confirm the compiled predictions match the model's.
+        """
+        compiled_path = self.model_trainer_config.compiled_model_file_path
+        compiled = compile_model(model)
+        if compiled is not None and compiled.n_trees > 1:
+            _, max_diff = verify_parity(model, x_check, compiled)
+            if max_diff <= 1e-9:
+                save_compiled(compiled_path, compiled)
+                logging.info(f"Saved compiled {compiled.source} with {compiled.n_trees} trees")
+                return
+            logging.warning(f"Compiled model differs from {compiled.source} by {max_diff}, not saving it")
+        if os.path.exists(compiled_path):
+            os.remove(compiled_path)
@@ -0,0 +1,386 @@
+import sys, os
+import json
+import tempfile
+import numpy as np
+from sklearn.dummy import DummyRegressor
+from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Flattens the fitted trees of the tree-based candidates in `ModelTrainer` (Decision Tree, Random
+# Forest, Gradient Boosting, AdaBoost, XGBoost and CatBoost) into contiguous node arrays
+# (feature, threshold, left, right, value). `CompiledTreeEnsemble.predict` then walks every tree for
+# the whole batch at once with vectorized numpy indexing instead of going through the library's
+# per-call dispatch, input validation and per-tree Python loops.
+
+
+class CompiledTreeEnsemble:
+    """
+    Array form of a fitted tree ensemble.
+
+    Nodes of all trees are stored back to back and `roots[t]` is the index of tree t's root. A
+    sample goes to `left` when `x[feature] <= threshold` (or `<` when `strict` is set, as in
+    XGBoost) and to `right` otherwise. Leaves point to themselves (`left == right == own index`), so
+    prediction runs a fixed `max_depth` steps without masking and needs no extra arrays.
+
+    :param aggregation: How per-tree leaf values are combined: "sum" (base + sum of scale * leaf),
+        "scaled_sum" (base + scale * sum of leaves, CatBoost), "mean" or "weighted_median" (AdaBoost).
+    """
+
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots", "tree_weights")
+    __slots__ = ARRAYS + ("max_depth", "aggregation", "base", "scale", "strict", "accumulate_dtype", "source")
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, aggregation,
+                 base=0.0, scale=1.0, tree_weights=None, strict=False, accumulate_dtype="float64",
+                 source=""):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.aggregation = aggregation
+        self.base = float(base)
+        self.scale = float(scale)
+        self.tree_weights = tree_weights if tree_weights is not None else np.ones(len(roots))
+        self.strict = bool(strict)
+        self.accumulate_dtype = accumulate_dtype
+        self.source = source
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def leaf_values(self, X):
+        """
+        Returns the leaf value reached in every tree, shape (n_samples, n_trees).
+        """
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        # Both sklearn and the boosting libraries compare float32 features against the thresholds
+        X = np.asarray(X, dtype=np.float32)
+        n_samples = X.shape[0]
+        node = np.tile(self.roots, (n_samples, 1))
+        rows = np.arange(n_samples)[:, None]
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            threshold = self.threshold[node]
+            go_left = x < threshold if self.strict else x <= threshold
+            node = np.where(go_left, self.left[node], self.right[node])
+        # Compact ensembles store leaf values in the (otherwise unused) leaf thresholds
+        values = self.threshold if self.value is None else self.value
+        return values[node]
+
+    def predict(self, X):
+        leaves = self.leaf_values(X)
+        if self.aggregation == "weighted_median":
+            # Same steps as AdaBoostRegressor._get_median_predict
+            sorted_idx = np.argsort(leaves, axis=1)
+            weight_cdf = np.cumsum(self.tree_weights[sorted_idx], axis=1, dtype=np.float64)
+            median_or_above = weight_cdf >= 0.5 * weight_cdf[:, -1][:, np.newaxis]
+            median_idx = median_or_above.argmax(axis=1)
+            median_estimators = sorted_idx[np.arange(leaves.shape[0]), median_idx]
+            return leaves[np.arange(leaves.shape[0]), median_estimators]
+
+        # Accumulate tree by tree, in the libraries' order and precision, to keep parity. cumsum
+        # is a sequential left fold (unlike np.sum's pairwise summation).
+        dtype = np.dtype(self.accumulate_dtype)
+        leaves = leaves.astype(dtype, copy=False)
+        if self.aggregation == "mean":
+            return (np.cumsum(leaves, axis=1, dtype=dtype)[:, -1] / self.n_trees).astype(np.float64)
+        if self.aggregation == "scaled_sum":
+            # CatBoost: bias + scale * sum of leaves
+            total = np.cumsum(leaves, axis=1, dtype=dtype)[:, -1]
+            return (dtype.type(self.base) + dtype.type(self.scale) * total).astype(np.float64)
+        if self.scale != 1.0:
+            leaves = dtype.type(self.scale) * leaves
+        terms = np.empty((leaves.shape[0], self.n_trees + 1), dtype=dtype)
+        terms[:, 0] = self.base
+        terms[:, 1:] = leaves
+        return np.cumsum(terms, axis=1, dtype=dtype)[:, -1].astype(np.float64)
+
+
+class _TreeBuilder:
+    """
+    Accumulates trees node by node into flat lists.
+    """
+
+    def __init__(self):
+        self.feature, self.threshold, self.left, self.right, self.value = [], [], [], [], []
+        self.roots = []
+        self.max_depth = 0
+
+    def add_arrays(self, feature, threshold, left, right, value):
+        """
+        Appends one tree given in the library's layout, where leaves have negative children.
+        """
+        offset = len(self.feature)
+        left, right = np.asarray(left), np.asarray(right)
+        leaf = left < 0
+        index = np.arange(offset, offset + len(left))
+        self.roots.append(offset)
+        self.feature.extend(np.where(leaf, 0, feature).tolist())
+        self.threshold.extend(np.where(leaf, 0.0, np.asarray(threshold, dtype=np.float64)).tolist())
+        self.left.extend(np.where(leaf, index, left + offset).tolist())
+        self.right.extend(np.where(leaf, index, right + offset).tolist())
+        self.value.extend(np.where(leaf, np.asarray(value, dtype=np.float64), 0.0).tolist())
+        self.max_depth = max(self.max_depth, _depth(left, right))
+
+    def build(self, **kwargs):
+        return CompiledTreeEnsemble(
+            feature=np.asarray(self.feature, dtype=np.int32),
+            threshold=np.asarray(self.threshold, dtype=np.float64),
+            left=np.asarray(self.left, dtype=np.int32),
+            right=np.asarray(self.right, dtype=np.int32),
+            value=np.asarray(self.value, dtype=np.float64),
+            roots=np.asarray(self.roots, dtype=np.int32),
+            max_depth=self.max_depth,
+            **kwargs,
+        )
+
+
+def _depth(left, right):
+    depth, frontier = 0, [0]
+    while frontier:
+        children = [c for n in frontier for c in (left[n], right[n]) if c >= 0]
+        if not children:
+            break
+        depth += 1
+        frontier = children
+    return depth
+
+
+def _add_sklearn_tree(builder, estimator):
+    tree = estimator.tree_
+    builder.add_arrays(tree.feature, tree.threshold, tree.children_left, tree.children_right,
+                       tree.value[:, 0, 0])
+
+
+def _compile_decision_tree(model):
+    builder = _TreeBuilder()
+    _add_sklearn_tree(builder, model)
+    return builder.build(aggregation="sum", source="DecisionTreeRegressor")
+
+
+def _compile_random_forest(model):
+    builder = _TreeBuilder()
+    for estimator in model.estimators_:
+        _add_sklearn_tree(builder, estimator)
+    return builder.build(aggregation="mean", source="RandomForestRegressor")
+
+
+def _compile_gradient_boosting(model):
+    builder = _TreeBuilder()
+    for stage in model.estimators_[:, 0]:
+        _add_sklearn_tree(builder, stage)
+    if model.init_ == "zero":
+        base = 0.0
+    elif isinstance(model.init_, DummyRegressor):
+        base = float(np.ravel(model.init_.constant_)[0])
+    else:
+        raise ValueError("Gradient boosting can only be compiled with the default (DummyRegressor) or zero init")
+    return builder.build(aggregation="sum", base=base, scale=model.learning_rate,
+                         source="GradientBoostingRegressor")
+
+
+def _compile_adaboost(model):
+    builder = _TreeBuilder()
+    for estimator in model.estimators_:
+        if not isinstance(estimator, DecisionTreeRegressor):
+            raise ValueError("AdaBoost can only be compiled with decision tree base estimators")
+        _add_sklearn_tree(builder, estimator)
+    weights = np.asarray(model.estimator_weights_[:len(model.estimators_)], dtype=np.float64)
+    return builder.build(aggregation="weighted_median", tree_weights=weights, source="AdaBoostRegressor")
+
+
+def _compile_xgboost(model):
+    booster = model.get_booster()
+    dump = json.loads(booster.save_raw(raw_format="json"))
+    learner = dump["learner"]
+    if learner["gradient_booster"].get("name", "gbtree") != "gbtree":
+        raise ValueError("Only gbtree XGBoost models can be compiled")
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+    builder = _TreeBuilder()
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        if any(tree.get("split_type", [])):
+            raise ValueError("Only XGBoost models with numeric splits can be compiled")
+        # The JSON holds the shortest decimal form of float32 values; round back to float32 so
+        # thresholds compare exactly as in XGBoost. Leaves keep their (already learning-rate
+        # scaled) weight in split_conditions.
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        builder.add_arrays(tree["split_indices"], conditions, tree["left_children"],
+                           tree["right_children"], conditions)
+    return builder.build(aggregation="sum", base=base_score, strict=True, accumulate_dtype="float32",
+                         source=type(model).__name__)
+
+
+def _compile_catboost(model):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.json")
+        model.save_model(path, format="json")
+        with open(path) as f:
+            dump = json.load(f)
+
+    float_features = dump["features_info"].get("float_features", [])
+    flat_index = {f["feature_index"]: f["flat_feature_index"] for f in float_features}
+    scale, bias = dump["scale_and_bias"]
+    bias = float(np.ravel(bias)[0])
+
+    builder = _TreeBuilder()
+    for tree in dump["oblivious_trees"]:
+        splits = tree["splits"]
+        if any(s["split_type"] != "FloatFeature" for s in splits):
+            raise ValueError("Only CatBoost models over float features can be compiled")
+        depth = len(splits)
+        # Expand the oblivious tree into a full binary tree. Split j sets bit j of the leaf index
+        # when x > border, i.e. the sample goes right.
+        n_internal = 2 ** depth - 1
+        feature = np.full(2 * n_internal + 1, -1)
+        threshold = np.zeros(2 * n_internal + 1)
+        left = np.full(2 * n_internal + 1, -1)
+        right = np.full(2 * n_internal + 1, -1)
+        value = np.zeros(2 * n_internal + 1)
+        leaf_values = tree["leaf_values"]
+        for node in range(2 * n_internal + 1):
+            level = int(np.floor(np.log2(node + 1)))
+            position = node + 1 - 2 ** level  # bits chosen so far, most recent split last
+            if level < depth:
+                split = splits[level]
+                feature[node] = flat_index[split["float_feature_index"]]
+                threshold[node] = split["border"]
+                left[node], right[node] = 2 * node + 1, 2 * node + 2
+            else:
+                leaf_index = sum(((position >> (depth - 1 - j)) & 1) << j for j in range(depth))
+                value[node] = leaf_values[leaf_index]
+        builder.add_arrays(feature, threshold, left, right, value)
+    return builder.build(aggregation="scaled_sum", base=bias, scale=scale, source="CatBoostRegressor")
+
+
+def compile_model(model):
+    """
+    Compiles a fitted model into a `CompiledTreeEnsemble`.
+
+    :param model: A fitted estimator from the `models` dict in `ModelTrainer`.
+    :return: The compiled ensemble, or None when the model is not tree based (Linear Regression,
+        K-Nearest Neighbors).
+    """
+    try:
+        if isinstance(model, RandomForestRegressor):
+            return _compile_random_forest(model)
+        if isinstance(model, GradientBoostingRegressor):
+            return _compile_gradient_boosting(model)
+        if isinstance(model, AdaBoostRegressor):
+            return _compile_adaboost(model)
+        if isinstance(model, DecisionTreeRegressor):
+            return _compile_decision_tree(model)
+        module = type(model).__module__
+        if module.startswith("xgboost"):
+            return _compile_xgboost(model)
+        if module.startswith("catboost"):
+            return _compile_catboost(model)
+        return None
+    except ValueError as e:
+        logging.warning(f"Model {type(model).__name__} could not be compiled: {e}")
+        return None
+
+
+def save_compiled(file_path, compiled):
+    """
+    Saves a compiled ensemble as an uncompressed .npz archive.
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        meta = {
+            "max_depth": compiled.max_depth, "aggregation": compiled.aggregation, "base": compiled.base,
+            "scale": compiled.scale, "strict": compiled.strict,
+            "accumulate_dtype": compiled.accumulate_dtype, "source": compiled.source,
+        }
+        arrays = {name: getattr(compiled, name) for name in CompiledTreeEnsemble.ARRAYS
+                  if getattr(compiled, name) is not None}
+        with open(file_path, "wb") as file_obj:
+            np.savez(file_obj, meta=np.array(json.dumps(meta)), **arrays)
+
+    except Exception as e:
+        logging.error("Error in saving compiled model", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def load_compiled(file_path):
+    """
+    Loads an ensemble written by `save_compiled`.
+    """
+    try:
+        with np.load(file_path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {name: data[name] if name in data.files else None for name in CompiledTreeEnsemble.ARRAYS}
+        return CompiledTreeEnsemble(**arrays, **meta)
+
+    except Exception as e:
+        logging.error("Error in loading compiled model", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def verify_parity(model, X, compiled=None):
+    """
+    Compares the library's predictions with the compiled ones.
+
+    :return: Tuple (bit_identical, max_abs_difference).
+    """
+    compiled = compiled or compile_model(model)
+    expected = np.asarray(model.predict(X), dtype=np.float64)
+    actual = compiled.predict(X)
+    return bool(np.array_equal(expected, actual)), float(np.max(np.abs(expected - actual)))
+
+
+# Parity and latency check for every supported model type on the project's data:
+#     python src/Components/tree_compiler.py
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+    from catboost import CatBoostRegressor
+    from xgboost import XGBRFRegressor, XGBRegressor
+    from src.utils import load_obj
+
+    preprocessor = load_obj(os.path.join("artifacts_output", "preprocessor.pkl"))
+    train = pd.read_csv(os.path.join("artifacts_output", "train.csv"))
+    test = pd.read_csv(os.path.join("artifacts_output", "test.csv"))
+    x_train = preprocessor.transform(train.drop(columns=["math_score"]))
+    x_test = preprocessor.transform(test.drop(columns=["math_score"]))
+    y_train = train["math_score"]
+
+    candidates = {
+        "Decision Tree": DecisionTreeRegressor(),
+        "Random Forest": RandomForestRegressor(n_estimators=128),
+        "Gradient Boosting": GradientBoostingRegressor(n_estimators=128, subsample=0.8),
+        "AdaBoost": AdaBoostRegressor(n_estimators=64),
+        "XGBoost": XGBRFRegressor(n_estimators=64),
+        "XGBRegressor": XGBRegressor(n_estimators=64),
+        "CatBoosting": CatBoostRegressor(iterations=100, depth=6, verbose=False),
+    }
+    for name, model in candidates.items():
+        model.fit(x_train, y_train)
+        compiled = compile_model(model)
+        identical, max_diff = verify_parity(model, x_test, compiled)
+        row = x_test[:1]
+        start = time.perf_counter()
+        for _ in range(200):
+            model.predict(row)
+        library = (time.perf_counter() - start) / 200
+        start = time.perf_counter()
+        for _ in range(200):
+            compiled.predict(row)
+        flat = (time.perf_counter() - start) / 200
+        print(f"{name:18s} identical={identical!s:5s} max_abs_diff={max_diff:.3g} "
+              f"single-row latency {library * 1e6:8.1f}us -> {flat * 1e6:8.1f}us")
@@ -0,0 +1,154 @@
+import sys, os
+import hashlib
+import json
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# SQLite store of hyperparameter-search trials. Every finished fold is written as soon as it
+# completes, keyed by the training data's fingerprint, the model name, the base estimator's own
+# settings, the parameter combination and the fold. A search that was interrupted picks up where it
+# stopped, and a search over an extended grid only runs the new combinations. Trials that raised
+# are stored for inspection but run again next time.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    fingerprint TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    estimator TEXT NOT NULL,
+    params TEXT NOT NULL,
+    n_splits INTEGER NOT NULL,
+    fold INTEGER NOT NULL,
+    score REAL,
+    fit_seconds REAL,
+    worker TEXT,
+    error TEXT,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (fingerprint, model_name, estimator, params, n_splits, fold)
+)
+"""
+
+
+def _canonical(obj):
+    return json.dumps(obj, sort_keys=True, default=repr)
+
+
+def dataset_fingerprint(x, y):
+    """
+    SHA-256 of the training matrix and target (shape, dtype and bytes).
+    """
+    digest = hashlib.sha256()
+    for array in (x, y):
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.shape}|{array.dtype.str}|".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def estimator_key(estimator):
+    """
+    Class and explicitly configured parameters of the base estimator, so that reconfiguring a base
+    estimator (e.g. a fixed CatBoost `depth`) does not reuse scores of the old configuration.
+    """
+    cls = type(estimator)
+    return f"{cls.__module__}.{cls.__qualname__}{_canonical(estimator.get_params(deep=False))}"
+
+
+class TrialStore:
+    """
+    :param path: SQLite database file; created (with its directory) when missing.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(_SCHEMA)
+        except Exception as e:
+            logging.error("Error in opening the trial store", exc_info=True)
+            raise customExceptionHandler(e) from None
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(trial, estimator, n_splits):
+        return (trial.model_name, estimator_key(estimator), _canonical(trial.params), n_splits, trial.fold)
+
+    def lookup(self, fingerprint, trials, models, n_splits):
+        """
+        :return: trial_id -> (score, fit_seconds) for the trials already finished without error.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT model_name, estimator, params, n_splits, fold, score, fit_seconds FROM trials "
+                "WHERE fingerprint = ? AND error IS NULL", (fingerprint,)).fetchall()
+        stored = {tuple(row[:5]): row[5:] for row in rows}
+        found = {}
+        for trial in trials:
+            row = stored.get(self._key(trial, models[trial.model_name], n_splits))
+            if row is not None:
+                score, fit_seconds = row
+                found[trial.trial_id] = (float("nan") if score is None else score, fit_seconds)
+        return found
+
+    def record(self, fingerprint, entries, n_splits):
+        """
+        Writes finished trials in one transaction.
+
+        :param entries: Iterable of (trial, estimator, result) with `TrialResult`-like results.
+        """
+        rows = []
+        for trial, estimator, result in entries:
+            score = None if result.score is None or np.isnan(result.score) else result.score
+            rows.append((fingerprint, *self._key(trial, estimator, n_splits), score, result.fit_seconds,
+                         result.worker or socket.gethostname(), result.error, time.time()))
+        if not rows:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO trials (fingerprint, model_name, estimator, params, n_splits, fold, "
+                "score, fit_seconds, worker, error, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def summary(self):
+        """
+        Trial counts per dataset fingerprint and model.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT fingerprint, model_name, COUNT(*), SUM(error IS NOT NULL), SUM(fit_seconds) "
+                "FROM trials GROUP BY fingerprint, model_name ORDER BY fingerprint, model_name").fetchall()
+        return [{"fingerprint": f[:12], "model_name": m, "trials": n, "failed": failed, "fit_seconds": seconds}
+                for f, m, n, failed, seconds in rows]
+
+
+# Summary of the default store:
+#     python src/Components/trial_store.py [path]
+if __name__ == "__main__":
+    store_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join("artifacts_output", "trials.sqlite")
+    for entry in TrialStore(store_path).summary():
+        print(entry)
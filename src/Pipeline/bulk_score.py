@@ -0,0 +1,316 @@
+import sys, os
+import argparse
+import json
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging
+    from src.Pipeline.predict_pipeline import PredictionPipeline, PredictionPipelineConfig
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Offline scoring of large CSV or Parquet files. The parent process reads the input in chunks and
+# hands them to a pool of worker processes, each of which loads the model and preprocessor once (in
+# the pool initializer) and validates, encodes and predicts whole chunks. Results are written in
+# input order as each chunk finishes; at most `max_pending` chunks are in flight, so memory does not
+# grow with the file.
+#
+# After every written chunk the output is fsynced and `<output>.progress` records how many rows and
+# bytes are done. An interrupted run started again with the same arguments and model artifacts
+# truncates the output to the last recorded chunk and continues from the next row. The progress file
+# is removed once the whole input is scored.
+#
+# Usage:
+#     python -m src.Pipeline.bulk_score score exports/students.csv exports/scored.csv --workers 4
+
+
+@dataclass
+class BulkScoreConfig:
+    chunk_rows: int = 100_000
+    workers: int = os.cpu_count() or 1
+    # Chunks read ahead of the writer; bounds memory at roughly max_pending * chunk size
+    max_pending: int = 0
+    # Copy the input columns into the output next to the prediction
+    include_input: bool = False
+    report_every_seconds: float = 10.0
+    prediction_config: PredictionPipelineConfig = field(default_factory=PredictionPipelineConfig)
+
+    def __post_init__(self):
+        if self.max_pending <= 0:
+            self.max_pending = 2 * max(self.workers, 1)
+
+
+# Set in each worker process by `_init_worker`
+_PIPELINE = None
+
+
+def _init_worker(prediction_config):
+    global _PIPELINE
+    _PIPELINE = PredictionPipeline(prediction_config)
+    # Load the artifacts and the input schema now rather than inside the first chunk
+    _PIPELINE.load_artifacts()
+    _PIPELINE.validator()
+
+
+def _init_pool_worker(prediction_config):
+    # Ctrl-C reaches the whole process group; the parent decides how the pool shuts down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_worker(prediction_config)
+
+
+def _format_errors(result, n_rows):
+    errors = np.full(n_rows, "", dtype=object)
+    for entry in result.row_errors():
+        errors[entry["row"]] = "; ".join(f"{column}: {reason}" for column, reason in entry["errors"].items())
+    return errors
+
+
+def score_chunk(frame, include_input=False):
+    """
+    Validates and scores one chunk in the current worker.
+
+    :param frame: DataFrame holding the input features.
+    :return: (CSV text of the chunk without header, rows, invalid rows).
+    """
+    pipeline = _PIPELINE or PredictionPipeline()
+    columns = {column: frame[column].to_numpy() for column in pipeline.validator().input_features
+               if column in frame}
+    predictions, result = pipeline.score_columns(columns)
+    output = frame.reset_index(drop=True) if include_input else pd.DataFrame(index=range(len(frame)))
+    output["prediction"] = predictions
+    output["error"] = _format_errors(result, len(frame))
+    return output.to_csv(header=False, index=False), result.n_rows, result.n_invalid
+
+
+def _output_header(input_path, include_input):
+    columns = list(_read_columns(input_path)) if include_input else []
+    return pd.DataFrame(columns=columns + ["prediction", "error"]).to_csv(index=False)
+
+
+def _is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+
+def _read_columns(input_path):
+    if _is_parquet(input_path):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(input_path).schema_arrow.names
+    return pd.read_csv(input_path, nrows=0).columns
+
+
+def iter_chunks(input_path, chunk_rows, skip_rows=0):
+    """
+    Yields DataFrames of at most `chunk_rows` rows, starting after the first `skip_rows` data rows.
+    Parquet input needs pyarrow.
+    """
+    if _is_parquet(input_path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Scoring Parquet files needs pyarrow (pip install pyarrow)") from None
+        for batch in pq.ParquetFile(input_path).iter_batches(batch_size=chunk_rows):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            frame = batch.to_pandas()
+            yield frame.iloc[skip_rows:] if skip_rows else frame
+            skip_rows = 0
+        return
+    # Row 0 is the header; skipped data rows are dropped by the parser without being converted
+    skip = (lambda row: 0 < row <= skip_rows) if skip_rows else None
+    yield from pd.read_csv(input_path, chunksize=chunk_rows, skiprows=skip)
+
+
+class ProgressFile:
+    """
+    Records how far an output file is complete, for resuming an interrupted run.
+    """
+
+    def __init__(self, output_path):
+        self.path = output_path + ".progress"
+
+    @staticmethod
+    def _artifact_stat(path):
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    @staticmethod
+    def signature(input_path, config):
+        """
+        Identifies a run by its input, options and the artifacts it is scored with, so a resume
+        after a retrain or re-export is refused instead of mixing two models in one output.
+        """
+        stat = os.stat(input_path)
+        prediction_config = config.prediction_config
+        artifacts = {name: ProgressFile._artifact_stat(getattr(prediction_config, name))
+                     for name in ("model_path", "preprocessor_path", "model_meta_path", "input_schema_path",
+                                  "compiled_model_path", "compact_model_path", "compact_preprocessor_path")}
+        return {"input": os.path.abspath(input_path), "input_bytes": stat.st_size,
+                "input_mtime_ns": stat.st_mtime_ns, "include_input": config.include_input,
+                "artifacts": artifacts}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def save(self, state):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class ScoreSummary:
+    rows: int
+    invalid_rows: int
+    resumed_rows: int
+    seconds: float
+    rows_per_second: float
+
+
+def _open_output(input_path, output_path, config, progress, restart):
+    """
+    Opens the output for appending, positioned after the last complete chunk of a previous run.
+
+    :return: (file object, progress state).
+    """
+    signature = ProgressFile.signature(input_path, config)
+    state = None if restart else progress.load()
+    if state is not None and state.get("signature") != signature:
+        raise ValueError(
+            f"{progress.path} belongs to a different input, options or model artifacts; pass --restart to score from scratch")
+    if state is None and not restart and os.path.exists(output_path):
+        raise FileExistsError(f"{output_path} already exists; pass --restart to overwrite it")
+
+    if state is None:
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        out = open(output_path, "w", newline="")
+        out.write(_output_header(input_path, config.include_input))
+        out.flush()
+        state = {"signature": signature, "rows": 0, "invalid_rows": 0, "output_bytes": out.tell()}
+        progress.save(state)
+        return out, state
+
+    # Drop anything written after the last recorded chunk
+    out = open(output_path, "r+", newline="")
+    out.truncate(state["output_bytes"])
+    out.seek(state["output_bytes"])
+    logging.info(f"Resuming {output_path} after {state['rows']} rows")
+    return out, state
+
+
+def score_file(input_path, output_path, config=None, restart=False):
+    """
+    Scores every row of `input_path` into `output_path` (CSV with `prediction` and `error`
+    columns; invalid rows have an empty prediction and the failed checks in `error`).
+
+    :param restart: Ignore the progress of a previous run and overwrite the output.
+    :return: A `ScoreSummary`.
+    """
+    config = config or BulkScoreConfig()
+    progress = ProgressFile(output_path)
+    try:
+        out, state = _open_output(input_path, output_path, config, progress, restart)
+        resumed_rows = state["rows"]
+        start = last_report = time.perf_counter()
+
+        def write(text, n_rows, n_invalid):
+            nonlocal last_report
+            out.write(text)
+            out.flush()
+            os.fsync(out.fileno())
+            state["rows"] += n_rows
+            state["invalid_rows"] += n_invalid
+            state["output_bytes"] = out.tell()
+            progress.save(state)
+            now = time.perf_counter()
+            if now - last_report >= config.report_every_seconds:
+                last_report = now
+                done = state["rows"] - resumed_rows
+                logging.info(f"Scored {state['rows']} rows ({done / (now - start):,.0f} rows/s)")
+
+        chunks = iter_chunks(input_path, config.chunk_rows, skip_rows=resumed_rows)
+        with out:
+            if config.workers <= 1:
+                _init_worker(config.prediction_config)
+                for frame in chunks:
+                    write(*score_chunk(frame, config.include_input))
+            else:
+                with ProcessPoolExecutor(config.workers, initializer=_init_pool_worker,
+                                         initargs=(config.prediction_config,)) as pool:
+                    pending = deque()
+                    try:
+                        for frame in chunks:
+                            pending.append(pool.submit(score_chunk, frame, config.include_input))
+                            # Write finished chunks in input order before reading further ahead
+                            while pending and (len(pending) >= config.max_pending or pending[0].done()):
+                                write(*pending.popleft().result())
+                        while pending:
+                            write(*pending.popleft().result())
+                    except BaseException:
+                        for future in pending:
+                            future.cancel()
+                        raise
+
+        progress.remove()
+        seconds = time.perf_counter() - start
+        scored = state["rows"] - resumed_rows
+        summary = ScoreSummary(rows=state["rows"], invalid_rows=state["invalid_rows"], resumed_rows=resumed_rows,
+                               seconds=seconds, rows_per_second=scored / seconds if seconds > 0 else 0.0)
+        logging.info(f"Bulk scoring finished: {asdict(summary)}")
+        return summary
+
+    except Exception as e:
+        logging.error("Error in bulk scoring", exc_info=True)
+        raise customExceptionHandler(e) from None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline bulk scoring of CSV/Parquet files")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    score = subparsers.add_parser("score", help="score a file into a CSV of predictions")
+    score.add_argument("input", help="CSV file, or Parquet (.parquet/.pq) when pyarrow is installed")
+    score.add_argument("output", help="CSV file to write; resumed when <output>.progress exists")
+    score.add_argument("--workers", type=int, default=BulkScoreConfig.workers)
+    score.add_argument("--chunk-rows", type=int, default=BulkScoreConfig.chunk_rows)
+    score.add_argument("--max-pending", type=int, default=0, help="chunks in flight (default 2 x workers)")
+    score.add_argument("--include-input", action="store_true", help="copy the input columns into the output")
+    score.add_argument("--restart", action="store_true", help="ignore previous progress and overwrite the output")
+    args = parser.parse_args(argv)
+
+    # Stop like Ctrl-C on SIGTERM so the pool's workers are shut down with the parent
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    config = BulkScoreConfig(chunk_rows=args.chunk_rows, workers=args.workers, max_pending=args.max_pending,
+                             include_input=args.include_input)
+    summary = score_file(args.input, args.output, config, restart=args.restart)
+    print(f"{summary.rows:,} rows ({summary.invalid_rows:,} invalid) in {summary.seconds:.1f}s, "
+          f"{summary.rows_per_second:,.0f} rows/s"
+          + (f", resumed after {summary.resumed_rows:,} rows" if summary.resumed_rows else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import sys, os
+import json
+import struct
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+# Binary column batches for `POST /predict/batch`, chosen by the request's Content-Type:
+#   application/x-numpy-columns          the format below, needs only numpy
+#   application/vnd.apache.arrow.stream  Arrow IPC stream, when pyarrow is installed
+# The response uses the request's format.
+#
+# `application/x-numpy-columns` layout (all integers little-endian):
+#   8 bytes   magic b"NPCOLS\0" followed by the version byte (1)
+#   4 bytes   length of the JSON header
+#   header    {"n_rows": n, "columns": [{"name", "dtype", "offset", "nbytes"[, "levels"]}],
+#              "metadata": {...}}, padded with spaces to a multiple of 8 bytes
+#   buffers   one raw array per column at its `offset` from the end of the header, 8-byte aligned
+# Numeric columns are plain arrays ("<f8", "<i1", ...). Categorical columns are integer codes into
+# their `levels`, with -1 for a missing value. Decoding wraps the request bytes with
+# `np.frombuffer`, so numeric columns reach `PredictionPipeline` without being copied and
+# categorical columns become `pd.Categorical` whose levels are looked up once rather than per row.
+
+NUMPY_COLUMNS = "application/x-numpy-columns"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+MEDIA_TYPES = (NUMPY_COLUMNS, ARROW_STREAM)
+
+MAGIC = b"NPCOLS\0\x01"
+_ALIGNMENT = 8
+# Raw buffers are only ever read as numbers: object and string dtypes are refused
+_BUFFER_KINDS = "biuf"
+
+
+def _aligned(n):
+    return -(-n // _ALIGNMENT) * _ALIGNMENT
+
+
+def _buffer_array(values):
+    """
+    The array to write for one column and the levels of a categorical one (None for numeric).
+    """
+    if isinstance(values, pd.Series):
+        values = values.array if isinstance(values.dtype, pd.CategoricalDtype) else values.to_numpy()
+    if not isinstance(values, pd.Categorical):
+        array = np.asarray(values)
+        if array.dtype.kind in _BUFFER_KINDS:
+            return array.astype(array.dtype.newbyteorder("<"), copy=False), None
+        values = pd.Categorical(array)
+    return values.codes, values.categories.tolist()
+
+
+def encode_columns(columns, metadata=None):
+    """
+    Writes equal-length columns in the `application/x-numpy-columns` format.
+
+    :param columns: Mapping of name to a numeric array, a `pd.Categorical` or any other sequence,
+        which is written as a categorical column.
+    :param metadata: JSON-serializable object stored in the header.
+    :return: The encoded bytes.
+    """
+    entries, buffers, offset, n_rows = [], [], 0, None
+    for name, values in columns.items():
+        array, levels = _buffer_array(values)
+        if n_rows is None:
+            n_rows = len(array)
+        elif len(array) != n_rows:
+            raise ValueError(f"Column {name} has {len(array)} values, expected {n_rows}")
+        entry = {"name": name, "dtype": array.dtype.str, "offset": offset, "nbytes": array.nbytes}
+        if levels is not None:
+            entry["levels"] = levels
+        entries.append(entry)
+        buffers.append((offset, array))
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps({"n_rows": n_rows or 0, "columns": entries, "metadata": metadata or {}}).encode()
+    header += b" " * (_aligned(len(MAGIC) + 4 + len(header)) - len(MAGIC) - 4 - len(header))
+    start = len(MAGIC) + 4 + len(header)
+    out = bytearray(start + offset)
+    out[:start] = MAGIC + struct.pack("<I", len(header)) + header
+    for buffer_offset, array in buffers:
+        out[start + buffer_offset:start + buffer_offset + array.nbytes] = np.ascontiguousarray(array).tobytes()
+    return bytes(out)
+
+
+def decode_columns(body):
+    """
+    Reads an `application/x-numpy-columns` body without copying its buffers.
+
+    :param body: The encoded bytes; the returned arrays are read-only views of it.
+    :return: (columns, metadata) where columns maps name to a numpy array or `pd.Categorical`.
+    """
+    if len(body) < len(MAGIC) + 4 or body[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not an application/x-numpy-columns body")
+    (header_len,) = struct.unpack_from("<I", body, len(MAGIC))
+    start = len(MAGIC) + 4 + header_len
+    if start > len(body):
+        raise ValueError("Truncated header")
+    header = json.loads(bytes(body[len(MAGIC) + 4:start]))
+    n_rows = int(header["n_rows"])
+    if n_rows < 0:
+        raise ValueError(f"Invalid row count {n_rows}")
+
+    columns = {}
+    for entry in header["columns"]:
+        name, dtype = entry["name"], np.dtype(entry["dtype"])
+        offset, nbytes = int(entry["offset"]), int(entry["nbytes"])
+        if dtype.kind not in _BUFFER_KINDS:
+            raise ValueError(f"Column {name} has unsupported dtype {dtype.str}")
+        if nbytes != n_rows * dtype.itemsize or offset < 0 or start + offset + nbytes > len(body):
+            raise ValueError(f"Column {name} buffer does not hold {n_rows} {dtype.str} values")
+        array = np.frombuffer(body, dtype=dtype, count=n_rows, offset=start + offset)
+        if "levels" in entry:
+            if dtype.kind not in "iu":
+                raise ValueError(f"Categorical column {name} needs integer codes, got {dtype.str}")
+            array = pd.Categorical.from_codes(array, categories=entry["levels"])
+        columns[name] = array
+    return columns, header.get("metadata", {})
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError(f"{ARROW_STREAM} bodies need pyarrow (pip install pyarrow)") from None
+    return pa
+
+
+def encode_arrow(columns, metadata=None):
+    """
+    Arrow IPC stream counterpart of `encode_columns`; `metadata` is stored as JSON under the
+    schema metadata key "metadata". Non-numeric columns are dictionary-encoded.
+    """
+    pa = _pyarrow()
+    arrays = {}
+    for name, values in columns.items():
+        array, levels = _buffer_array(values)
+        if levels is None:
+            arrays[name] = pa.array(array)
+        else:
+            arrays[name] = pa.DictionaryArray.from_arrays(pa.array(array, mask=array < 0), pa.array(levels))
+    table = pa.table(arrays).replace_schema_metadata({"metadata": json.dumps(metadata or {})})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_arrow(body):
+    """
+    Arrow IPC stream counterpart of `decode_columns`. Numeric columns without nulls are zero-copy
+    views of the Arrow buffers; dictionary columns become `pd.Categorical`.
+    """
+    pa = _pyarrow()
+    try:
+        table = pa.ipc.open_stream(pa.py_buffer(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Invalid Arrow stream: {e}") from None
+    columns = {}
+    for name, chunked in zip(table.column_names, table.columns):
+        array = chunked.combine_chunks()
+        if pa.types.is_dictionary(array.type):
+            codes = array.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+            columns[name] = pd.Categorical.from_codes(codes, categories=array.dictionary.to_pylist())
+        else:
+            columns[name] = array.to_numpy(zero_copy_only=False)
+    metadata = (table.schema.metadata or {}).get(b"metadata")
+    return columns, json.loads(metadata) if metadata else {}
+
+
+def decode_body(body, media_type):
+    """
+    :param media_type: One of `MEDIA_TYPES`.
+    :return: (columns, metadata); raises ValueError on a malformed body and ImportError when the
+        format needs a library that is not installed.
+    """
+    try:
+        if media_type == ARROW_STREAM:
+            return decode_arrow(body)
+        return decode_columns(body)
+    except (KeyError, TypeError, struct.error, json.JSONDecodeError) as e:
+        raise ValueError(f"Malformed header: {e!r}") from None
+
+
+def encode_body(columns, media_type, metadata=None):
+    if media_type == ARROW_STREAM:
+        return encode_arrow(columns, metadata)
+    return encode_columns(columns, metadata)
+
+
+def _benchmark(sizes=(1_000, 10_000, 100_000), repeats=5, port=8765):
+    """
+    End-to-end throughput of `/predict/batch` with JSON records, JSON columns and the binary
+    column format, against a uvicorn server started for the run. Each timing covers encoding the
+    request on the client, the HTTP round trip and decoding the response.
+    """
+    import http.client
+    import subprocess
+    import time
+
+    test = pd.read_csv(os.path.join("artifacts_output", "test.csv")).drop(columns=["math_score"])
+    server = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:app", "--port", str(port),
+                               "--log-level", "warning"], cwd=PROJECT_ROOT)
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+        for _ in range(100):
+            try:
+                connection.request("GET", "/")
+                connection.getresponse().read()
+                break
+            except OSError:
+                connection.close()
+                time.sleep(0.2)
+
+        def post(body, content_type):
+            connection.request("POST", "/predict/batch", body=body, headers={"Content-Type": content_type})
+            response = connection.getresponse()
+            payload = response.read()
+            if response.status != 200:
+                raise RuntimeError(f"{response.status}: {payload[:200]!r}")
+            return payload
+
+        def json_records(frame):
+            body = json.dumps(frame.to_dict("records")).encode()
+            return np.array(json.loads(post(body, "application/json"))["predictions"], dtype=float)
+
+        def json_columns(frame):
+            body = json.dumps({c: frame[c].tolist() for c in frame.columns}).encode()
+            return np.array(json.loads(post(body, "application/json"))["predictions"], dtype=float)
+
+        def binary_columns(frame):
+            body = encode_columns({c: frame[c].to_numpy() for c in frame.columns})
+            return decode_columns(post(body, NUMPY_COLUMNS))[0]["prediction"]
+
+        print(f"{'rows':>8}  {'format':<16}{'rows/s':>14}{'request KiB':>14}")
+        for n_rows in sizes:
+            frame = test.sample(n_rows, replace=True, random_state=0).reset_index(drop=True)
+            reference = None
+            for name, run, size in (
+                    ("JSON records", json_records, len(json.dumps(frame.to_dict("records")))),
+                    ("JSON columns", json_columns, len(json.dumps({c: frame[c].tolist() for c in frame.columns}))),
+                    ("binary columns", binary_columns, len(encode_columns({c: frame[c].to_numpy() for c in frame.columns})))):
+                best = float("inf")
+                for _ in range(repeats):
+                    begin = time.perf_counter()
+                    predictions = run(frame)
+                    best = min(best, time.perf_counter() - begin)
+                if reference is None:
+                    reference = predictions
+                elif not np.allclose(predictions, reference, equal_nan=True):
+                    raise AssertionError(f"{name} predictions differ from JSON records")
+                print(f"{n_rows:>8}  {name:<16}{n_rows / best:>14,.0f}{size / 1024:>14.1f}")
+        connection.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+
+# End-to-end throughput against JSON at 1k/10k/100k rows (from the project root):
+#     python src/Pipeline/columnar_format.py
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,224 @@
+from collections.abc import Mapping
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+# `FeatureEncoder` reproduces the fitted `ColumnTransformer` from `DataTransformation` with plain
+# numpy: it reads the learned imputer statistics, scaler parameters and one-hot categories once and
+# then writes raw input fields straight into a preallocated feature matrix in the trained column
+# order. This skips building a pandas DataFrame for every prediction.
+
+
+def _is_nan(value):
+    # Matches SimpleImputer(missing_values=np.nan) on object columns: None is not missing
+    return isinstance(value, float) and value != value
+
+
+class _NumericBlock:
+    __slots__ = ("columns", "fill", "mean", "scale", "offset")
+
+    def __init__(self, columns, fill, mean, scale, offset):
+        self.columns = columns
+        self.fill = fill
+        self.mean = mean
+        self.scale = scale
+        self.offset = offset
+
+
+class _CategoricalBlock:
+    __slots__ = ("column", "fill", "lookup", "values", "offset", "width", "ignore_unknown")
+
+    def __init__(self, column, fill, lookup, values, offset, width, ignore_unknown):
+        self.column = column
+        self.fill = fill
+        self.lookup = lookup
+        self.values = values
+        self.offset = offset
+        self.width = width
+        self.ignore_unknown = ignore_unknown
+
+
+class FeatureEncoder:
+    """
+    Numpy-only equivalent of the fitted preprocessor built by
+    `DataTransformation.get_data_tranformer_object`.
+
+    Supports `ColumnTransformer`s whose pipelines are made of `SimpleImputer`, `StandardScaler`
+    and `OneHotEncoder` steps. Use `FeatureEncoder.from_preprocessor`, which raises ValueError
+    for anything else so callers can fall back to `preprocessor.transform`.
+    """
+    __slots__ = ("input_features", "numeric_blocks", "categorical_blocks", "n_features", "feature_names", "dtype")
+
+    def __init__(self, input_features, numeric_blocks, categorical_blocks, n_features, feature_names,
+                 dtype=np.float64):
+        self.input_features = input_features
+        self.numeric_blocks = numeric_blocks
+        self.categorical_blocks = categorical_blocks
+        self.n_features = n_features
+        self.feature_names = feature_names
+        self.dtype = np.dtype(dtype)
+
+    def astype(self, dtype):
+        """
+        Returns a copy whose output matrix uses `dtype` (e.g. float32 for the compact export).
+        Scaling is still done in float64 and only its result is cast, so every output equals the
+        preprocessor's output cast to `dtype`, which is what compact tree thresholds are rounded for.
+        """
+        numeric = [_NumericBlock(b.columns, b.fill, b.mean, b.scale, b.offset) for b in self.numeric_blocks]
+        categorical = [_CategoricalBlock(b.column, b.fill, b.lookup, b.values.astype(dtype), b.offset, b.width,
+                                         b.ignore_unknown)
+                       for b in self.categorical_blocks]
+        return FeatureEncoder(self.input_features, numeric, categorical, self.n_features, self.feature_names, dtype)
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """
+        Extracts the learned parameters of a fitted `ColumnTransformer`.
+
+        :param preprocessor: The fitted preprocessor loaded from `preprocessor.pkl`.
+        :return: A `FeatureEncoder` whose output matches `preprocessor.transform` exactly.
+        """
+        if not isinstance(preprocessor, ColumnTransformer) or not hasattr(preprocessor, "transformers_"):
+            raise ValueError("FeatureEncoder requires a fitted ColumnTransformer")
+
+        numeric_blocks, categorical_blocks, feature_names = [], [], []
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            if transformer == "passthrough" or not isinstance(transformer, Pipeline):
+                raise ValueError(f"Unsupported transformer for columns {columns}: {transformer!r}")
+
+            steps = [step for _, step in transformer.steps]
+            encoder = next((s for s in steps if isinstance(s, OneHotEncoder)), None)
+            if any(not isinstance(s, (SimpleImputer, StandardScaler, OneHotEncoder)) for s in steps):
+                raise ValueError(f"Unsupported step in pipeline {name}")
+
+            imputer = steps[0] if isinstance(steps[0], SimpleImputer) else None
+            scaler = steps[-1] if isinstance(steps[-1], StandardScaler) else None
+            columns = list(columns)
+
+            if encoder is None:
+                width = len(columns)
+                fill = imputer.statistics_.astype(np.float64) if imputer is not None else np.full(width, np.nan)
+                mean = scaler.mean_ if scaler is not None and scaler.with_mean else np.zeros(width)
+                scale = scaler.scale_ if scaler is not None and scaler.scale_ is not None else np.ones(width)
+                numeric_blocks.append(_NumericBlock(columns, fill, mean, scale, offset))
+                feature_names.extend(f"{name}__{column}" for column in columns)
+                offset += width
+                continue
+
+            if encoder.drop is not None or (scaler is not None and scaler.with_mean):
+                raise ValueError(f"Unsupported one-hot configuration in pipeline {name}")
+            widths = [len(categories) for categories in encoder.categories_]
+            total = sum(widths)
+            # StandardScaler(with_mean=False) multiplies sparse input by the reciprocal of scale_
+            inverse_scale = 1.0 / scaler.scale_ if scaler is not None else np.ones(total)
+            start = 0
+            for i, column in enumerate(columns):
+                categories = encoder.categories_[i]
+                fill = imputer.statistics_[i] if imputer is not None else None
+                lookup = {category: j for j, category in enumerate(categories.tolist())}
+                values = inverse_scale[start:start + widths[i]].astype(np.float64)
+                categorical_blocks.append(_CategoricalBlock(
+                    column, fill, lookup, values, offset + start, widths[i], encoder.handle_unknown != "error"))
+                feature_names.extend(f"{name}__{column}_{category}" for category in categories)
+                start += widths[i]
+            offset += total
+
+        expected = list(preprocessor.get_feature_names_out())
+        if feature_names != expected:
+            raise ValueError("Encoder column layout does not match the preprocessor's feature names")
+
+        input_features = list(getattr(preprocessor, "feature_names_in_", []))
+        used = [c for block in numeric_blocks for c in block.columns] + [b.column for b in categorical_blocks]
+        if sorted(used) != sorted(input_features):
+            raise ValueError(f"Preprocessor expects features {input_features}, encoder covers {used}")
+
+        return cls(input_features, numeric_blocks, categorical_blocks, offset, feature_names)
+
+    def _empty(self, n_rows):
+        return np.zeros((n_rows, self.n_features), dtype=self.dtype)
+
+    def _fill_numeric(self, out, block, raw):
+        missing = np.isnan(raw)
+        if missing.any():
+            raw[missing] = np.broadcast_to(block.fill, raw.shape)[missing]
+        raw -= block.mean
+        raw /= block.scale
+        out[:, block.offset:block.offset + len(block.columns)] = raw
+
+    def _slots(self, block, values):
+        if isinstance(values, np.ndarray) and values.dtype.kind in "US":
+            # Fixed-width string arrays: look up each distinct level once
+            levels, inverse = np.unique(values, return_inverse=True)
+            level_slots = np.array([block.lookup.get(level, -1) for level in levels.tolist()], dtype=np.intp)
+            return level_slots[inverse.ravel()]
+        if hasattr(values, "codes") and hasattr(values, "categories"):
+            # pandas Categorical: look up each category once; code -1 (missing) takes the fill's slot
+            level_slots = np.array([block.lookup.get(level, -1) for level in values.categories.tolist()]
+                                   + [block.lookup.get(block.fill, -1)], dtype=np.intp)
+            return level_slots[values.codes]
+        slots = np.empty(len(values), dtype=np.intp)
+        for row, value in enumerate(values):
+            if _is_nan(value):
+                value = block.fill
+            slots[row] = block.lookup.get(value, -1)
+        return slots
+
+    def _fill_categorical(self, out, block, values):
+        slots = self._slots(block, values)
+        known = slots >= 0
+        if not known.all():
+            if not block.ignore_unknown:
+                unknown = np.asarray(values, dtype=object)[~known][0]
+                raise ValueError(f"Found unknown category {unknown!r} in column {block.column}")
+            rows = np.flatnonzero(known)
+            slots = slots[known]
+        else:
+            rows = np.arange(len(slots))
+        out[rows, block.offset + slots] = block.values[slots]
+
+    def encode_records(self, records):
+        """
+        Encodes a sequence of records into the model's feature matrix.
+
+        :param records: Mappings or objects (e.g. `CustomData`, pydantic `PredictionInput`)
+            exposing every input feature by key or attribute.
+        :return: An array of shape (len(records), n_features) in the encoder's dtype (float64 by default).
+        """
+        records = list(records)
+        if not records:
+            return self._empty(0)
+
+        def getter(column):
+            if isinstance(records[0], Mapping):
+                return [record.get(column) for record in records]
+            return [getattr(record, column, None) for record in records]
+
+        return self.encode_columns({column: getter(column) for column in self.input_features})
+
+    def encode_columns(self, columns):
+        """
+        Encodes column-oriented input, e.g. `{"gender": [...], "reading_score": array, ...}`.
+
+        :param columns: Mapping of input feature name to a sequence or array of equal length.
+        :return: An array of shape (n_rows, n_features) in the encoder's dtype (float64 by default).
+        """
+        missing = [column for column in self.input_features if column not in columns]
+        if missing:
+            raise ValueError(f"Missing input features: {missing}")
+
+        n_rows = len(columns[self.input_features[0]])
+        out = self._empty(n_rows)
+        for block in self.numeric_blocks:
+            raw = np.empty((n_rows, len(block.columns)), dtype=np.float64)
+            for j, column in enumerate(block.columns):
+                # None becomes NaN here and is then imputed
+                raw[:, j] = np.asarray(columns[column], dtype=np.float64)
+            self._fill_numeric(out, block, raw)
+        for block in self.categorical_blocks:
+            self._fill_categorical(out, block, columns[block.column])
+        return out
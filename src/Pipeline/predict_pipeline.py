@@ -1,4 +1,8 @@
 import sys, os
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.append(PROJECT_ROOT)
@@ -7,30 +11,230 @@ try:
     from src.exception import customExceptionHandler
     from src.logger import logging
     from src.utils import load_obj
+    from src.metrics import stage_timer
+    from src.Pipeline.feature_encoder import FeatureEncoder
+    from src.Components.tree_compiler import load_compiled
+    from src.Components.compact_export import load_compact_model
+    from src.Pipeline.input_validator import ColumnarValidator, load_input_schema
+    from src.Components.feature_views import CATEGORICAL_CODES, CategoricalCodesEncoder, current_feature_view, load_model_meta
 except ImportError as e:
     print(f"Error importing local modules: {e}")
     print(f"Current sys.path: {sys.path}")
     print(f"Project root being used: {PROJECT_ROOT}")
     raise
 
+@dataclass
+class PredictionPipelineConfig:
+    model_path: str = os.path.join("artifacts_output", "model.pkl")
+    preprocessor_path: str = os.path.join("artifacts_output", "preprocessor.pkl")
+    compiled_model_path: str = os.path.join("artifacts_output", "model_compiled.npz")
+    compact_model_path: str = os.path.join("artifacts_output", "model_compact.npz")
+    compact_preprocessor_path: str = os.path.join("artifacts_output", "preprocessor_compact.pkl")
+    input_schema_path: str = os.path.join("artifacts_output", "input_schema.json")
+    model_meta_path: str = os.path.join("artifacts_output", "model_meta.json")
+    # Fraction of the training range numeric inputs may fall outside of before they are rejected
+    input_range_margin: float = field(default_factory=lambda: float(os.getenv("INPUT_RANGE_MARGIN", "0")))
+    # Serve the reduced-precision artifacts written by `compact_export` when they are up to date
+    compact: bool = field(default_factory=lambda: os.getenv("COMPACT_ARTIFACTS", "0").lower() in ("1", "true", "yes", "on"))
+
+
 class PredictionPipeline:
-    def __init__(self):
-        pass
-    
+    # Unpickled artifacts shared by every pipeline in the process, keyed by path and mtime so a
+    # retrained model on disk is picked up on the next call (and by what was built from them)
+    _artifact_cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, config=None):
+        self.config = config or PredictionPipelineConfig()
+
+    @classmethod
+    def _load_cached(cls, file_path, build=None, loader=None, variant=None):
+        key = (os.path.abspath(file_path), os.stat(file_path).st_mtime_ns, variant)
+        entry = cls._artifact_cache.get(key)
+        if entry is None:
+            with cls._cache_lock:
+                entry = cls._artifact_cache.get(key)
+                if entry is None:
+                    obj = loader(file_path) if loader else load_obj(file_path=file_path)
+                    entry = (obj, build(obj) if build else None)
+                    for stale in [k for k in cls._artifact_cache if k[0] == key[0] and k[1] != key[1]]:
+                        del cls._artifact_cache[stale]
+                    cls._artifact_cache[key] = entry
+        return entry
+
+    @staticmethod
+    def _build_encoder(preprocessor):
+        try:
+            return FeatureEncoder.from_preprocessor(preprocessor)
+        except ValueError as e:
+            logging.warning(f"Falling back to DataFrame input path: {e}")
+            return None
+
+    @staticmethod
+    def _build_codes_encoder(preprocessor):
+        return CategoricalCodesEncoder.from_preprocessor(preprocessor)
+
+    def _is_current(self, derived_path):
+        # Derived artifacts are only used when written after the model they were built from
+        return bool(derived_path and os.path.exists(derived_path)
+                    and os.stat(derived_path).st_mtime_ns >= os.stat(self.config.model_path).st_mtime_ns)
+
+    def _compiled_model_available(self):
+        return self._is_current(self.config.compiled_model_path)
+
+    def _compact_artifacts_available(self):
+        return (self.config.compact and self._is_current(self.config.compact_model_path)
+                and self._is_current(self.config.compact_preprocessor_path))
+
+    def feature_view(self):
+        """
+        The feature view the model was trained on, from `model_meta.json` when it describes the
+        model on disk, otherwise one-hot (see `current_feature_view`).
+        """
+        return current_feature_view(self.config.model_meta_path, self.config.model_path,
+                                    loader=lambda path: self._load_cached(path, loader=load_model_meta)[0])
+
+    def load_artifacts(self):
+        """
+        Returns the model, the fitted preprocessor and its `FeatureEncoder` (None when the
+        preprocessor layout is not supported by the encoder). The model is the array-compiled tree
+        ensemble when one saved alongside `model.pkl` is at least as new as it.
+
+        In compact mode (`COMPACT_ARTIFACTS=1`) the float32 model and encoder from `compact_export`
+        are returned instead and the preprocessor is None. A model trained on the categorical codes
+        view comes with a `CategoricalCodesEncoder` and no preprocessor, since the preprocessor's
+        one-hot output is not what it expects.
+        """
+        with stage_timer("predict", "load_artifacts"):
+            if self._compact_artifacts_available():
+                model, _ = self._load_cached(self.config.compact_model_path, loader=load_compact_model)
+                encoder, _ = self._load_cached(self.config.compact_preprocessor_path)
+                return model, None, encoder
+            # The view and the model must come from the same model.pkl: retried when it was
+            # replaced in between
+            for _ in range(3):
+                model_mtime_ns = os.stat(self.config.model_path).st_mtime_ns
+                view = self.feature_view()
+                if self._compiled_model_available():
+                    model, _ = self._load_cached(self.config.compiled_model_path, loader=load_compiled)
+                else:
+                    model, _ = self._load_cached(self.config.model_path)
+                if os.stat(self.config.model_path).st_mtime_ns == model_mtime_ns:
+                    break
+            if view == CATEGORICAL_CODES:
+                _, encoder = self._load_cached(self.config.preprocessor_path, self._build_codes_encoder,
+                                               variant=CATEGORICAL_CODES)
+                return model, None, encoder
+            preprocessor, encoder = self._load_cached(self.config.preprocessor_path, self._build_encoder)
+        return model, preprocessor, encoder
+
+    def validator(self):
+        """
+        Returns the `ColumnarValidator` for the current artifacts: built from `input_schema.json`
+        when it is at least as new as the preprocessor, otherwise from the encoder's categories only.
+        """
+        kwargs = {"range_margin": self.config.input_range_margin}
+        schema_path = self.config.input_schema_path
+        if (os.path.exists(schema_path)
+                and os.stat(schema_path).st_mtime_ns >= os.stat(self.config.preprocessor_path).st_mtime_ns):
+            schema, _ = self._load_cached(schema_path, loader=load_input_schema)
+            return ColumnarValidator.from_schema(schema, **kwargs)
+        _, _, encoder = self.load_artifacts()
+        if encoder is None:
+            raise ValueError("No input schema and the preprocessor layout is not supported by FeatureEncoder")
+        return ColumnarValidator.from_encoder(encoder, **kwargs)
+
+    def score_columns(self, columns):
+        """
+        Validates a column batch and predicts only its valid rows.
+
+        :param columns: Mapping of input feature name to a sequence or array of values.
+        :return: (predictions with NaN for invalid rows, `ValidationResult`).
+        """
+        try:
+            validator = self.validator()
+            with stage_timer("predict", "validate"):
+                result = validator.validate_columns(columns)
+            predictions = np.full(result.n_rows, np.nan)
+            rows = np.flatnonzero(result.valid)
+            if len(rows):
+                all_valid = len(rows) == result.n_rows
+                valid_columns = {}
+                for column in validator.input_features:
+                    values = columns[column]
+                    if not isinstance(values, (np.ndarray, pd.Categorical)):
+                        values = np.asarray(values, dtype=object)
+                    # Arrays (e.g. decoded from a binary body) are passed on as-is when every row is valid
+                    if not all_valid:
+                        values = values[rows]
+                    valid_columns[column] = np.asarray(values, dtype=np.float64) if column in validator.numeric else values
+                predictions[rows] = self.predict_columns(valid_columns)
+            return predictions, result
+
+        except Exception as e:
+            logging.error("Error in scoring a validated batch", exc_info=True)
+            raise customExceptionHandler(e) from None
+
     def predict(self, features):
         try:
-            model_path="artifacts_output/model.pkl"
-            preprocessor_path="artifacts_output/preprocessor.pkl"
-            model=load_obj(file_path=model_path)
-            preprocessor=load_obj(file_path=preprocessor_path)
-            data_scaled=preprocessor.transform(features)
-            predictions=model.predict(data_scaled)
+            model, preprocessor, encoder = self.load_artifacts()
+            with stage_timer("predict", "transform"):
+                if preprocessor is None:
+                    data_scaled = encoder.encode_columns({c: features[c].to_numpy() for c in encoder.input_features})
+                else:
+                    data_scaled=preprocessor.transform(features)
+            with stage_timer("predict", "model_predict"):
+                predictions=model.predict(data_scaled)
             return predictions
         
         except Exception as e:
             logging.error("Error in predicting", exc_info=True)
             raise customExceptionHandler(e) from None
 
+    def predict_records(self, records):
+        """
+        Predicts straight from input records without building a DataFrame.
+
+        :param records: Sequence of mappings or objects exposing the seven input features, e.g.
+            `CustomData` or pydantic `PredictionInput` instances.
+        :return: A numpy array with one prediction per record.
+        """
+        try:
+            model, preprocessor, encoder = self.load_artifacts()
+            if encoder is None:
+                rows = [r if isinstance(r, Mapping) else vars(r) for r in records]
+                return self.predict(pd.DataFrame.from_records(rows))
+            with stage_timer("predict", "encode"):
+                data_scaled = encoder.encode_records(records)
+            with stage_timer("predict", "model_predict"):
+                predictions = model.predict(data_scaled)
+            return predictions
+
+        except Exception as e:
+            logging.error("Error in predicting", exc_info=True)
+            raise customExceptionHandler(e) from None
+
+    def predict_columns(self, columns):
+        """
+        Column-oriented variant of `predict_records`.
+
+        :param columns: Mapping of input feature name to a sequence or array of values.
+        :return: A numpy array with one prediction per row.
+        """
+        try:
+            model, preprocessor, encoder = self.load_artifacts()
+            if encoder is None:
+                return self.predict(pd.DataFrame(dict(columns)))
+            with stage_timer("predict", "encode"):
+                data_scaled = encoder.encode_columns(columns)
+            with stage_timer("predict", "model_predict"):
+                predictions = model.predict(data_scaled)
+            return predictions
+
+        except Exception as e:
+            logging.error("Error in predicting", exc_info=True)
+            raise customExceptionHandler(e) from None
+
 
 class CustomData:  #mappping all inputs in html to backend
     def __init__(self, gender: str, race_ethnicity: str, parental_level_of_education, lunch:str, test_preparation_course: str, reading_score: int, writing_score:str):
@@ -44,16 +248,17 @@ class CustomData:  #mappping all inputs in html to backend
         
     def get_data_as_df(self):
         try:
-            custom_input_data = {
-                'gender': [self.gender],
-                'race_ethnicity': [self.race_ethnicity],
-                'parental_level_of_education': [self.parental_level_of_education],
-                'lunch': [self.lunch],
-                'test_preparation_course': [self.test_preparation_course],
-                'reading_score': [self.reading_score],
-                'writing_score': [self.writing_score]
-            }
-            return pd.DataFrame(custom_input_data)
+            with stage_timer("predict", "build_features"):
+                custom_input_data = {
+                    'gender': [self.gender],
+                    'race_ethnicity': [self.race_ethnicity],
+                    'parental_level_of_education': [self.parental_level_of_education],
+                    'lunch': [self.lunch],
+                    'test_preparation_course': [self.test_preparation_course],
+                    'reading_score': [self.reading_score],
+                    'writing_score': [self.writing_score]
+                }
+                return pd.DataFrame(custom_input_data)
         
         except Exception as e:
             logging.error(f"Error occurred while creating DataFrame: {e}")
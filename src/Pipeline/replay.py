@@ -0,0 +1,227 @@
+import sys, os
+import argparse
+import http.client
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlencode, urlsplit
+import numpy as np
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.logger import logging
+    from src.request_capture import FIELDS, read_captures
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Replays requests captured by `src/request_capture.py` against running instances of the app, in
+# capture order and at the captured timing (or scaled with --speed), and compares the predictions
+# of two of them, e.g. the current model and a candidate served from another checkout:
+#
+#     python -m src.Pipeline.replay captures --baseline http://127.0.0.1:8000 --candidate http://127.0.0.1:8001
+#
+# Each request is sent as the original `POST /predict` form and the prediction is read back from
+# the page. The targets are replayed one after the other, not interleaved, so they do not compete
+# for the CPU. With a non-zero speed, a request's latency is counted from the time it was due to be
+# sent, so a server that falls behind is charged for the queueing as well.
+
+# Form field names of `POST /predict`, in `FIELDS` order
+FORM_FIELDS = ("gender", "ethnicity", "parental_level_of_education", "lunch", "test_preparation_course",
+               "reading_score", "writing_score")
+_PREDICTION = re.compile(r"The prediction is:\s*([^<\s]+)")
+
+
+@dataclass
+class ReplayConfig:
+    # Replay speed relative to the capture, 2.0 = twice as fast; 0 sends as fast as `concurrency` allows
+    speed: float = 1.0
+    concurrency: int = 8
+    timeout_seconds: float = 30.0
+    limit: Optional[int] = None
+
+
+@dataclass
+class ReplayResult:
+    target: str
+    latency_ms: np.ndarray
+    status: np.ndarray
+    predictions: np.ndarray
+    seconds: float
+    # How far behind schedule the last request was sent
+    max_send_lag_ms: float = 0.0
+
+    def summary(self):
+        ok = self.status == 200
+        latency = self.latency_ms[ok]
+        percentiles = np.percentile(latency, [50, 95, 99]) if len(latency) else [float("nan")] * 3
+        statuses = {str(code): int(count) for code, count in zip(*np.unique(self.status, return_counts=True))}
+        return {
+            "target": self.target, "requests": int(len(self.status)), "status": statuses,
+            "requests_per_second": len(self.status) / self.seconds if self.seconds else float("nan"),
+            "p50_ms": float(percentiles[0]), "p95_ms": float(percentiles[1]), "p99_ms": float(percentiles[2]),
+            "max_ms": float(latency.max()) if len(latency) else float("nan"),
+            "max_send_lag_ms": self.max_send_lag_ms,
+        }
+
+
+def load_requests(capture_path, limit=None):
+    """
+    :return: (arrival offsets in seconds from the first request, list of `FIELDS` value tuples).
+    """
+    arrivals, requests = [], []
+    for arrival_ns, values in read_captures(capture_path):
+        if limit is not None and len(requests) >= limit:
+            break
+        arrivals.append(arrival_ns)
+        requests.append(values)
+    arrivals = np.asarray(arrivals, dtype=np.int64)
+    return (arrivals - (arrivals[0] if len(arrivals) else 0)) / 1e9, requests
+
+
+def _form_body(values):
+    return urlencode(dict(zip(FORM_FIELDS, values)))
+
+
+def replay(target, arrivals, requests, config=None):
+    """
+    Sends every request to `target` (e.g. "http://127.0.0.1:8000") on the captured schedule.
+
+    :return: A `ReplayResult`; status 0 marks a connection error or timeout, and the prediction is
+        NaN for every request that did not succeed.
+    """
+    config = config or ReplayConfig()
+    url = urlsplit(target)
+    n = len(requests)
+    latency_ms, status, predictions = np.full(n, np.nan), np.zeros(n, dtype=np.int64), np.full(n, np.nan)
+    local = threading.local()
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+
+    def connection():
+        if getattr(local, "connection", None) is None:
+            local.connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=config.timeout_seconds)
+        return local.connection
+
+    def send(i, due):
+        try:
+            conn = connection()
+            conn.request("POST", "/predict", body=_form_body(requests[i]), headers=headers)
+            response = conn.getresponse()
+            page = response.read().decode("utf-8", errors="replace")
+            latency_ms[i] = (time.perf_counter() - due) * 1000
+            status[i] = response.status
+            match = _PREDICTION.search(page) if response.status == 200 else None
+            if match:
+                predictions[i] = float(match.group(1))
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            logging.warning(f"Replay request {i} to {target} failed: {e!r}")
+            if getattr(local, "connection", None) is not None:
+                local.connection.close()
+                local.connection = None
+
+    max_lag = 0.0
+    with ThreadPoolExecutor(max_workers=max(1, config.concurrency)) as pool:
+        start = time.perf_counter()
+        futures = []
+        for i in range(n):
+            if config.speed > 0:
+                due = start + arrivals[i] / config.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                max_lag = max(max_lag, time.perf_counter() - due)
+                futures.append(pool.submit(send, i, due))
+            else:
+                futures.append(pool.submit(lambda i=i: send(i, time.perf_counter())))
+        for future in futures:
+            future.result()
+        seconds = time.perf_counter() - start
+    return ReplayResult(target, latency_ms, status, predictions, seconds, max_lag * 1000)
+
+
+def compare(baseline, candidate, requests, tolerance=1e-6, top=5):
+    """
+    Diffs the predictions of two replays of the same requests.
+
+    :param tolerance: Absolute difference below which two predictions count as equal.
+    :return: Dict with the number of compared, differing and status-mismatched requests, the
+        max/mean absolute difference and the `top` largest differences with their inputs.
+    """
+    both = (baseline.status == 200) & (candidate.status == 200)
+    diff = np.abs(candidate.predictions - baseline.predictions)
+    diff[~both] = np.nan
+    compared = both & ~np.isnan(diff)
+    differing = compared & (diff > tolerance)
+    largest = np.argsort(-np.where(compared, diff, -np.inf), kind="stable")[:min(top, int(differing.sum()))]
+    return {
+        "compared": int(compared.sum()),
+        "differing": int(differing.sum()),
+        "status_mismatches": int((baseline.status != candidate.status).sum()),
+        "max_abs_diff": float(diff[compared].max()) if compared.any() else float("nan"),
+        "mean_abs_diff": float(diff[compared].mean()) if compared.any() else float("nan"),
+        "largest": [{"request": int(i), "input": dict(zip(FIELDS, requests[i])),
+                     "baseline": float(baseline.predictions[i]), "candidate": float(candidate.predictions[i])}
+                    for i in largest],
+    }
+
+
+def format_report(results, diff=None):
+    lines = [f"{'target':<32}{'requests':>10}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+             f"{'max ms':>9}{'lag ms':>9}  status"]
+    for result in results:
+        s = result.summary()
+        lines.append(f"{s['target']:<32}{s['requests']:>10}{s['requests_per_second']:>9.1f}{s['p50_ms']:>9.2f}"
+                     f"{s['p95_ms']:>9.2f}{s['p99_ms']:>9.2f}{s['max_ms']:>9.2f}{s['max_send_lag_ms']:>9.1f}"
+                     f"  {s['status']}")
+    if diff is not None:
+        lines.append(f"predictions: {diff['differing']} of {diff['compared']} differ "
+                     f"(max {diff['max_abs_diff']:.6g}, mean {diff['mean_abs_diff']:.6g}), "
+                     f"{diff['status_mismatches']} status mismatches")
+        for entry in diff["largest"]:
+            lines.append(f"  request {entry['request']}: {entry['baseline']:.6g} -> {entry['candidate']:.6g}  "
+                         f"{entry['input']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay captured /predict traffic against running app instances")
+    parser.add_argument("capture", help="capture directory (CAPTURE_DIR) or a single .cap file")
+    parser.add_argument("--baseline", required=True, help="URL of the instance serving the current model")
+    parser.add_argument("--candidate", help="URL of the instance serving the model to compare")
+    parser.add_argument("--speed", type=float, default=ReplayConfig.speed,
+                        help="timing relative to the capture, e.g. 2 for twice as fast; 0 for no pauses")
+    parser.add_argument("--concurrency", type=int, default=ReplayConfig.concurrency)
+    parser.add_argument("--timeout", type=float, default=ReplayConfig.timeout_seconds)
+    parser.add_argument("--limit", type=int, help="replay only the first LIMIT requests")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="prediction difference counted as a diff")
+    parser.add_argument("--report", help="also write the report as JSON to this file")
+    args = parser.parse_args(argv)
+
+    config = ReplayConfig(speed=args.speed, concurrency=args.concurrency, timeout_seconds=args.timeout,
+                          limit=args.limit)
+    arrivals, requests = load_requests(args.capture, config.limit)
+    if not requests:
+        parser.error(f"No captured requests in {args.capture}")
+    span = arrivals[-1] / config.speed if config.speed > 0 else 0.0
+    print(f"Replaying {len(requests):,} requests" + (f" over {span:.1f}s" if span else ""))
+
+    results = [replay(args.baseline, arrivals, requests, config)]
+    if args.candidate:
+        results.append(replay(args.candidate, arrivals, requests, config))
+    diff = compare(results[0], results[1], requests, args.tolerance) if args.candidate else None
+    print(format_report(results, diff))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"config": vars(args), "targets": [r.summary() for r in results], "diff": diff}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
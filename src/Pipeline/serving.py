@@ -0,0 +1,270 @@
+import sys, os
+import argparse
+import gc
+import importlib
+import signal
+import socket
+import time
+from dataclasses import dataclass
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.exception import customExceptionHandler
+    from src.logger import logging, shutdown_logging
+    from src.Pipeline.predict_pipeline import PredictionPipeline, PredictionPipelineConfig
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Multi-worker launcher that loads the model and preprocessor once in a parent process and then
+# forks the uvicorn workers. The workers share the parent's memory pages copy-on-write, so the
+# large read-only numpy arrays of a fitted ensemble exist once in RAM instead of once per worker.
+# `gc.freeze()` moves the preloaded objects out of the collector's generations so that garbage
+# collection in a worker does not write to (and therefore copy) the shared pages.
+#
+# Usage:
+#     python -m src.Pipeline.serving --workers 4 --port 8000
+#     python -m src.Pipeline.serving --measure-memory --workers 4
+
+
+@dataclass
+class ServingConfig:
+    app: str = "app:app"
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = os.cpu_count() or 1
+    preload: bool = True
+
+
+def preload_artifacts(config=None):
+    """
+    Loads the model, preprocessor and feature encoder into the process-wide artifact cache and
+    freezes the garbage collector so forked children keep sharing those pages.
+    """
+    PredictionPipeline(config).load_artifacts()
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+
+
+def _import_app(app_path):
+    module_name, _, attribute = app_path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "app")
+
+
+def worker_memory(pid):
+    """
+    Reads the memory usage of a process from /proc (Linux only).
+
+    :param pid: Process id of the worker.
+    :return: Dict with `rss`, `pss` and `uss` (unique set size: private clean + private dirty)
+        in bytes, or None when /proc is not available.
+    """
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        return None
+    fields = {}
+    with open(path) as smaps:
+        for line in smaps:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) * 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+class WorkerLauncher:
+    """
+    Binds the listening socket, optionally preloads the artifacts, then forks and supervises
+    `workers` uvicorn processes that all accept on the inherited socket. Workers that die are
+    replaced; SIGINT/SIGTERM are forwarded to the workers for a graceful shutdown.
+    """
+
+    # A worker that exits within `min_uptime` seconds of starting is restarted after a delay that
+    # doubles with every such exit in a row, up to `max_restart_delay`
+    min_uptime = 5.0
+    max_restart_delay = 30.0
+
+    def __init__(self, config=None):
+        self.config = config or ServingConfig()
+        # pid -> time.monotonic() when the worker was started
+        self.children = {}
+        self._stopping = False
+        self._socket = None
+        self._app = None
+        self._master_pid = os.getpid()
+        self._restart_delay = 0.0
+
+    def _bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.config.host, self.config.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _run_worker(self):
+        import uvicorn
+
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        app = self._app if self._app is not None else _import_app(self.config.app)
+        server = uvicorn.Server(uvicorn.Config(app, log_config=None, lifespan="auto"))
+        code = 0
+        try:
+            server.run(sockets=[self._socket])
+        except Exception:
+            logging.error("Worker crashed", exc_info=True)
+            code = 1
+        finally:
+            shutdown_logging()
+            os._exit(code)
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker()
+        self.children[pid] = time.monotonic()
+        logging.info(f"Started worker {pid}")
+        return pid
+
+    def _stop(self, signum, frame):
+        if os.getpid() != self._master_pid:
+            # A worker signalled before it installed its own handlers
+            os._exit(128 + signum)
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def start(self):
+        """
+        Starts the workers and returns their pids without blocking.
+        """
+        if not hasattr(os, "fork"):
+            raise customExceptionHandler("The preloading launcher needs os.fork (Linux/macOS)")
+        self._socket = self._bind()
+        if self.config.preload:
+            # Importing the app in the parent also shares its modules and templates
+            self._app = _import_app(self.config.app)
+            preload_artifacts()
+            logging.info("Preloaded artifacts in launcher process")
+        for _ in range(self.config.workers):
+            if self._stopping:
+                break
+            self._spawn()
+        return list(self.children)
+
+    def _wait_before_restart(self, uptime):
+        if uptime >= self.min_uptime:
+            self._restart_delay = 0.0
+            return
+        self._restart_delay = min(max(2 * self._restart_delay, 0.5), self.max_restart_delay)
+        logging.warning(f"Worker exited after {uptime:.1f}s, restarting in {self._restart_delay:.1f}s")
+        deadline = time.monotonic() + self._restart_delay
+        while not self._stopping and time.monotonic() < deadline:
+            time.sleep(min(0.1, deadline - time.monotonic()))
+
+    def serve_forever(self):
+        # Installed before the first fork so a signal during startup still stops the workers
+        self._master_pid = os.getpid()
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        self.start()
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.children.pop(pid, None)
+            if not self._stopping:
+                logging.warning(f"Worker {pid} exited with status {status}, restarting")
+                if started is not None:
+                    self._wait_before_restart(time.monotonic() - started)
+                if not self._stopping:
+                    self._spawn()
+        self._socket.close()
+
+
+def measure_worker_memory(workers=4, preload=True, config=None):
+    """
+    Forks `workers` processes that each run one prediction and reports their memory usage,
+    either sharing preloaded artifacts (preload=True) or loading their own copy after fork.
+
+    :return: List of `worker_memory` dicts, one per worker.
+    """
+    PredictionPipeline._artifact_cache.clear()
+    if preload:
+        preload_artifacts(config)
+
+    sample = {
+        "gender": "female", "race_ethnicity": "group C", "parental_level_of_education": "some college",
+        "lunch": "standard", "test_preparation_course": "none", "reading_score": 72.0, "writing_score": 70.0,
+    }
+    read_fd, write_fd = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(write_fd)
+            PredictionPipeline(config).predict_records([sample] * 64)
+            os.read(read_fd, 1)  # stay alive until the parent has measured
+            os._exit(0)
+        pids.append(pid)
+    os.close(read_fd)
+
+    time.sleep(1.0)
+    report = [worker_memory(pid) for pid in pids]
+    os.write(write_fd, b"x" * workers)
+    os.close(write_fd)
+    for pid in pids:
+        os.waitpid(pid, 0)
+    if hasattr(gc, "unfreeze"):
+        gc.unfreeze()
+    PredictionPipeline._artifact_cache.clear()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the FastAPI app from preforked workers sharing one copy of the model")
+    parser.add_argument("--app", default=ServingConfig.app)
+    parser.add_argument("--host", default=ServingConfig.host)
+    parser.add_argument("--port", type=int, default=ServingConfig.port)
+    parser.add_argument("--workers", type=int, default=ServingConfig.workers)
+    parser.add_argument("--no-preload", action="store_true", help="let every worker load its own artifacts")
+    parser.add_argument("--measure-memory", action="store_true",
+                        help="compare per-worker unique RSS with and without preloading, then exit")
+    parser.add_argument("--model-path", default=PredictionPipelineConfig.model_path)
+    parser.add_argument("--preprocessor-path", default=PredictionPipelineConfig.preprocessor_path)
+    args = parser.parse_args(argv)
+
+    if args.measure_memory:
+        artifacts = PredictionPipelineConfig(model_path=args.model_path, preprocessor_path=args.preprocessor_path)
+        for preload in (False, True):
+            report = measure_worker_memory(args.workers, preload=preload, config=artifacts)
+            if report[0] is None:
+                print("Per-process memory accounting needs /proc/<pid>/smaps_rollup")
+                return
+            uss = [r["uss"] / 2**20 for r in report]
+            pss = [r["pss"] / 2**20 for r in report]
+            print(f"preload={preload}: unique RSS per worker (MiB) {[round(u, 1) for u in uss]}, "
+                  f"total unique {sum(uss):.1f} MiB, total PSS {sum(pss):.1f} MiB")
+        return
+
+    WorkerLauncher(ServingConfig(app=args.app, host=args.host, port=args.port,
+                                 workers=args.workers, preload=not args.no_preload)).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import sys, os
+import asyncio
+import json
+from dataclasses import dataclass, field
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(PROJECT_ROOT)
+
+try:
+    from src.logger import logging
+    from src.profiler import profiled
+    from src.Pipeline.predict_pipeline import PredictionPipeline
+    from src.Pipeline.input_validator import records_to_columns
+except ImportError as e:
+    print(f"Error importing local modules: {e}")
+    print(f"Current sys.path: {sys.path}")
+    print(f"Project root being used: {PROJECT_ROOT}")
+    raise
+
+# Scoring of newline-delimited JSON streams for `POST /predict/stream`. The request body is read
+# incrementally and cut into micro-batches of `batch_rows` records, each batch is validated and
+# scored in the threadpool, and its NDJSON predictions are queued for the response. The queue holds
+# at most `max_pending_batches` batches: when the client reads slowly the queue fills up, the
+# scorer waits, and the request body stops being read, so the upstream sender is throttled by TCP
+# flow control instead of the server buffering the stream.
+#
+# Each output line is `{"row": i, "prediction": p}` in input order, with `"prediction": null` and
+# an `errors` object for records that fail validation, are not valid JSON, or score to nan/inf.
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, str(default)))
+
+
+@dataclass
+class StreamScoringConfig:
+    batch_rows: int = field(default_factory=lambda: _env_int("STREAM_BATCH_ROWS", 1000))
+    max_pending_batches: int = field(default_factory=lambda: _env_int("STREAM_MAX_PENDING_BATCHES", 4))
+    # Longest accepted record; a line that grows past it without a newline ends the stream
+    max_line_bytes: int = field(default_factory=lambda: _env_int("STREAM_MAX_LINE_BYTES", 1 << 20))
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body generator reads the request body itself.
+
+    `StreamingResponse` polls `receive` for a disconnect while streaming, which would swallow the
+    request body messages. Here a disconnect surfaces instead as `ClientDisconnect` from the
+    request stream, which ends the generator.
+    """
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+async def iter_ndjson_lines(chunks, max_line_bytes):
+    """
+    Splits an async iterator of byte chunks into lines, skipping blank ones.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+        if len(pending) > max_line_bytes:
+            raise ValueError(f"NDJSON line longer than {max_line_bytes} bytes")
+    if pending.strip():
+        yield pending
+
+
+async def iter_batches(lines, batch_rows):
+    batch = []
+    async for line in lines:
+        batch.append(line)
+        if len(batch) >= batch_rows:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def score_batch(pipeline, lines, first_row):
+    """
+    Parses, validates and scores one micro-batch.
+
+    :return: The batch's NDJSON output as bytes.
+    """
+    n_rows = len(lines)
+    errors = [None] * n_rows
+    records, positions = [], []
+    for i, line in enumerate(lines):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            errors[i] = {"_record": "invalid JSON"}
+            continue
+        if not isinstance(record, dict):
+            errors[i] = {"_record": "not a JSON object"}
+            continue
+        records.append(record)
+        positions.append(i)
+
+    predictions = np.full(n_rows, np.nan)
+    if records:
+        validator = pipeline.validator()
+        scored, result = pipeline.score_columns(records_to_columns(records, validator.input_features))
+        predictions[positions] = scored
+        for entry in result.row_errors():
+            errors[positions[entry["row"]]] = entry["errors"]
+    # nan/inf are not valid JSON numbers
+    for i in np.flatnonzero(~np.isfinite(predictions)):
+        if errors[i] is None:
+            errors[i] = {"_prediction": "not a finite number"}
+
+    out = []
+    for i in range(n_rows):
+        if errors[i] is None:
+            out.append(f'{{"row": {first_row + i}, "prediction": {float(predictions[i])!r}}}\n')
+        else:
+            out.append(json.dumps({"row": first_row + i, "prediction": None, "errors": errors[i]}) + "\n")
+    return "".join(out).encode()
+
+
+_END = object()
+
+
+async def score_ndjson_stream(chunks, pipeline=None, config=None):
+    """
+    Scores an NDJSON byte stream and yields NDJSON output, one micro-batch at a time.
+
+    :param chunks: Async iterator of request body bytes, e.g. `request.stream()`.
+    """
+    pipeline = pipeline or PredictionPipeline()
+    config = config or StreamScoringConfig()
+    queue = asyncio.Queue(maxsize=config.max_pending_batches)
+
+    async def produce():
+        row = 0
+        try:
+            lines = iter_ndjson_lines(chunks, config.max_line_bytes)
+            async for batch in iter_batches(lines, config.batch_rows):
+                body = await run_in_threadpool(profiled(score_batch), pipeline, batch, row)
+                row += len(batch)
+                await queue.put(body)
+        except ClientDisconnect:
+            logging.info(f"Client disconnected from an NDJSON stream after {row} rows")
+        except Exception as e:
+            logging.error("Error in scoring an NDJSON stream", exc_info=True)
+            await queue.put((json.dumps({"row": row, "error": str(e)}) + "\n").encode())
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            body = await queue.get()
+            if body is _END:
+                break
+            yield body
+    finally:
+        producer.cancel()
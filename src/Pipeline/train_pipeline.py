@@ -14,6 +14,7 @@ try:
     from src.exception import customExceptionHandler
     from src.logger import logging
     from src.utils import load_obj,save_obj
+    from src.metrics import stage_timer
 except ImportError as e:
     print(f"Error importing local modules: {e}")
     print(f"Current sys.path: {sys.path}")
@@ -95,14 +96,17 @@ class TrainPipeline:
         """
         try:
             # Load and split data
-            X, y = self.load_data(data_file_path)
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+            with stage_timer("training", "train_pipeline.load_data"):
+                X, y = self.load_data(data_file_path)
+                X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
             
             # Preprocess data
-            X_train_scaled, X_test_scaled = self.preprocess_data(X_train, X_test)
+            with stage_timer("training", "train_pipeline.preprocess"):
+                X_train_scaled, X_test_scaled = self.preprocess_data(X_train, X_test)
             
             # Train and evaluate models
-            best_model_name, best_score = self.train_and_evaluate(X_train_scaled, y_train, X_test_scaled, y_test)
+            with stage_timer("training", "train_pipeline.train_and_evaluate"):
+                best_model_name, best_score = self.train_and_evaluate(X_train_scaled, y_train, X_test_scaled, y_test)
             
             logging.info(f"Training pipeline completed. Best model: {best_model_name}, R2 Score: {best_score}")
             return best_model_name, best_score
@@ -0,0 +1,257 @@
+import os
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from src.metrics import REGISTRY
+
+# Admission control for the FastAPI app. Every request is put in an endpoint class ("predict",
+# "train" or "pages"; anything else such as /metrics and /admin is never limited) and each class
+# has its own concurrency limit and bounded wait queue:
+#   - a request runs immediately while fewer than `max_concurrency` requests of its class run,
+#   - otherwise it waits in a FIFO queue of at most `max_queue` requests for up to
+#     `max_wait_seconds`,
+#   - when the queue is full, or the wait runs out, it is answered at once with 503 and a
+#     Retry-After header instead of piling up.
+# Clients can send a deadline as `X-Request-Timeout-Ms` (budget from arrival) or
+# `X-Request-Deadline` (absolute Unix time in seconds). A request whose deadline passes while it
+# waits gets 504 without running, and the deadline is kept in `request.state.deadline` (a
+# `time.monotonic()` value) so handlers can drop it again right before scoring.
+# Limits are per worker process.
+
+SHED = REGISTRY.counter(
+    "admission_shed_total", "Requests rejected by admission control.", ("endpoint_class", "reason"))
+QUEUED = REGISTRY.counter(
+    "admission_queued_total", "Requests that waited in an admission queue.", ("endpoint_class",))
+QUEUE_DEPTH = REGISTRY.gauge(
+    "admission_queue_depth", "Requests currently waiting in an admission queue.", ("endpoint_class",))
+RUNNING = REGISTRY.gauge(
+    "admission_running", "Requests currently admitted.", ("endpoint_class",))
+QUEUE_WAIT = REGISTRY.histogram(
+    "admission_queue_wait_seconds", "Time admitted requests spent waiting in the queue.", ("endpoint_class",))
+
+
+def _env_number(name, default, cast=int):
+    value = os.getenv(name)
+    return cast(value) if value not in (None, "") else default
+
+
+@dataclass
+class ClassLimit:
+    """
+    :param max_concurrency: Requests of the class running at once; 0 turns the limit off.
+    :param max_queue: Requests that may wait for a slot; more are rejected immediately.
+    :param max_wait_seconds: How long a request may wait for a slot.
+    :param retry_after_seconds: Retry-After sent with a 503.
+    """
+    max_concurrency: int
+    max_queue: int
+    max_wait_seconds: float
+    retry_after_seconds: int
+
+    @classmethod
+    def from_env(cls, name, **defaults):
+        """
+        Reads ADMISSION_<NAME>_CONCURRENCY, _QUEUE, _MAX_WAIT_SECONDS and _RETRY_AFTER_SECONDS.
+        """
+        prefix = f"ADMISSION_{name.upper()}_"
+        return cls(
+            max_concurrency=_env_number(prefix + "CONCURRENCY", defaults["max_concurrency"]),
+            max_queue=_env_number(prefix + "QUEUE", defaults["max_queue"]),
+            max_wait_seconds=_env_number(prefix + "MAX_WAIT_SECONDS", defaults["max_wait_seconds"], float),
+            retry_after_seconds=_env_number(prefix + "RETRY_AFTER_SECONDS", defaults["retry_after_seconds"]),
+        )
+
+
+@dataclass
+class AdmissionConfig:
+    enabled: bool = field(default_factory=lambda: os.getenv("ADMISSION_ENABLED", "1").lower()
+                          not in ("0", "false", "no", "off"))
+    predict: ClassLimit = field(default_factory=lambda: ClassLimit.from_env(
+        "predict", max_concurrency=4, max_queue=64, max_wait_seconds=2.0, retry_after_seconds=1))
+    # One training run at a time and none waiting: training takes minutes and competes with inference
+    train: ClassLimit = field(default_factory=lambda: ClassLimit.from_env(
+        "train", max_concurrency=1, max_queue=0, max_wait_seconds=0.0, retry_after_seconds=60))
+    pages: ClassLimit = field(default_factory=lambda: ClassLimit.from_env(
+        "pages", max_concurrency=16, max_queue=64, max_wait_seconds=5.0, retry_after_seconds=1))
+
+    def limits(self):
+        return {"predict": self.predict, "train": self.train, "pages": self.pages}
+
+
+def endpoint_class(method, path):
+    """
+    :return: "predict", "train", "pages" or None for endpoints that are never limited.
+    """
+    if path == "/train":
+        return "train"
+    if path == "/predict" or path.startswith("/predict/"):
+        return "predict" if method == "POST" else "pages"
+    if path == "/":
+        return "pages"
+    return None
+
+
+class ShedRequest(Exception):
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue, for use on one event loop. A released slot
+    is handed straight to the oldest waiter so a newcomer cannot overtake the queue.
+    """
+
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.running = 0
+        self._waiters = deque()
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    async def acquire(self, deadline=None):
+        """
+        Waits for a slot; raises `ShedRequest` with reason "queue_full", "queue_timeout" or
+        "deadline" when the request is not admitted.
+
+        :param deadline: `time.monotonic()` value after which the request is not worth running.
+        """
+        if self.running < self.limit.max_concurrency and not self._waiters:
+            self.running += 1
+            RUNNING.inc(endpoint_class=self.name)
+            return
+        if len(self._waiters) >= self.limit.max_queue:
+            raise ShedRequest("queue_full")
+
+        start = time.monotonic()
+        timeout = self.limit.max_wait_seconds
+        if deadline is not None:
+            timeout = min(timeout, deadline - start)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        QUEUED.inc(endpoint_class=self.name)
+        QUEUE_DEPTH.inc(endpoint_class=self.name)
+        try:
+            await asyncio.wait((waiter,), timeout=max(timeout, 0))
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(waiter)
+                QUEUE_DEPTH.dec(endpoint_class=self.name)
+        if waiter.cancelled():
+            expired = deadline is not None and deadline <= time.monotonic()
+            raise ShedRequest("deadline" if expired else "queue_timeout")
+        QUEUE_WAIT.observe(time.monotonic() - start, endpoint_class=self.name)
+
+    def release(self):
+        # The slot passes to the oldest waiter, so `running` only drops when nobody waits
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            QUEUE_DEPTH.dec(endpoint_class=self.name)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+        RUNNING.dec(endpoint_class=self.name)
+
+
+def request_deadline(headers, now=None):
+    """
+    Reads the client's deadline from `X-Request-Timeout-Ms` / `X-Request-Deadline`; the earlier
+    one wins and malformed values are ignored.
+
+    :param headers: ASGI header pairs.
+    :return: A `time.monotonic()` deadline or None.
+    """
+    now = time.monotonic() if now is None else now
+    deadline = None
+    for key, value in headers:
+        try:
+            if key == b"x-request-timeout-ms":
+                candidate = now + float(value) / 1000
+            elif key == b"x-request-deadline":
+                candidate = now + float(value) - time.time()
+            else:
+                continue
+        except ValueError:
+            continue
+        if math.isfinite(candidate):
+            deadline = candidate if deadline is None else min(deadline, candidate)
+    return deadline
+
+
+def expired(request):
+    """
+    True when the request carries a deadline that has already passed; counted as shed.
+    """
+    deadline = getattr(request.state, "deadline", None)
+    if deadline is None or time.monotonic() < deadline:
+        return False
+    name = endpoint_class(request.method, request.url.path) or "unlimited"
+    SHED.inc(endpoint_class=name, reason="deadline")
+    return True
+
+
+async def _reject(send, status, detail, retry_after=None):
+    body = json.dumps({"detail": detail}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if retry_after is not None:
+        headers.append((b"retry-after", str(retry_after).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying the per-class limits of `AdmissionConfig`. A request keeps its slot
+    until its response, including a streamed body, has been sent.
+    """
+
+    def __init__(self, app, config=None):
+        self.app = app
+        self.config = config or AdmissionConfig()
+        self.limiters = {name: ConcurrencyLimiter(name, limit) for name, limit in self.config.limits().items()}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.config.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = request_deadline(scope.get("headers", ()))
+        scope.setdefault("state", {})["deadline"] = deadline
+        name = endpoint_class(scope["method"], scope["path"])
+        limiter = self.limiters.get(name)
+        if limiter is None or limiter.limit.max_concurrency <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        if deadline is not None and deadline <= time.monotonic():
+            SHED.inc(endpoint_class=name, reason="deadline")
+            await _reject(send, 504, "Deadline exceeded before the request was admitted")
+            return
+        try:
+            await limiter.acquire(deadline)
+        except ShedRequest as e:
+            SHED.inc(endpoint_class=name, reason=e.reason)
+            if e.reason == "deadline":
+                await _reject(send, 504, "Deadline exceeded before the request was admitted")
+            else:
+                await _reject(send, 503, f"Too many {name} requests, retry later",
+                              retry_after=limiter.limit.retry_after_seconds)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -1,23 +1,295 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
 
-# Create a logs directory if it doesn't exist
-LOG_DIR = "logs"
+try:
+    import fcntl
+except ImportError:  # Windows: rotation falls back to a per-process lock
+    fcntl = None
+
+# Logging is configured once per process. Records are put on a bounded in-memory queue by a
+# QueueHandler and written to disk by a background QueueListener thread, so request handlers
+# never block on file I/O. All workers append to the same size-rotated file instead of each
+# creating a new timestamped one.
+LOG_DIR = os.getenv("LOG_DIR", "logs")
 if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+    os.makedirs(LOG_DIR, exist_ok=True)
 
-# Create a log file with a timestamp in its name
-LOG_FILE = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
 LOG_FILE_PATH = os.path.join(LOG_DIR, LOG_FILE)
 
-# Configure logging settings
-logging.basicConfig(
-    filename=LOG_FILE_PATH,
-    format="[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO
-)
+LOG_TEXT_FORMAT = "[%(asctime)s] %(lineno)d %(name)s - %(levelname)s - %(message)s"
+
+# Attributes present on every LogRecord; anything else was passed through `extra=`
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() not in ("0", "false", "no", "off")
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as a single JSON object per line. Values passed with `extra=` are
+    included as top-level keys.
+    """
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exc_info"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class SharedRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    A size-rotated file handler that several worker processes can append to.
+
+    Each write takes an advisory lock on `<file>.lock` so only one process rotates, and a
+    process whose file was rotated by a sibling reopens the new file before writing.
+    """
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding="utf-8"):
+        super().__init__(filename, mode="a", maxBytes=maxBytes, backupCount=backupCount,
+                         encoding=encoding, delay=True)
+        self._lock_path = self.baseFilename + ".lock"
+        self._lock_file = None
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self.stream.fileno())
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.stream.close()
+            self.stream = None
+
+    def emit(self, record):
+        if fcntl is None:
+            super().emit(record)
+            return
+        if self._lock_file is None:
+            self._lock_file = open(self._lock_path, "a")
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            self._reopen_if_rotated()
+            super().emit(record)
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def close(self):
+        super().close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking (or raising) when the queue is full,
+    and keeps the formatted traceback in `exc_text` so the writer can still render it.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per (logger, message template): lets through at most `rate` records per
+    second with bursts of up to `burst`, and drops the rest.
+    """
+
+    def __init__(self, rate, burst=None):
+        super().__init__()
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a random `sample_rate` fraction of records. Warnings and errors are always kept.
+    """
+
+    def __init__(self, sample_rate):
+        super().__init__()
+        self.sample_rate = float(sample_rate)
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.sample_rate
+
+
+def _parse_levels(spec):
+    """
+    Parses "src.Pipeline=WARNING,uvicorn.access=ERROR" into {logger_name: level}.
+    """
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_state = {"listener": None, "handler": None}
+
+
+def _build_listener(log_queue):
+    if os.getenv("LOG_FORMAT", "json").lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(LOG_TEXT_FORMAT)
+
+    file_handler = SharedRotatingFileHandler(
+        LOG_FILE_PATH,
+        maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+    )
+    file_handler.setFormatter(formatter)
+    handlers = [file_handler]
+
+    if _env_flag("LOG_TO_CONSOLE", "0"):
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    return logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+
+
+def configure_logging():
+    """
+    Installs the queue handler on the root logger and starts the background writer thread.
+    Safe to call more than once.
+
+    Environment variables:
+        LOG_LEVEL: root level (default INFO).
+        LOG_LEVELS: per-logger overrides, e.g. "src.Pipeline=WARNING,uvicorn.access=ERROR".
+        LOG_FORMAT: "json" (default) or "text".
+        LOG_MAX_BYTES / LOG_BACKUP_COUNT: rotation of the shared log file.
+        LOG_QUEUE_SIZE: records buffered before new ones are dropped.
+        LOG_TO_CONSOLE: also write to stderr.
+    """
+    if _state["listener"] is not None:
+        return
+
+    log_queue = queue.Queue(maxsize=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    handler = NonBlockingQueueHandler(log_queue)
+    listener = _build_listener(log_queue)
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        logging.getLogger(name).setLevel(level)
+
+    listener.start()
+    _state["listener"], _state["handler"] = listener, handler
+
+
+def shutdown_logging():
+    """
+    Flushes queued records and stops the writer thread.
+    """
+    listener = _state["listener"]
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        _state["listener"] = None
+
+
+def _restart_after_fork():
+    # The writer thread does not survive fork(); give the child its own queue and listener
+    handler = _state["handler"]
+    if handler is None:
+        return
+    handler.queue = queue.Queue(maxsize=handler.queue.maxsize)
+    _state["listener"] = _build_listener(handler.queue)
+    _state["listener"].start()
+
+
+_hot_path_filters = {}
+
+
+def get_hot_path_logger(name):
+    """
+    Returns a logger for messages emitted on every request. Records are sampled
+    (LOG_HOT_PATH_SAMPLE_RATE, default 1.0) and rate limited per message
+    (LOG_HOT_PATH_RATE_LIMIT records/second, default 10) before they reach the queue.
+
+    :param name: Name of the module logging, usually `__name__`.
+    """
+    logger = logging.getLogger(f"{name}.hot_path")
+    if logger.name not in _hot_path_filters:
+        filters = (
+            SamplingFilter(float(os.getenv("LOG_HOT_PATH_SAMPLE_RATE", "1.0"))),
+            RateLimitFilter(float(os.getenv("LOG_HOT_PATH_RATE_LIMIT", "10"))),
+        )
+        for log_filter in filters:
+            logger.addFilter(log_filter)
+        _hot_path_filters[logger.name] = filters
+    return logger
+
+
+configure_logging()
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
 
 # Example usage of logger (this can be removed if not needed here)
 if __name__ == "__main__":
-    logging.info("Logging Initialized")
\ No newline at end of file
+    logging.info("Logging Initialized")
@@ -0,0 +1,306 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Lightweight, dependency-free metrics registry exposing counters, gauges and histograms
+# in the Prometheus text exposition format. Every instrument checks the registry's
+# `enabled` flag first, so with METRICS_ENABLED=0 a timer costs one attribute lookup.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for k, v in pairs
+    )
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    Base class for all metric types. Samples are keyed by the tuple of label values,
+    in the order given by `labelnames`.
+    """
+    metric_type = "untyped"
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labelvalues, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+
+    def inc(self, amount=1, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    metric_type = "gauge"
+
+    def inc(self, amount=1, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not self._registry.enabled:
+            return
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket (non-cumulative) counts, then +Inf, sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, **labels):
+        """
+        Returns a context manager observing the wall-clock duration of its block.
+        """
+        if not self._registry.enabled:
+            return _NULL_TIMER
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        for labelvalues, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, labelvalues, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start, **self._labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class MetricsRegistry:
+    """
+    Holds every metric of the process and renders them in Prometheus text format.
+
+    :param enabled: When False every instrument is a no-op and `render` returns an empty body.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(self, name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as {metric.metric_type}")
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def clear(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+    def render(self):
+        if not self.enabled:
+            return ""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry(enabled=os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off"))
+
+STAGE_DURATION = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds",
+    "Wall-clock time spent in each stage of the prediction and training pipelines.",
+    ("pipeline", "stage"),
+)
+
+
+def stage_timer(pipeline, stage):
+    """
+    Times one stage of a pipeline, e.g. `with stage_timer("predict", "transform"): ...`.
+
+    :param pipeline: Pipeline the stage belongs to ("predict" or "training").
+    :param stage: Name of the stage within that pipeline.
+    :return: A context manager; a shared no-op one when metrics are disabled.
+    """
+    if not REGISTRY.enabled:
+        return _NULL_TIMER
+    return _Timer(STAGE_DURATION, {"pipeline": pipeline, "stage": stage})
+
+
+def observe_stage(pipeline, stage, seconds):
+    """
+    Records a stage duration measured elsewhere (e.g. across middleware and handler).
+    """
+    STAGE_DURATION.observe(seconds, pipeline=pipeline, stage=stage)
+
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "Total HTTP requests handled.", ("method", "path", "status"))
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.", ("method", "path"))
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "End-to-end HTTP request latency, including the response body.",
+    ("method", "path"))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, in-flight requests and latency per route.
+
+    Requests are labelled with the matched route template rather than the raw URL so that
+    unknown paths cannot blow up the label cardinality. The request start time is stored in
+    `request.state.metrics_start` so handlers can attribute time spent before they ran
+    (routing and body parsing) to a stage.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _route_path(scope):
+        router = getattr(scope.get("app"), "router", None)
+        for route in getattr(router, "routes", ()):
+            match, _ = route.matches(scope)
+            if match.name != "NONE":
+                return route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not REGISTRY.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope.setdefault("state", {})["metrics_start"] = start
+        method = scope["method"]
+        path = self._route_path(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method=method, path=path)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(method=method, path=path)
+            HTTP_REQUESTS.inc(method=method, path=path, status=str(status["code"]))
+            HTTP_LATENCY.observe(time.perf_counter() - start, method=method, path=path)
@@ -0,0 +1,421 @@
+import cProfile
+import contextvars
+import functools
+import io
+import os
+import pstats
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from src.logger import logging
+
+# On-demand profiling of live requests and training runs, using only the standard library.
+#
+# Two profilers are available: "cprofile" (deterministic, writes a pstats `.prof` file that
+# snakeviz / `python -m pstats` can open) and "sample" (a background thread that snapshots the
+# profiled thread's stack every PROFILE_SAMPLE_INTERVAL seconds and writes collapsed stacks, one
+# `frame;frame;frame count` line per stack, ready for flamegraph.pl or speedscope).
+#
+# Requests are profiled when one of the triggers is active:
+#     PROFILE_SAMPLE_RATE=0.01       profile 1% of requests from startup
+#     POST /admin/profile            profile a fraction of requests for a limited time
+#     X-Profile: <PROFILE_TOKEN>     profile this one request
+# Training runs are profiled as a whole with PROFILE_TRAINING=1 (or =sample). Handlers that move
+# work to the thread pool wrap it in `profiled(...)` so it shows up in the request's report.
+#
+# Reports go to PROFILE_DIR (default "profiles"), which keeps at most PROFILE_MAX_REPORTS files;
+# the oldest are deleted first. When no trigger is active the middleware and `profile_run` reduce
+# to a single attribute check and hand back a shared no-op object.
+
+PROFILE_MODES = ("cprofile", "sample")
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return float(default)
+
+
+class ReportDirectory:
+    """
+    Directory of profile reports that keeps only the `max_reports` most recent files.
+
+    :param path: Directory to write into; created on first write.
+    :param max_reports: Number of reports kept; older ones are removed after each write.
+    """
+
+    def __init__(self, path, max_reports=50):
+        self.path = path
+        self.max_reports = max(1, int(max_reports))
+        self._lock = threading.Lock()
+
+    def new_name(self, label, mode):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_") or "profile"
+        extension = "prof" if mode == "cprofile" else "folded"
+        return f"{stamp}-{os.getpid()}-{label}.{extension}"
+
+    def write(self, name, dump):
+        """
+        Writes a report atomically through `dump(path)` and prunes old reports.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        final_path = os.path.join(self.path, name)
+        tmp_path = final_path + ".tmp"
+        dump(tmp_path)
+        os.replace(tmp_path, final_path)
+        self.prune()
+        return final_path
+
+    def list(self):
+        """
+        Returns report file names, newest first.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        names = [n for n in os.listdir(self.path) if n.endswith((".prof", ".folded"))]
+        return sorted(names, reverse=True)
+
+    def resolve(self, name):
+        """
+        Returns the path of an existing report, or None for unknown names (no path traversal).
+        """
+        return os.path.join(self.path, name) if name in self.list() else None
+
+    def prune(self):
+        with self._lock:
+            # Several worker processes may prune the same directory at once
+            for name in self.list()[self.max_reports:]:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+
+
+class SamplingProfiler:
+    """
+    Stack sampler built on `sys._current_frames()`. Samples one thread, plus the threads added with
+    `add_thread` while they are registered.
+
+    :param thread_id: `threading.get_ident()` of the thread to sample (default: the caller).
+    :param interval: Seconds between samples.
+    """
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._extra_threads = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_thread(self, thread_id):
+        self._extra_threads.add(thread_id)
+
+    def remove_thread(self, thread_id):
+        self._extra_threads.discard(thread_id)
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for thread_id in (self.thread_id, *self._extra_threads):
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def dump_stats(self, file_path):
+        with open(file_path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+# The session profiling the current request, read by `profiled` on the event loop
+_ACTIVE_SESSION = contextvars.ContextVar("profile_session", default=None)
+
+
+class _ProfileSession:
+    """
+    Profiles the block it wraps and writes the report on exit. Work the block hands to other
+    threads is included when it runs inside `thread_scope`.
+    """
+    __slots__ = ("_owner", "_mode", "_label", "_profiler", "_thread_profilers", "_token", "name", "path")
+
+    def __init__(self, owner, mode, label):
+        self._owner = owner
+        self._mode = mode
+        self._label = label
+        self._profiler = None
+        self._thread_profilers = []
+        self._token = None
+        self.name = owner.reports.new_name(label, mode)
+        self.path = None
+
+    def __enter__(self):
+        if self._mode == "sample":
+            self._profiler = SamplingProfiler(interval=self._owner.sample_interval)
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._token = _ACTIVE_SESSION.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _ACTIVE_SESSION.reset(self._token)
+        try:
+            if self._mode == "sample":
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+            self.path = self._owner.reports.write(self.name, self._dump)
+        except OSError as e:
+            # A failed report must never fail the profiled request or training run
+            logging.warning(f"Could not write profile {self.name}: {e}")
+        finally:
+            self._owner._release()
+        return False
+
+    def _dump(self, file_path):
+        if self._mode == "sample" or not self._thread_profilers:
+            self._profiler.dump_stats(file_path)
+            return
+        stats = pstats.Stats(self._profiler)
+        stats.add(*self._thread_profilers)
+        stats.dump_stats(file_path)
+
+    def thread_scope(self, func, *args, **kwargs):
+        """
+        Calls `func` on the current thread, profiled as part of this session. cProfile only sees
+        the thread it was enabled on, so each call gets its own profiler, merged into the report.
+        """
+        if self._mode == "sample":
+            thread_id = threading.get_ident()
+            self._profiler.add_thread(thread_id)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._profiler.remove_thread(thread_id)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            self._thread_profilers.append(profiler)
+
+
+class _NullSession:
+    __slots__ = ()
+    name = None
+    path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SESSION = _NullSession()
+
+
+class Profiler:
+    """
+    Decides which requests to profile and runs at most one profile at a time per process
+    (profiles of concurrent requests on the same event loop would overlap anyway).
+
+    Environment variables:
+        PROFILE_MODE: "cprofile" (default) or "sample".
+        PROFILE_SAMPLE_RATE: fraction of requests profiled from startup (default 0).
+        PROFILE_TOKEN: enables the `X-Profile` header and the admin endpoints when set.
+        PROFILE_DIR / PROFILE_MAX_REPORTS: report directory and how many reports it keeps.
+        PROFILE_SAMPLE_INTERVAL: seconds between stacks for the sampling profiler (default 0.005).
+    """
+
+    def __init__(self):
+        self.mode = os.getenv("PROFILE_MODE", "cprofile").lower()
+        if self.mode not in PROFILE_MODES:
+            self.mode = "cprofile"
+        self.token = os.getenv("PROFILE_TOKEN") or None
+        self.base_rate = min(max(_env_float("PROFILE_SAMPLE_RATE", "0"), 0.0), 1.0)
+        self.sample_interval = _env_float("PROFILE_SAMPLE_INTERVAL", "0.005")
+        self.reports = ReportDirectory(os.getenv("PROFILE_DIR", "profiles"),
+                                       int(_env_float("PROFILE_MAX_REPORTS", "50")))
+        self._busy = threading.Lock()
+        self._window = None  # (sample_rate, deadline, remaining requests or None)
+        self._refresh()
+
+    def _refresh(self):
+        # `active` is the only thing the request path reads when profiling is off
+        self.active = bool(self.token or self.base_rate > 0 or self._window)
+
+    def arm(self, sample_rate=1.0, duration=60.0, max_requests=None, mode=None):
+        """
+        Profiles a `sample_rate` fraction of requests for `duration` seconds, stopping early after
+        `max_requests` profiles.
+        """
+        if mode is not None:
+            if mode not in PROFILE_MODES:
+                raise ValueError(f"Unknown profile mode {mode!r}, expected one of {PROFILE_MODES}")
+            self.mode = mode
+        self._window = (min(max(float(sample_rate), 0.0), 1.0), time.monotonic() + float(duration),
+                        max_requests)
+        self._refresh()
+        return self.status()
+
+    def disarm(self):
+        self._window = None
+        self._refresh()
+        return self.status()
+
+    def status(self):
+        window = self._window
+        return {
+            "mode": self.mode,
+            "base_sample_rate": self.base_rate,
+            "window": None if window is None else {
+                "sample_rate": window[0],
+                "seconds_left": max(0.0, round(window[1] - time.monotonic(), 3)),
+                "requests_left": window[2],
+            },
+            "reports": len(self.reports.list()),
+        }
+
+    def _current_rate(self):
+        window = self._window
+        if window is None:
+            return self.base_rate
+        rate, deadline, remaining = window
+        if time.monotonic() >= deadline or remaining == 0:
+            self.disarm()
+            return self.base_rate
+        return rate
+
+    def header_matches(self, value):
+        return self.token is not None and value is not None and secrets.compare_digest(value, self.token)
+
+    def _release(self):
+        self._busy.release()
+
+    def session(self, label, forced=False, mode=None):
+        """
+        Returns a context manager profiling one request (sampled unless `forced`) or a shared
+        no-op one when this request is not profiled or another profile is running.
+        """
+        if not forced:
+            rate = self._current_rate()
+            if rate <= 0 or random.random() >= rate:
+                return _NULL_SESSION
+        if not self._busy.acquire(blocking=False):
+            return _NULL_SESSION
+        window = self._window
+        if not forced and window is not None and window[2] is not None:
+            self._window = (window[0], window[1], window[2] - 1)
+        return _ProfileSession(self, mode or self.mode, label)
+
+    def render_text(self, name, limit=40):
+        """
+        Human-readable view of a stored report: the top functions by cumulative time for cProfile
+        reports, the heaviest stacks for sampled ones. Returns None for unknown reports.
+        """
+        path = self.reports.resolve(name)
+        if path is None:
+            return None
+        if name.endswith(".folded"):
+            with open(path) as f:
+                return "".join(f.readlines()[:limit])
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+PROFILER = Profiler()
+
+
+def profiled(func):
+    """
+    Wraps `func` so that, when the current request is being profiled, its call on another thread
+    (e.g. through `run_in_threadpool`) is part of the request's report. Returns `func` itself
+    when nothing is profiled.
+    """
+    session = _ACTIVE_SESSION.get()
+    if session is None:
+        return func
+    return functools.partial(session.thread_scope, func)
+
+
+def profile_run(label):
+    """
+    Profiles a whole training run when PROFILE_TRAINING is set ("1"/"cprofile" or "sample").
+
+    :param label: Used in the report file name, e.g. "training".
+    :return: A context manager; a shared no-op one when training profiling is off.
+    """
+    setting = os.getenv("PROFILE_TRAINING", "0").lower()
+    if setting in ("", "0", "false", "no", "off"):
+        return _NULL_SESSION
+    mode = setting if setting in PROFILE_MODES else "cprofile"
+    return PROFILER.session(label, forced=True, mode=mode)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling sampled requests, and any request whose `X-Profile` header carries
+    PROFILE_TOKEN. A profiled response gets an `X-Profile-Report` header naming its report.
+
+    The profile covers the event loop thread, including anything else it ran while the request was
+    in flight, and the work the handler passes to the thread pool through `profiled`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not PROFILER.active:
+            await self.app(scope, receive, send)
+            return
+
+        forced = False
+        if PROFILER.token is not None:
+            for key, value in scope.get("headers", ()):
+                if key == b"x-profile":
+                    forced = PROFILER.header_matches(value.decode("latin-1"))
+                    break
+        session = PROFILER.session(f"{scope['method']}_{scope['path']}", forced=forced)
+        if session is _NULL_SESSION:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                headers.append((b"x-profile-report", session.name.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with session:
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,282 @@
+import atexit
+import heapq
+import os
+import queue
+import random
+import re
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+from src.logger import logging
+from src.metrics import REGISTRY
+
+# Opt-in capture of the inputs hitting `POST /predict`, for replaying real traffic against a
+# serving change (see `src/Pipeline/replay.py`). With CAPTURE_SAMPLE_RATE > 0 a sampled fraction
+# of requests has its seven `CustomData` fields and arrival time recorded. The request handler
+# only puts a tuple on a bounded in-memory queue (and drops it when the queue is full); a
+# background thread encodes and writes the records.
+#
+# Capture files are written to CAPTURE_DIR (default "captures") as
+# `<UTC stamp>-<pid>-<seq>.cap` and rotated at CAPTURE_MAX_FILE_BYTES; only the
+# CAPTURE_MAX_FILES newest files are kept. A file starts with MAGIC, followed by two kinds of
+# little-endian entries:
+#   level    b"L", field index (u8), level id (u16), byte length (u16), utf-8 bytes
+#   request  b"R", arrival time in ns since the epoch (u64), level ids of the five text fields
+#            (5 x u16), reading_score and writing_score (2 x f64)
+# Each text value is written once per file as a level, so a request costs 35 bytes. Every file
+# carries its own levels and can be read on its own.
+
+FIELDS = ("gender", "race_ethnicity", "parental_level_of_education", "lunch", "test_preparation_course",
+          "reading_score", "writing_score")
+TEXT_FIELDS = FIELDS[:5]
+
+MAGIC = b"SPCAP\0\0\x01"
+_LEVEL = struct.Struct("<cBHH")
+_REQUEST = struct.Struct("<cQ5H2d")
+_MAX_LEVELS = 1 << 16
+_FILE_NAME = re.compile(r"^\d{8}T\d{6}\d*Z-(\d+)-(\d+)\.cap$")
+
+CAPTURED = REGISTRY.counter("capture_records_total", "Requests written to the capture log.")
+CAPTURE_DROPPED = REGISTRY.counter(
+    "capture_dropped_total", "Sampled requests dropped because the capture queue was full.")
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return float(default)
+
+
+class CaptureLog:
+    """
+    Writer of size-rotated capture files in one directory. Not thread-safe; `RequestCapture`
+    uses it from its writer thread only.
+
+    :param path: Directory of the capture files; created on first write.
+    :param max_file_bytes: A new file is started once the current one would grow past this.
+    :param max_files: Number of capture files kept; the oldest are removed on rotation.
+    """
+
+    def __init__(self, path, max_file_bytes=64 * 2**20, max_files=8):
+        self.path = path
+        self.max_file_bytes = max(int(max_file_bytes), 1024)
+        self.max_files = max(1, int(max_files))
+        self._file = None
+        self._size = 0
+        self._sequence = 0
+        self._levels = None
+
+    def _open(self):
+        self.close()
+        os.makedirs(self.path, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        self._sequence += 1
+        self._file = open(os.path.join(self.path, f"{stamp}-{os.getpid()}-{self._sequence}.cap"), "wb")
+        self._file.write(MAGIC)
+        self._size = len(MAGIC)
+        self._levels = [{} for _ in TEXT_FIELDS]
+        self.prune()
+
+    def _level_id(self, chunks, field, value):
+        levels = self._levels[field]
+        level_id = levels.get(value)
+        if level_id is None:
+            level_id = levels[value] = len(levels)
+            data = str(value).encode("utf-8")[:0xFFFF]
+            chunks.append(_LEVEL.pack(b"L", field, level_id, len(data)) + data)
+        return level_id
+
+    def write(self, arrival_ns, values):
+        """
+        Appends one request; `values` holds the seven `FIELDS` in order.
+        """
+        if self._file is None or any(len(levels) >= _MAX_LEVELS - 1 for levels in self._levels):
+            self._open()
+        chunks = []
+        ids = [self._level_id(chunks, i, values[i]) for i in range(len(TEXT_FIELDS))]
+        chunks.append(_REQUEST.pack(b"R", arrival_ns, *ids, float(values[5]), float(values[6])))
+        entry = b"".join(chunks)
+        if self._size + len(entry) > self.max_file_bytes and self._size > len(MAGIC):
+            # Levels are per file, so the entry is rebuilt against the new file's table
+            self._open()
+            return self.write(arrival_ns, values)
+        self._file.write(entry)
+        self._size += len(entry)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def prune(self):
+        # Several worker processes may prune the same directory at once
+        for name in sorted(list_capture_files(self.path), reverse=True)[self.max_files:]:
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+
+
+class RequestCapture:
+    """
+    Samples requests on the request path and hands them to a background writer thread, which is
+    started on the first sampled request.
+
+    Environment variables:
+        CAPTURE_SAMPLE_RATE: fraction of requests captured (default 0, capture off).
+        CAPTURE_DIR: directory of the capture files (default "captures").
+        CAPTURE_MAX_FILE_BYTES / CAPTURE_MAX_FILES: rotation (default 64 MiB, 8 files).
+        CAPTURE_QUEUE_SIZE: sampled requests buffered before new ones are dropped (default 10000).
+    """
+
+    def __init__(self):
+        self.sample_rate = min(max(_env_float("CAPTURE_SAMPLE_RATE", 0.0), 0.0), 1.0)
+        self.log = CaptureLog(os.getenv("CAPTURE_DIR", "captures"),
+                              _env_float("CAPTURE_MAX_FILE_BYTES", 64 * 2**20),
+                              _env_float("CAPTURE_MAX_FILES", 8))
+        self._queue = queue.Queue(maxsize=int(_env_float("CAPTURE_QUEUE_SIZE", 10000)))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def active(self):
+        return self.sample_rate > 0
+
+    def record(self, data):
+        """
+        Captures one request with probability `sample_rate`.
+
+        :param data: Object exposing the seven `FIELDS` as attributes, e.g. `CustomData`.
+        """
+        if self.sample_rate <= 0 or (self.sample_rate < 1 and random.random() >= self.sample_rate):
+            return
+        item = (time.time_ns(), tuple(getattr(data, name) for name in FIELDS))
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            CAPTURE_DROPPED.inc()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-capture", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            written = 0
+            while item is not None:
+                try:
+                    self.log.write(*item)
+                    written += 1
+                except (OSError, ValueError, TypeError):
+                    logging.error("Could not write a captured request", exc_info=True)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            # One flush per burst of queued requests
+            self.log.flush()
+            CAPTURED.inc(written)
+            if item is None:
+                self.log.close()
+                return
+
+    def stop(self):
+        """
+        Writes the queued requests and stops the writer thread.
+        """
+        thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+            self._thread = None
+
+    def _restart_after_fork(self):
+        # The writer thread does not survive fork(); the child starts its own on first use
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.log = CaptureLog(self.log.path, self.log.max_file_bytes, self.log.max_files)
+
+
+def list_capture_files(path):
+    """
+    Returns the names of the capture files in a directory.
+    """
+    if not os.path.isdir(path):
+        return []
+    return [name for name in os.listdir(path) if _FILE_NAME.match(name)]
+
+
+def read_capture_file(file_path):
+    """
+    Yields `(arrival_ns, values)` for each request of one capture file, `values` holding the
+    seven `FIELDS` in order. A record cut short at the end of the file (the writer was killed
+    mid-write) is ignored.
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{file_path} is not a capture file")
+    levels = [[] for _ in TEXT_FIELDS]
+    position = len(MAGIC)
+    while position < len(data):
+        tag = data[position:position + 1]
+        if tag == b"L":
+            if position + _LEVEL.size > len(data):
+                return
+            _, field, level_id, length = _LEVEL.unpack_from(data, position)
+            position += _LEVEL.size
+            if position + length > len(data):
+                return
+            if level_id != len(levels[field]):
+                raise ValueError(f"{file_path}: level {level_id} of field {field} out of order")
+            levels[field].append(data[position:position + length].decode("utf-8", errors="replace"))
+            position += length
+        elif tag == b"R":
+            if position + _REQUEST.size > len(data):
+                return
+            _, arrival_ns, *ids, reading, writing = _REQUEST.unpack_from(data, position)
+            position += _REQUEST.size
+            yield arrival_ns, tuple(levels[i][level_id] for i, level_id in enumerate(ids)) + (reading, writing)
+        else:
+            raise ValueError(f"{file_path}: unknown entry {tag!r} at byte {position}")
+
+
+def read_captures(path):
+    """
+    Yields `(arrival_ns, values)` for every request captured in a directory (or one file), in
+    arrival order across the worker processes that wrote them.
+    """
+    if os.path.isfile(path):
+        yield from read_capture_file(path)
+        return
+    by_process = {}
+    # Names start with the UTC time the file was opened, so sorting orders each process's files
+    for name in sorted(list_capture_files(path)):
+        by_process.setdefault(_FILE_NAME.match(name).group(1), []).append(os.path.join(path, name))
+
+    def chain(files):
+        for file_path in files:
+            yield from read_capture_file(file_path)
+
+    yield from heapq.merge(*(chain(files) for files in by_process.values()), key=lambda item: item[0])
+
+
+CAPTURE = RequestCapture()
+atexit.register(CAPTURE.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=CAPTURE._restart_after_fork)
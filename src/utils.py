@@ -1,4 +1,4 @@
-import os, sys
+import os, sys, time
 import numpy as np
 import pandas as pd
 import dill
@@ -11,6 +11,8 @@ sys.path.append(PROJECT_ROOT)
 try:
     from src.exception import customExceptionHandler
     from src.logger import logging
+    from src.metrics import stage_timer
+    from src.Components.hyperparameter_search import LocalSearch
 except ImportError as e:
     print(f"Error importing local modules: {e}")
     print(f"Current sys.path: {sys.path}")
@@ -86,31 +88,63 @@ def load_obj(file_path):
     :param params: It seems like you forgot to provide the details of the `params` variable. Could you
     please provide the details of the `params` variable so that I can assist you further with the
     `evaluate_models` function?
+    :param details: Optional dictionary that is filled with, per model name, the chosen
+    `best_params`, the mean cross-validated R2 (`cv_r2`), the train R2 and the refit time in
+    seconds (`fit_seconds`), for the model leaderboard.
+    :param searcher: Optional callable `searcher(models, params, x_train, y_train, trial_store=None)`
+    returning the `best_params`/`best_score` per model name (e.g. `DistributedSearch`), used instead
+    of running GridSearchCV model by model in this process.
+    :param trial_store: Optional `TrialStore` that finished CV folds are read from and written to, so
+    an interrupted or extended search only runs the missing trials. Without a `searcher` the
+    trials then run in this process through `LocalSearch`.
     :return: The function `evaluate_models` returns a dictionary containing the test R-squared scores
     for each model specified in the input `models` dictionary. The keys of the dictionary are the names
     of the models, and the values are the corresponding test R-squared scores.
     """
-def evaluate_models(x_train, y_train, x_test, y_test, models, params):
+def evaluate_models(x_train, y_train, x_test, y_test, models, params, details=None, searcher=None, trial_store=None):
     try:
         results = {}
+        searched = None
+        if searcher is None and trial_store is not None:
+            searcher = LocalSearch()
+        if searcher is not None:
+            with stage_timer("training", "evaluate_models.search"):
+                searched = searcher(models, params, x_train, y_train, trial_store=trial_store)
 
         for i in range(len(list(models))):
             model = list(models.values())[i]
-            param = params[list(models.keys())[i]]
-
-            gs = GridSearchCV(model,param,cv=3)
-            gs.fit(x_train,y_train)
-
-            model.set_params(**gs.best_params_)
-            model.fit(x_train, y_train)
+            model_name = list(models.keys())[i]
+            param = params[model_name]
+
+            if searched is not None:
+                best_params, best_score = searched[model_name]["best_params"], searched[model_name]["best_score"]
+            else:
+                gs = GridSearchCV(model,param,cv=3)
+                with stage_timer("training", f"evaluate_models.grid_search.{model_name}"):
+                    gs.fit(x_train,y_train)
+                best_params, best_score = gs.best_params_, gs.best_score_
+
+            model.set_params(**best_params)
+            with stage_timer("training", f"evaluate_models.refit.{model_name}"):
+                fit_start = time.perf_counter()
+                model.fit(x_train, y_train)
+                fit_seconds = time.perf_counter() - fit_start
 
             # Make predictions
-            y_train_pred = model.predict(x_train)
-            y_test_pred = model.predict(x_test)
+            with stage_timer("training", f"evaluate_models.score.{model_name}"):
+                y_train_pred = model.predict(x_train)
+                y_test_pred = model.predict(x_test)
 
             train_model_score = r2_score(y_train, y_train_pred)
             test_model_score = r2_score(y_test, y_test_pred)
             results[list(models.keys())[i]] = test_model_score
+            if details is not None:
+                details[model_name] = {
+                    "best_params": best_params,
+                    "cv_r2": float(best_score),
+                    "train_r2": float(train_model_score),
+                    "fit_seconds": fit_seconds,
+                }
         return results
     
     except Exception as e:
@@ -0,0 +1,30 @@
+import os
+import pytest
+
+from src.Pipeline.bulk_score import BulkScoreConfig, ProgressFile, _open_output
+from src.Pipeline.predict_pipeline import PredictionPipelineConfig
+
+
+def test_resume_is_refused_after_the_model_changes(tmp_path):
+    prediction_config = PredictionPipelineConfig(
+        model_path=str(tmp_path / "model.pkl"), preprocessor_path=str(tmp_path / "preprocessor.pkl"),
+        model_meta_path=str(tmp_path / "model_meta.json"))
+    for path in (prediction_config.model_path, prediction_config.preprocessor_path):
+        with open(path, "wb") as f:
+            f.write(b"artifact")
+    config = BulkScoreConfig(workers=1, prediction_config=prediction_config)
+    input_path, output_path = str(tmp_path / "in.csv"), str(tmp_path / "out.csv")
+    with open(input_path, "w") as f:
+        f.write("gender,math_score\nfemale,70\n")
+
+    progress = ProgressFile(output_path)
+    out, _ = _open_output(input_path, output_path, config, progress, restart=False)
+    out.close()
+    out, _ = _open_output(input_path, output_path, config, progress, restart=False)
+    out.close()
+
+    # A retrain replaces model.pkl between the interrupted run and the resume
+    stat = os.stat(prediction_config.model_path)
+    os.utime(prediction_config.model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with pytest.raises(ValueError, match="model artifacts"):
+        _open_output(input_path, output_path, config, progress, restart=False)
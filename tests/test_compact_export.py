@@ -0,0 +1,37 @@
+import os
+
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from src.Components.compact_export import CompactExportConfig, export_compact
+from src.utils import load_obj, save_obj
+
+
+def _config(directory):
+    return CompactExportConfig(
+        model_path=str(directory / "model.pkl"), preprocessor_path=os.path.join("artifacts_output", "preprocessor.pkl"),
+        compact_model_path=str(directory / "model_compact.npz"),
+        compact_preprocessor_path=str(directory / "preprocessor_compact.pkl"),
+        report_path=str(directory / "compact_report.json"), model_meta_path=str(directory / "model_meta.json"))
+
+
+def test_compact_forest_keeps_every_branch(tmp_path):
+    preprocessor = load_obj(os.path.join("artifacts_output", "preprocessor.pkl"))
+    train = pd.read_csv(os.path.join("artifacts_output", "train.csv"))
+    model = RandomForestRegressor(n_estimators=20, random_state=0)
+    model.fit(preprocessor.transform(train.drop(columns=["math_score"])), train["math_score"])
+    save_obj(str(tmp_path / "model.pkl"), model)
+
+    report = export_compact(_config(tmp_path))
+    # float32 leaf values are the only rounding left; a flipped branch would move a prediction by whole points
+    assert report["max_abs_prediction_delta"] < 1e-4
+    assert report["written"] and os.path.exists(tmp_path / "model_compact.npz")
+
+
+def test_linear_model_is_not_written(tmp_path):
+    save_obj(str(tmp_path / "model.pkl"), load_obj(os.path.join("artifacts_output", "model.pkl")))
+    (tmp_path / "model_compact.npz").write_bytes(b"stale")
+
+    report = export_compact(_config(tmp_path))
+    assert not report["written"]
+    assert not os.path.exists(tmp_path / "model_compact.npz")
@@ -0,0 +1,29 @@
+import pandas as pd
+
+from src.Components.dtype_schema import read_csv_with_schema
+
+SCHEMA = {"gender": {"dtype": "category", "categories": ["female", "male"]}, "reading_score": {"dtype": "int8"}}
+
+
+def test_integers_read_in_schema_dtype(tmp_path):
+    path = tmp_path / "scores.csv"
+    pd.DataFrame({"gender": ["male", "female"], "reading_score": [72, 90]}).to_csv(path, index=False)
+    frame = read_csv_with_schema(path, SCHEMA)
+    assert str(frame["reading_score"].dtype) == "int8"
+    assert frame["reading_score"].tolist() == [72, 90]
+    assert frame["gender"].cat.categories.tolist() == ["female", "male"]
+
+
+def test_out_of_range_integers_are_not_wrapped(tmp_path):
+    path = tmp_path / "scores.csv"
+    pd.DataFrame({"gender": ["male", "female"], "reading_score": [72, 130]}).to_csv(path, index=False)
+    frame = read_csv_with_schema(path, SCHEMA)
+    assert frame["reading_score"].tolist() == [72, 130]
+    assert frame["reading_score"].dtype.itemsize > 1
+
+
+def test_missing_integers_keep_a_float_column(tmp_path):
+    path = tmp_path / "scores.csv"
+    path.write_text("gender,reading_score\nmale,72\nfemale,\n")
+    frame = read_csv_with_schema(path, SCHEMA)
+    assert frame["reading_score"].iloc[0] == 72 and frame["reading_score"].isna().iloc[1]
@@ -0,0 +1,26 @@
+import os
+import pytest
+
+from src.Components.feature_views import (CATEGORICAL_CODES, ONEHOT, current_feature_view,
+                                          save_model_meta, save_model_with_meta)
+
+
+def test_meta_is_paired_with_the_model_it_was_written_for(tmp_path):
+    model_path, meta_path = str(tmp_path / "model.pkl"), str(tmp_path / "model_meta.json")
+    save_model_with_meta(model_path, {"model": 1}, {"feature_view": CATEGORICAL_CODES}, meta_path)
+    assert current_feature_view(meta_path, model_path) == CATEGORICAL_CODES
+
+    # A model replaced without a meta file (e.g. an incremental update) is served one-hot
+    stat = os.stat(model_path)
+    os.utime(model_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert current_feature_view(meta_path, model_path) == ONEHOT
+
+
+def test_meta_for_a_model_still_being_replaced_is_refused(tmp_path):
+    model_path, meta_path = str(tmp_path / "model.pkl"), str(tmp_path / "model_meta.json")
+    save_model_with_meta(model_path, {"model": 1}, {"feature_view": ONEHOT}, meta_path)
+    model_mtime_ns = os.stat(model_path).st_mtime_ns
+    save_model_meta(meta_path, {"feature_view": CATEGORICAL_CODES, "model_mtime_ns": model_mtime_ns + 10**9})
+
+    with pytest.raises(ValueError, match="describes a newer model"):
+        current_feature_view(meta_path, model_path, wait_seconds=0.05)
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import pickle
+import signal
+import socket
+import time
+from dataclasses import asdict
+
+import numpy as np
+import pytest
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GridSearchCV
+from sklearn.neighbors import KNeighborsRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from src.Components.hyperparameter_search import (
+    DistributedSearch, _CoordinatorManager, _init_queue, _worker_main, expand_trials)
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="local workers are forked")
+
+
+class SlowTree(DecisionTreeRegressor):
+    # Slow enough for a worker to be killed while it holds the lease
+    def fit(self, X, y, sample_weight=None, check_input=True):
+        time.sleep(0.3)
+        return super().fit(X, y, sample_weight=sample_weight, check_input=check_input)
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    x = np.hstack([rng.integers(0, 2, size=(150, 4)).astype(float), rng.normal(size=(150, 2))])
+    y = x @ rng.normal(size=6) + rng.normal(scale=0.5, size=150)
+    return x, y
+
+
+def _wait_for(condition, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_two_workers_match_grid_search(data):
+    x, y = data
+    models = {"Decision Tree": DecisionTreeRegressor(random_state=0), "K-Nearest Neighbors": KNeighborsRegressor(),
+              "Ridge": Ridge()}
+    params = {"Decision Tree": {"max_depth": [2, 4, 8]}, "K-Nearest Neighbors": {"n_neighbors": [3, 5, 9]},
+              "Ridge": {"alpha": [0.1, 1.0, 10.0]}}
+
+    best = DistributedSearch(n_workers=2, lease_seconds=10.0, poll_seconds=0.05)(models, params, x, y)
+
+    for name, model in models.items():
+        reference = GridSearchCV(model, params[name], cv=3).fit(x, y)
+        assert best[name]["best_params"] == reference.best_params_
+        assert best[name]["best_score"] == reference.best_score_
+
+
+def test_killed_worker_trial_is_requeued(data):
+    x, y = data
+    models = {"Slow Tree": SlowTree(random_state=0)}
+    params = {"Slow Tree": {"max_depth": [2, 4]}}
+    trials = expand_trials(models, params)
+    authkey = b"test-search"
+    lease_seconds = 1.0
+
+    manager = _CoordinatorManager(address=("127.0.0.1", 0), authkey=authkey)
+    manager.start(initializer=_init_queue, initargs=(pickle.dumps((models, x, y, 3)), lease_seconds, 2))
+    context = multiprocessing.get_context("fork")
+    workers = []
+    try:
+        queue = manager.get_queue()
+        queue.submit([asdict(trial) for trial in trials])
+
+        def start_worker():
+            process = context.Process(target=_worker_main, args=(manager.address, authkey, lease_seconds), daemon=True)
+            process.start()
+            workers.append(process)
+            return process
+
+        victim = start_worker()
+        _wait_for(lambda: queue.status()["leased"] == 1)
+        os.kill(victim.pid, signal.SIGKILL)
+        victim.join()
+
+        # Nobody renews the lease any more, so the trial goes back on the queue
+        _wait_for(lambda: queue.status()["requeued"] >= 1 and queue.status()["leased"] == 0)
+        assert queue.status()["pending"] == len(trials)
+
+        survivor = start_worker()
+        _wait_for(lambda: queue.status()["done"] == len(trials))
+        results = queue.drain()
+        assert sorted(result["trial_id"] for result in results) == [trial.trial_id for trial in trials]
+        assert {result["worker"] for result in results} == {f"{socket.gethostname()}:{survivor.pid}"}
+        assert not any(np.isnan(result["score"]) for result in results)
+    finally:
+        manager.shutdown()
+        for process in workers:
+            process.join(timeout=5)
@@ -0,0 +1,43 @@
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from src.Pipeline.input_validator import ColumnarValidator
+
+NUMERIC = ("reading_score", "writing_score")
+CATEGORICAL = {"gender": ["female", "male"], "lunch": ["free/reduced", "standard"]}
+
+
+def _validator(bounds):
+    return ColumnarValidator({column: dict(bounds) for column in NUMERIC}, CATEGORICAL)
+
+
+@pytest.mark.parametrize("bounds", [{"min": None, "max": None}, {"min": 0, "max": 100}])
+def test_infinite_numbers_are_rejected_per_row(bounds):
+    columns = {"reading_score": [60, "inf", -np.inf, 70], "writing_score": [60, 60, 60, 60],
+               "gender": ["male"] * 4, "lunch": ["standard"] * 4}
+    result = _validator(bounds).validate_columns(columns)
+    assert result.valid.tolist() == [True, False, False, True]
+    assert [entry["errors"] for entry in result.row_errors()] == [{"reading_score": "not a finite number"}] * 2
+
+
+def test_infinite_numbers_in_read_only_arrays():
+    values = np.array([60.0, np.inf])
+    values.flags.writeable = False
+    columns = {"reading_score": values, "writing_score": np.array([60.0, 60.0]),
+               "gender": np.array(["male", "female"], dtype=object), "lunch": np.array(["standard"] * 2, dtype=object)}
+    assert _validator({"min": 0, "max": 100}).validate_columns(columns).valid.tolist() == [True, False]
+
+
+def test_batch_endpoint_keeps_valid_rows_next_to_infinite_ones():
+    from app import app
+    good = {"gender": "male", "race_ethnicity": "group A", "parental_level_of_education": "some college",
+            "lunch": "standard", "test_preparation_course": "none", "reading_score": 60, "writing_score": 60}
+    response = TestClient(app).post("/predict/batch", content=json.dumps([good, dict(good, reading_score="inf")]),
+                                    headers={"Content-Type": "application/json"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["predictions"][0] is not None and body["predictions"][1] is None
+    assert body["errors"] == [{"row": 1, "errors": {"reading_score": "not a finite number"}}]
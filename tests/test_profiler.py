@@ -0,0 +1,32 @@
+import pstats
+import threading
+import time
+
+import pytest
+
+from src.profiler import Profiler, profiled
+
+
+def _work_in_pool():
+    # Long enough for the sampler to catch it
+    end = time.perf_counter() + 0.05
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sample"])
+def test_thread_pool_work_is_in_the_request_report(mode, tmp_path, monkeypatch):
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_SAMPLE_INTERVAL", "0.0005")
+    profiler = Profiler()
+    with profiler.session("request", forced=True, mode=mode) as session:
+        worker = threading.Thread(target=profiled(_work_in_pool))
+        worker.start()
+        worker.join()
+    assert profiled(_work_in_pool) is _work_in_pool
+
+    if mode == "cprofile":
+        assert "_work_in_pool" in {function for _, _, function in pstats.Stats(session.path).stats}
+    else:
+        with open(session.path) as f:
+            assert "_work_in_pool" in f.read()
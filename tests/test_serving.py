@@ -0,0 +1,41 @@
+import os
+
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+from src.utils import load_obj, save_obj
+from src.Pipeline.predict_pipeline import PredictionPipelineConfig
+from src.Pipeline.serving import measure_worker_memory, worker_memory
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(os, "fork") or worker_memory(os.getpid()) is None,
+    reason="needs os.fork and /proc/<pid>/smaps_rollup")
+
+
+@pytest.fixture(scope="module")
+def forest_artifacts(tmp_path_factory):
+    # A forest large enough that a private copy per worker shows up in its unique RSS
+    artifacts = tmp_path_factory.mktemp("artifacts")
+    preprocessor = load_obj(os.path.join("artifacts_output", "preprocessor.pkl"))
+    train = pd.read_csv(os.path.join("artifacts_output", "train.csv"))
+    X = preprocessor.transform(train.drop(columns=["math_score"]))
+    model = RandomForestRegressor(n_estimators=200, random_state=0).fit(X, train["math_score"])
+    save_obj(str(artifacts / "model.pkl"), model)
+    save_obj(str(artifacts / "preprocessor.pkl"), preprocessor)
+    missing = str(artifacts / "missing")
+    return PredictionPipelineConfig(
+        model_path=str(artifacts / "model.pkl"), preprocessor_path=str(artifacts / "preprocessor.pkl"),
+        compiled_model_path=missing, compact_model_path=missing, compact_preprocessor_path=missing,
+        input_schema_path=missing, model_meta_path=missing)
+
+
+def test_preloaded_workers_share_artifacts(forest_artifacts):
+    baseline = measure_worker_memory(workers=2, preload=False, config=forest_artifacts)
+    preloaded = measure_worker_memory(workers=2, preload=True, config=forest_artifacts)
+
+    model_bytes = os.path.getsize(forest_artifacts.model_path)
+    baseline_uss = sum(worker["uss"] for worker in baseline)
+    preloaded_uss = sum(worker["uss"] for worker in preloaded)
+    # Each worker of the baseline holds its own copy of the model; preloaded ones share one
+    assert preloaded_uss < baseline_uss - model_bytes, (baseline, preloaded)
@@ -0,0 +1,34 @@
+import json
+import numpy as np
+
+from src.Pipeline.stream_scoring import score_batch
+
+
+class _FixedPipeline:
+    """Pipeline stand-in whose model returns fixed predictions for every valid record."""
+
+    class _Validator:
+        input_features = ["x"]
+
+    class _Result:
+        def row_errors(self):
+            return []
+
+    def __init__(self, predictions):
+        self.predictions = np.asarray(predictions, dtype=float)
+
+    def validator(self):
+        return self._Validator()
+
+    def score_columns(self, columns):
+        return self.predictions[:len(columns["x"])], self._Result()
+
+
+def test_non_finite_predictions_are_written_as_null_with_an_error():
+    lines = [b'{"x": 1}', b'{"x": 2}', b'{"x": 3}', b'{"x": 4}']
+    body = score_batch(_FixedPipeline([1.5, np.nan, np.inf, -np.inf]), lines, first_row=10)
+
+    out = [json.loads(line) for line in body.decode().splitlines()]
+    assert out[0] == {"row": 10, "prediction": 1.5}
+    for i, entry in enumerate(out[1:], start=11):
+        assert entry == {"row": i, "prediction": None, "errors": {"_prediction": "not a finite number"}}
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import AdaBoostRegressor, GradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import LinearRegression
+from sklearn.tree import DecisionTreeRegressor
+
+from src.Components.tree_compiler import compile_model, load_compiled, save_compiled
+
+
+@pytest.fixture(scope="module")
+def data():
+    # One-hot style columns next to continuous ones, like the preprocessor's output
+    rng = np.random.default_rng(0)
+    X = np.hstack([rng.integers(0, 2, size=(300, 5)).astype(float), rng.normal(size=(300, 3))])
+    y = X[:, :5] @ rng.normal(size=5) + np.sin(X[:, 5]) * 10 + X[:, 6] * X[:, 7] + rng.normal(size=300)
+    return X, y
+
+
+def _xgboost(name):
+    xgboost = pytest.importorskip("xgboost")
+    return getattr(xgboost, name)(n_estimators=16, max_depth=4, random_state=0)
+
+
+def _catboost(tmp_path_factory):
+    catboost = pytest.importorskip("catboost")
+    return catboost.CatBoostRegressor(iterations=16, depth=4, verbose=False, random_seed=0,
+                                      train_dir=str(tmp_path_factory.mktemp("catboost_info")))
+
+
+MODELS = {
+    "decision_tree": lambda tmp: DecisionTreeRegressor(max_depth=8, random_state=0),
+    "random_forest": lambda tmp: RandomForestRegressor(n_estimators=16, random_state=0),
+    "gradient_boosting": lambda tmp: GradientBoostingRegressor(n_estimators=16, subsample=0.8, random_state=0),
+    "gradient_boosting_zero_init": lambda tmp: GradientBoostingRegressor(n_estimators=16, init="zero", random_state=0),
+    "adaboost": lambda tmp: AdaBoostRegressor(n_estimators=16, random_state=0),
+    "xgboost": lambda tmp: _xgboost("XGBRegressor"),
+    "xgboost_rf": lambda tmp: _xgboost("XGBRFRegressor"),
+    "catboost": _catboost,
+}
+
+
+@pytest.mark.parametrize("name", MODELS)
+def test_compiled_predictions_are_bit_identical(name, data, tmp_path_factory, tmp_path):
+    X, y = data
+    model = MODELS[name](tmp_path_factory).fit(X, y)
+    compiled = compile_model(model)
+    assert compiled is not None
+    assert np.array_equal(compiled.predict(X), model.predict(X))
+
+    path = str(tmp_path / "model_compiled.npz")
+    save_compiled(path, compiled)
+    assert np.array_equal(load_compiled(path).predict(X), model.predict(X))
+
+
+def test_unsupported_models_are_not_compiled(data):
+    X, y = data
+    assert compile_model(LinearRegression().fit(X, y)) is None
+    # A custom init estimator has no `constant_` to fold into the base score
+    boosted = GradientBoostingRegressor(n_estimators=4, init=LinearRegression(), random_state=0).fit(X, y)
+    assert compile_model(boosted) is None